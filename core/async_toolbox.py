@@ -0,0 +1,219 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from core import default
+from core.dsp_toolbox import DSPToolbox
+from core.io.wav_reader import WavReader
+
+class AsyncDSPToolbox:
+    """
+    Asyncio front end to audio file reading, spectrogram generation and image export.
+    Blocking work is offloaded to an executor so that the event loop keeps serving other requests, and the number of
+    jobs running at once is capped so that many concurrent requests do not oversubscribe the cores.
+    Cancelling a call cancels its job if it has not started yet; a job already running completes in the background and
+    its result is discarded, still counting towards the limit until it completes.
+    A toolbox may be shared by several event loops, e.g. one per thread, which are then limited together.
+    """
+
+    def __init__(self, executor=None, max_concurrency=None):
+        """
+        Args:
+            executor (concurrent.futures.Executor): executor to run jobs in. Jobs are only made of module-level functions
+                and picklable arguments, so process pools can be used. A thread pool created on first use if None.
+            max_concurrency (int): maximum number of jobs running or queued in the executor at once. Unbounded if None.
+        """
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError('AsyncDSPToolbox.__init__: `max_concurrency` must be at least 1.')
+
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self._slots = _Slots(max_concurrency) if max_concurrency is not None else None
+        self._lock = threading.Lock()
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Runs any blocking function in the executor, within the concurrency limit.
+
+        Args:
+            function (callable): the function to run.
+            *args: positional arguments to the function.
+            **kwargs: keyword arguments to the function.
+
+        Returns:
+            the return value of the function.
+        """
+        # Within a coroutine, this is the running loop
+        loop = asyncio.get_event_loop()
+        if self._slots is not None:
+            await self._slots.acquire(loop)
+
+        try:
+            future = self._executor().submit(partial(function, *args, **kwargs))
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+
+        # The slot is held until the job itself completes, even if the call is cancelled while the job runs
+        if self._slots is not None:
+            future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future, loop=loop)
+
+    async def read(self, filename, all_channels=False):
+        """
+        Reads a Wave file.
+
+        Args:
+            filename (str): name of the file.
+            all_channels (bool): see `WavReader.__init__`.
+
+        Returns:
+            (Sample): the sample read from the file.
+        """
+        return await self.run(_read_sample, filename, all_channels)
+
+    async def probe(self, filename):
+        """
+        Reads the format of a Wave file from its header only.
+
+        Args:
+            filename (str): name of the file.
+
+        Returns:
+            (AudioFileInfo): format of the file.
+        """
+        return await self.run(_probe, filename)
+
+    async def spectrogram_from_sample(self, sample, window=None, size=default.SPECTROGRAM_SIZE):
+        """
+        See `DSPToolbox.spectrogram_from_sample`.
+        """
+        return await self.run(_spectrogram_from_sample, sample, window, size)
+
+    async def image_from_spectrogram(self, spectrogram, colormap=None, floor_db=-100.):
+        """
+        Renders a spectrogram, in grey like `DSPToolbox.image_from_spectrogram` or in decibels through a colormap like
+        `DSPToolbox.db_image_from_spectrogram`.
+
+        Args:
+            spectrogram (Spectrogram): the spectrogram to render.
+            colormap (str): colormap to render in decibels with. Grey linear rendering if None.
+            floor_db (float): lowest level rendered if in decibels.
+
+        Returns:
+            (SpectrogramImage): the rendered image.
+        """
+        return await self.run(_image_from_spectrogram, spectrogram, colormap, floor_db)
+
+    async def save_image(self, image, filename):
+        """
+        Writes a spectrogram image to a file.
+
+        Args:
+            image (SpectrogramImage): the image to write.
+            filename (str): name of the file.
+        """
+        await self.run(_save_image, image, filename)
+
+    async def spectrogram_image_from_file(self, filename, window=None, size=default.SPECTROGRAM_SIZE, colormap=None):
+        """
+        Reads a Wave file and renders its spectrogram in a single job, sparing the transfer of intermediate results
+        between the event loop and the executor.
+
+        Args:
+            filename (str): name of the Wave file.
+            window (Window): the window to analyse with.
+            size (int): size of the spectrogram.
+            colormap (str): colormap to render in decibels with. Grey linear rendering if None.
+
+        Returns:
+            (SpectrogramImage): the rendered image.
+        """
+        return await self.run(_spectrogram_image_from_file, filename, window, size, colormap)
+
+    def _executor(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor()
+            return self.executor
+
+
+class _Slots:
+    """
+    Counting semaphore which coroutines of any event loop can wait on, and which any thread can release.
+    Slots are handed to waiters in order of arrival.
+    """
+
+    def __init__(self, count):
+        self._count = count
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self, loop):
+        with self._lock:
+            if self._count > 0 and not self._waiters:
+                self._count -= 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, waiter))
+                    handed = False
+                except ValueError:
+                    handed = True
+            # A slot handed over while the wait was being cancelled goes to the next waiter
+            if handed:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._count += 1
+                return
+            loop, waiter = self._waiters.popleft()
+
+        try:
+            loop.call_soon_threadsafe(_wake, waiter)
+        except RuntimeError:
+            # The loop of the waiter was closed in the meantime
+            self.release()
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# Jobs are module-level functions so that they can be sent to process pools
+
+def _read_sample(filename, all_channels=False):
+    return WavReader(filename, all_channels).get_sample()
+
+def _probe(filename):
+    return WavReader(filename).probe()
+
+def _spectrogram_from_sample(sample, window, size):
+    if sample.channels > 1:
+        sample = sample.downmix()
+    return DSPToolbox.spectrogram_from_sample(sample, window, size)
+
+def _image_from_spectrogram(spectrogram, colormap, floor_db):
+    if colormap:
+        return DSPToolbox.db_image_from_spectrogram(spectrogram, colormap, floor_db)
+    return DSPToolbox.image_from_spectrogram(spectrogram)
+
+def _save_image(image, filename):
+    image.i.save(filename)
+
+def _spectrogram_image_from_file(filename, window, size, colormap):
+    spectrogram = _spectrogram_from_sample(_read_sample(filename, True), window, size)
+    return _image_from_spectrogram(spectrogram, colormap, -100.)
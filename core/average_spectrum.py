@@ -0,0 +1,148 @@
+import math
+
+import numpy as np
+
+from core import default
+from core.dsp_toolbox import DSPToolbox
+from core.sample import Sample
+from core.window import Window
+
+class AverageSpectrum:
+    """
+    Long-term average spectrum of a wave, by Welch's method: the power of slices cut the same way as for spectrograms is
+    averaged over the whole wave. Waves may be fed block by block; only the running sum of powers and the samples of
+    the next slice are kept, so that memory does not depend on the duration of the wave.
+    """
+
+    def __init__(self, sample_rate=default.SAMPLING_FREQUENCY, sample_width=2, window=None,
+                       size=default.SPECTROGRAM_SIZE, block_frames=256, dtype=None):
+        """
+        Args:
+            sample_rate (int): sampling frequency of the wave.
+            sample_width (int): width in bytes of the samples of the wave, which sets the reference level.
+            window (Window): the window with which to process slices.
+            size (int): the number of frequency bins - half the size of slices.
+            block_frames (int): number of slices to compute per batch, to bound temporary memory.
+            dtype (np.dtype): float type to compute spectra with. Powers are summed in double precision regardless.
+        """
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+        if not isinstance(window, Window):
+            raise TypeError('AverageSpectrum.__init__: passed window is not a valid window.')
+
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.window = window
+        self.size = size
+        self.block_frames = block_frames
+        self.float_type, _ = DSPToolbox.float_types(dtype)
+
+        self.slice_length = 2 * size
+        self.hop = DSPToolbox.hop_size(size)
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the average, to start over with a new wave.
+        """
+        self.frame_count = 0
+        self.sample_count = 0
+        self._power = np.zeros(self.size)
+        self._pending = np.zeros(0, self.float_type)
+        # Position in the wave of the first pending sample
+        self._offset = 0
+
+    def add(self, block):
+        """
+        Adds the next samples of the wave to the average.
+
+        Args:
+            block (np.ndarray): the next samples of the wave.
+        """
+        block = np.asarray(block, self.float_type)
+        if block.ndim != 1:
+            raise ValueError('AverageSpectrum.add: wave has several channels, pick a channel or a downmix of it.')
+
+        self._pending = np.concatenate((self._pending, block))
+        self.sample_count += len(block)
+
+        # Slices lying entirely within the samples received so far, i.e. starting at the latest at `last_start`
+        last_start = self.sample_count - self.slice_length
+        end_frame = int(math.ceil((last_start + 1) / self.hop)) if last_start >= 0 else 0
+
+        self._power += self._slice_power(self._pending, self.frame_count, end_frame)
+        self.frame_count = max(self.frame_count, end_frame)
+
+        # Only keep samples from the start of the next slice
+        next_start = int(self.frame_count * self.hop)
+        self._pending = self._pending[next_start - self._offset:]
+        self._offset = next_start
+
+    def add_sample(self, sample):
+        """
+        Adds a whole sample to the average, a few slices at a time.
+
+        Args:
+            sample (Sample): the sample to add.
+        """
+        if sample.sample_rate != self.sample_rate:
+            raise ValueError('AverageSpectrum.add_sample: expected a sample at {} Hz, got {} Hz.'.format(
+                self.sample_rate, sample.sample_rate))
+
+        step = int(self.block_frames * self.hop)
+        for start in range(0, len(sample.wave), step):
+            self.add(sample.wave[start:start + step])
+
+    def mean_power(self):
+        """
+        Returns:
+            (np.ndarray): the average squared amplitude of every bin over all slices. The last slices, which reach past
+                the end of the wave received so far, are padded with zeros like in spectrograms.
+        """
+        end_frame = int(math.ceil(self.sample_count / self.hop))
+        padded = np.concatenate((self._pending, np.zeros(self.slice_length, self.float_type)))
+        power = self._power + self._slice_power(padded, self.frame_count, end_frame)
+
+        n_frames = max(end_frame, self.frame_count)
+        return power / n_frames if n_frames else power
+
+    def power_spectral_density(self):
+        """
+        Returns the power spectral density of the wave, correct for noise: powers are divided by the noise power
+        bandwidth of the window, in Hz.
+
+        Returns:
+            (np.ndarray): power per Hz of every bin, in squared sample units.
+        """
+        # Squared amplitudes are twice the mean power of sinusoids, except at 0 Hz
+        power = self.mean_power() / 2
+        power[0] *= 2
+        bin_spacing = self.sample_rate / self.slice_length
+        return power / (self.window.noise_pow_bw * bin_spacing)
+
+    def result(self):
+        """
+        Returns:
+            (FFTResult): the long-term average spectrum, whose amplitudes are the root mean square of slice amplitudes.
+                Phases are meaningless in an average and are left to 0.
+        """
+        amp = np.sqrt(self.mean_power()).astype(self.float_type)
+        sample_format = Sample(np.empty(0), self.sample_rate, self.sample_width)
+        fft_result = DSPToolbox.fft_result(amp, np.zeros(self.size, self.float_type), self.slice_length,
+                                           sample_format, self.window)
+        fft_result.metadata['frame_count'] = max(self.frame_count, int(math.ceil(self.sample_count / self.hop)))
+        return fft_result
+
+    def _slice_power(self, samples, start_frame, end_frame):
+        """
+        Sums the squared amplitude spectra of slices taken from samples starting at `self._offset` in the wave.
+        """
+        power = np.zeros(self.size)
+        for start in range(start_frame, end_frame, self.block_frames):
+            frames = np.arange(start, min(start + self.block_frames, end_frame))
+            starts = (frames * self.hop).astype(int) - self._offset
+            spectra = DSPToolbox.frame_spectra(samples[starts[:, np.newaxis] + np.arange(self.slice_length)],
+                                               self.window, self.float_type)
+            power += np.sum(np.square(np.abs(spectra)), axis=0, dtype=np.float64)
+        return power
@@ -0,0 +1,234 @@
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+
+from core import default
+from core.dsp_toolbox import DSPToolbox
+from core.io.wav_reader import WavReader
+
+class StageStats:
+    """
+    Throughput counters of one pipeline stage, safe to update from several threads.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.bytes = 0
+        self.busy_time = 0.
+        self.start_time = None
+        self.end_time = None
+        self._lock = threading.Lock()
+
+    def record(self, duration, n_bytes=0):
+        """
+        Records one processed item.
+
+        Args:
+            duration (float): time in seconds spent processing the item.
+            n_bytes (int): amount of data processed.
+        """
+        now = time.time()
+        with self._lock:
+            self.items += 1
+            self.bytes += n_bytes
+            self.busy_time += duration
+            if self.start_time is None:
+                self.start_time = now - duration
+            self.end_time = now
+
+    @property
+    def throughput(self):
+        """
+        Items processed per second of wall time, from the start of the first item to the end of the last one.
+        """
+        if self.start_time is None or self.end_time <= self.start_time:
+            return 0.
+        return self.items / (self.end_time - self.start_time)
+
+    def __repr__(self):
+        return '{}: {} items, {:.2f} items/s, {:.2f} s busy, {} bytes'.format(
+            self.name, self.items, self.throughput, self.busy_time, self.bytes)
+
+
+class BatchPipeline:
+    """
+    Turns many audio files into spectrogram images, running reading, analysis and writing concurrently.
+    Files are read by threads, analysed by worker processes and images are written by threads. Bounded queues
+    between stages apply backpressure, so only a few files are in memory at any time, whatever the number of files.
+    """
+    _done = None
+
+    def __init__(self, output_folder, size=default.SPECTROGRAM_SIZE, window_class=None, colormap=None,
+                       readers=4, workers=None, writers=2, queue_size=8):
+        """
+        Args:
+            output_folder (str): folder to write images to. Images are named after their audio file, in subfolders
+                mirroring those of the audio files below their common folder.
+            size (int): size of the spectrograms.
+            window_class (type): class of the window to analyse with. Default window if None.
+            colormap (str): if not None, images are rendered in decibels through this colormap rather than in grey.
+            readers (int): number of reading threads.
+            workers (int): number of analysis processes. As many as CPUs if None.
+            writers (int): number of writing threads.
+            queue_size (int): maximum number of files waiting between two stages.
+        """
+        self.output_folder = output_folder
+        self.size = size
+        self.window_class = window_class or default.WindowClass
+        self.colormap = colormap
+        self.readers = readers
+        self.workers = workers
+        self.writers = writers
+        self.queue_size = queue_size
+
+        self.stats = {}
+        self.failures = []
+
+    def run(self, files):
+        """
+        Processes all files and blocks until done.
+
+        Args:
+            files (str or iterable of str): list of files, or glob pattern matching them.
+
+        Returns:
+            (list of str): names of the written images. Files which failed are listed in `failures` instead.
+        """
+        if isinstance(files, str):
+            files = sorted(glob.glob(files, recursive=True))
+        files = list(files)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        self.stats = {name: StageStats(name) for name in ('read', 'analyse', 'write')}
+        self.failures = []
+        self._outputs = []
+        self._lock = threading.Lock()
+        self._targets = {}
+
+        filenames = Queue()
+        taken = set()
+        for filename, output in zip(files, self._output_names(files)):
+            if output in taken:
+                self._fail(filename, ValueError('BatchPipeline.run: {} would overwrite the image of another file.'
+                                                .format(output)))
+                continue
+            taken.add(output)
+            self._targets[filename] = output
+            filenames.put(filename)
+        for _ in range(self.readers):
+            filenames.put(self._done)
+        samples = Queue(self.queue_size)
+        pending = Queue(self.queue_size)
+
+        with ProcessPoolExecutor(self.workers) as executor:
+            threads = [threading.Thread(target=self._read, args=(filenames, samples)) for _ in range(self.readers)]
+            threads += [threading.Thread(target=self._write, args=(pending,)) for _ in range(self.writers)]
+            for t in threads:
+                t.start()
+
+            self._dispatch(executor, samples, pending)
+            for t in threads:
+                t.join()
+
+        return self._outputs
+
+    def _read(self, filenames, samples):
+        while True:
+            filename = filenames.get()
+            if filename is self._done:
+                samples.put(self._done)
+                return
+
+            start = time.time()
+            try:
+                sample = WavReader(filename, all_channels=True).get_sample()
+            except Exception as e:
+                self._fail(filename, e)
+                continue
+
+            self.stats['read'].record(time.time() - start, sample.wave.nbytes)
+            # Blocks while the analysis stage is saturated
+            samples.put((filename, sample))
+
+    def _dispatch(self, executor, samples, pending):
+        finished_readers = 0
+        try:
+            while finished_readers < self.readers:
+                item = samples.get()
+                if item is self._done:
+                    finished_readers += 1
+                    continue
+
+                filename, sample = item
+                try:
+                    future = executor.submit(_analyse, sample, self.size, self.window_class, self.colormap)
+                except Exception as e:
+                    self._fail(filename, e)
+                    continue
+
+                # Blocks while the writing stage lags behind, which in turn stops taking samples from readers
+                pending.put((filename, future))
+        finally:
+            for _ in range(self.writers):
+                pending.put(self._done)
+
+    def _write(self, pending):
+        while True:
+            item = pending.get()
+            if item is self._done:
+                return
+
+            filename, future = item
+            try:
+                image, analysis_time = future.result()
+                self.stats['analyse'].record(analysis_time)
+
+                start = time.time()
+                output = self._targets[filename]
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                image.i.save(output)
+                self.stats['write'].record(time.time() - start, os.path.getsize(output))
+            except Exception as e:
+                self._fail(filename, e)
+                continue
+
+            with self._lock:
+                self._outputs.append(output)
+
+    def _output_names(self, files):
+        """
+        Names of the images of files, below the output folder as the files are below their common folder.
+        """
+        if not files:
+            return []
+        paths = [os.path.splitext(os.path.abspath(filename))[0] for filename in files]
+        root = os.path.commonpath([os.path.dirname(path) for path in paths])
+        return [os.path.join(self.output_folder, os.path.relpath(path, root) + '.png') for path in paths]
+
+    def _fail(self, filename, error):
+        with self._lock:
+            self.failures.append((filename, error))
+
+
+def _analyse(sample, size, window_class, colormap):
+    """
+    Analysis stage, run in worker processes.
+
+    Returns:
+        (SpectrogramImage, float): image of the spectrogram of the sample, and time spent computing it.
+    """
+    start = time.time()
+    if sample.channels > 1:
+        sample = sample.downmix()
+
+    spectrogram = DSPToolbox.spectrogram_from_sample(sample, window_class(), size)
+    if colormap:
+        image = DSPToolbox.db_image_from_spectrogram(spectrogram, colormap)
+    else:
+        image = DSPToolbox.image_from_spectrogram(spectrogram)
+
+    return image, time.time() - start
@@ -0,0 +1,106 @@
+import numpy as np
+
+class Colormap:
+    """
+    256-entry colour lookup table, mapping 8-bit indices to RGB colours.
+    """
+    # Colours at evenly spaced positions, linearly interpolated to build the lookup tables
+    _anchors = {
+        'gray': [(0, 0, 0), (255, 255, 255)],
+        'hot': [(0, 0, 0), (128, 0, 0), (255, 0, 0), (255, 128, 0), (255, 255, 0), (255, 255, 128), (255, 255, 255)],
+        'magma': [(0, 0, 4), (81, 18, 124), (183, 55, 121), (252, 137, 97), (252, 253, 191)],
+        'inferno': [(0, 0, 4), (87, 16, 110), (188, 55, 84), (249, 142, 9), (252, 255, 164)],
+        'viridis': [(68, 1, 84), (59, 82, 139), (33, 145, 140), (94, 201, 98), (253, 231, 37)]
+    }
+    # Store built colormaps in class scope to save some processing power
+    __colormaps = {}
+
+    def __init__(self, name, lut):
+        """
+        Args:
+            name (str): name of the colormap.
+            lut (np.ndarray): (256 x 3) array of RGB colours.
+        """
+        lut = np.asarray(lut, dtype=np.uint8)
+        if lut.shape != (256, 3):
+            raise ValueError('Colormap.__init__: lookup table must be of shape (256, 3).')
+
+        self.name = name
+        self.lut = lut
+
+    def __str__(self):
+        return '{} colormap'.format(self.name)
+
+    @staticmethod
+    def names():
+        """
+        Returns:
+            (list of str): names of the built-in colormaps.
+        """
+        return sorted(Colormap._anchors.keys())
+
+    @staticmethod
+    def get(colormap):
+        """
+        Returns a built-in colormap.
+
+        Args:
+            colormap (str or Colormap): name of the colormap. Colormap objects are returned as is.
+
+        Returns:
+            (Colormap): the colormap.
+        """
+        if isinstance(colormap, Colormap):
+            return colormap
+        if colormap in Colormap.__colormaps:
+            return Colormap.__colormaps[colormap]
+        if colormap not in Colormap._anchors:
+            raise ValueError('Colormap.get: unknown colormap `{}`. Available: {}.'.format(colormap, Colormap.names()))
+
+        anchors = np.asarray(Colormap._anchors[colormap], dtype=float)
+        positions = np.linspace(0, 255, len(anchors))
+        indices = np.arange(256)
+        lut = np.stack([np.interp(indices, positions, anchors[:, c]) for c in range(3)], axis=1)
+
+        cmap = Colormap(colormap, np.round(lut))
+        Colormap.__colormaps[colormap] = cmap
+        return cmap
+
+    def apply(self, indices):
+        """
+        Maps indices to colours.
+
+        Args:
+            indices (np.ndarray): array of 8-bit indices.
+
+        Returns:
+            (np.ndarray): array of RGB colours, with an extra trailing dimension of size 3.
+        """
+        return self.lut[indices]
+
+    def indices(self, colours):
+        """
+        Maps colours back to indices, inverse of `apply`. Colours missing from the colormap, e.g. after lossy
+        compression, are mapped to the index of the nearest colour.
+
+        Args:
+            colours (np.ndarray): array of RGB colours, with a trailing dimension of size 3.
+
+        Returns:
+            (np.ndarray): array of 8-bit indices.
+        """
+        colours = np.asarray(colours, dtype=np.int32)
+        codes = ((colours[..., 0] << 16) | (colours[..., 1] << 8) | colours[..., 2]).ravel()
+
+        # Nearest colour of every distinct colour only, images holding at most a few thousands of them
+        unique, inverse = np.unique(codes, return_inverse=True)
+        rgb = np.stack([unique >> 16, (unique >> 8) & 255, unique & 255], axis=-1)
+        distances = np.sum(np.square(rgb[:, np.newaxis] - self.lut.astype(np.int32)), axis=-1)
+        return np.argmin(distances, axis=1).astype(np.uint8)[inverse.ravel()].reshape(colours.shape[:-1])
+
+    def palette(self):
+        """
+        Returns:
+            (list of int): the colormap as a flat palette, as expected by PIL.
+        """
+        return self.lut.flatten().tolist()
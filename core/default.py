@@ -1,7 +1,13 @@
+import numpy as np
+
 from core.windows.hann import HannWindow
 
 REFERENCE_LEVEL = 65535
 SAMPLE_BIT_DEPTH = 16
 SAMPLING_FREQUENCY = 44100
 SPECTROGRAM_SIZE = 512
+# Maximum number of slices lazy spectrograms keep in memory
+LAZY_CACHE_SIZE = 256
+# Float type of all processing. np.float32 halves memory footprint and bandwidth, at the cost of precision
+FLOAT_TYPE = np.float64
 WindowClass = HannWindow
\ No newline at end of file
@@ -1,13 +1,21 @@
 import math
-from copy import deepcopy
+from functools import partial
 import numpy as np
-from numpy.fft import fft, fftfreq, ifft
+from numpy.fft import fftfreq
 from PIL import Image
 
+try:
+    # scipy.fft (scipy 1.4+) transforms single-precision data without upcasting it, unlike numpy.fft before numpy 2.0
+    from scipy.fft import rfft, irfft
+except ImportError:
+    from numpy.fft import rfft, irfft
+
 from core import default
 from core.sample import Sample
+from core.colormap import Colormap
 from core.window import Window
 from core.fft_result import FFTResult
+from core.lazy_frames import LazyFrames
 from core.spectrogram import Spectrogram
 from core.spectrogram_image import SpectrogramImage
 from util.byte_tools import ByteTools as b
@@ -17,147 +25,517 @@ class DSPToolbox:
     Class to wrap an audio signal, providing a collection of tools to perform different operations on it.
     """
     @staticmethod
-    def normalise(sample):
+    def normalise(sample, in_place=False):
         """
-        Returns a normalised copy of the input sample.
+        Scales a sample so that its peak reaches full scale. All channels of multichannel samples are scaled alike.
+
         Args:
-            sample (Sample): the sample to copy and normalise
+            sample (Sample): the sample to normalise
+            in_place (bool): whether to scale the wave of the input sample rather than a copy. Integer waves are then
+                rounded and scaled to one below full scale, so that the peak stays representable.
 
         Returns:
-            (Sample): a normalised copy of the input sample
+            (Sample): a normalised copy of the input sample, or the input sample itself if in place
         """
-        wave_min = min(sample.wave)
-        wave_max = max(sample.wave)
-        max_value = 1 << (sample.bit_depth) - 1
-
-        max_amp = max(abs(wave_min), abs(wave_max))
-        factor = max_value / max_amp
-
-        new_wave = list(map(lambda x: x * factor, sample.wave))
-        return Sample(new_wave, sample.sample_rate, sample.sample_width)
+        wave = np.asarray(sample.wave)
+        max_value = 1 << (sample.bit_depth - 1)
+        integer = wave.dtype.kind in 'iu'
+        if not wave.size:
+            max_amp = 0
+        elif integer:
+            # The absolute value of the most negative integer overflows its own type
+            max_amp = max(-int(wave.min()), int(wave.max()))
+        else:
+            max_amp = float(np.abs(wave).max())
+
+        if in_place:
+            if not isinstance(sample.wave, np.ndarray):
+                raise TypeError('DSPToolbox.normalise: in-place normalisation requires the wave to be an array.')
+            if max_amp:
+                if integer:
+                    factor = (max_value - 1) / max_amp
+                    np.rint(wave * factor, out=wave, casting='unsafe')
+                else:
+                    np.multiply(wave, max_value / max_amp, out=wave)
+            return sample
+
+        factor = max_value / max_amp if max_amp else 1.
+        return Sample(np.multiply(wave, factor, dtype=np.float64), sample.sample_rate, sample.sample_width)
 
     @staticmethod
-    def spectrogram_from_sample(sample, window=None, size=default.SPECTROGRAM_SIZE):
+    def spectrogram_from_sample(sample, window=None, size=default.SPECTROGRAM_SIZE, lazy=False,
+                                cache_size=default.LAZY_CACHE_SIZE, dtype=None):
         """
         Generates the spectrogram for the input sample.
 
         Args:
             sample (Sample): the input sample whose spectrogram to generate.
             window (Window): the window with which to process the sample.
-            _size (int): the size of slices to extract from the sample.
-            overlap (int): the number of samples by which slices should overlap.
-            spp (int): samples per pixel - number of samples to consider for the value of one pixel.
+            size (int): the size of the spectrogram - half the size of slices to extract from the sample.
+            lazy (bool): whether to compute slices only when they are accessed rather than upfront.
+            cache_size (int): if lazy, maximum number of computed slices to keep in memory. Unbounded if None.
+            dtype (np.dtype): float type to compute and store spectra with. Defaults to `default.FLOAT_TYPE`.
 
         Returns:
             Generated spectrogram.
         """
+        if sample.channels > 1:
+            raise ValueError('DSPToolbox.spectrogram_from_sample: sample has {} channels. Use spectrograms_from_sample, '
+                             'or pick a channel or a downmix of the sample.'.format(sample.channels))
 
         # Instantiate a default window if none provided
         if not window:
             window = default.WindowClass()
 
-        overlap = size / 2
+        if lazy:
+            # Slices are cut from the wave one at a time, so convert it once rather than for every slice
+            if not isinstance(sample.wave, np.ndarray):
+                sample = Sample(np.asarray(sample.wave), sample.sample_rate, sample.sample_width)
+            compute_slice = partial(_slice_from_sample, sample, window, size, dtype)
+            fft_slices = LazyFrames(DSPToolbox.frame_count(sample, size), compute_slice, cache_size)
+            return Spectrogram(fft_slices, size, DSPToolbox._spectrogram_metadata(sample, window),
+                               hop_size=DSPToolbox.hop_size(size))
 
-        length = len(sample.wave)
-        _size = 2 * size
+        return DSPToolbox.spectrograms_from_sample(sample, window, size, dtype=dtype)[0]
 
-        slices = []
-        i = 0
-        while i < length:
-            upper = min(i + _size, length)
-            slices.append(sample.slice(i, upper))
-            i += (_size - overlap)
+    @staticmethod
+    def spectrograms_from_sample(sample, window=None, size=default.SPECTROGRAM_SIZE, block_frames=1024, dtype=None):
+        """
+        Generates the spectrograms of all channels of the input sample, analysing all channels in the same batches.
 
-        fft_slices = []
-        for s in slices:
-            fft_slices.append(DSPToolbox.fft(s, window))
+        Args:
+            sample (Sample): the input sample whose spectrograms to generate.
+            window (Window): the window with which to process the sample.
+            size (int): the size of the spectrograms - half the size of slices to extract from the sample.
+            block_frames (int): number of slices to compute per batch, to bound temporary memory.
+            dtype (np.dtype): float type to compute and store spectra with. Defaults to `default.FLOAT_TYPE`.
 
-        metadata = {
+        Returns:
+            (list of Spectrogram): one spectrogram per channel.
+        """
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+
+        float_type, _ = DSPToolbox.float_types(dtype)
+        n_frames = DSPToolbox.frame_count(sample, size)
+        amp = np.empty((sample.channels, n_frames, size), float_type)
+        phase = np.empty((sample.channels, n_frames, size), float_type)
+        for start, spectra in DSPToolbox.stft_blocks(sample, window, size, block_frames, float_type):
+            spectra = spectra.reshape(sample.channels, -1, size)
+            amp[:, start:start + spectra.shape[1]] = np.abs(spectra)
+            phase[:, start:start + spectra.shape[1]] = np.angle(spectra)
+
+        spectrograms = []
+        for c in range(sample.channels):
+            spectrograms.append(DSPToolbox._matrix_spectrogram(amp[c], phase[c], size, sample, window))
+        return spectrograms
+
+    @staticmethod
+    def stft(sample, window=None, size=default.SPECTROGRAM_SIZE, start_frame=0, end_frame=None, dtype=None):
+        """
+        Computes the spectra of consecutive slices of the input sample in one batch, the same way `fft` would for
+        every slice: slices of `2 * size` samples start every `hop_size(size)` samples and are padded with zeros past
+        the end of the sample.
+
+        Args:
+            sample (Sample): the input sample.
+            window (Window): the window with which to process slices.
+            size (int): the number of frequency bins to keep - half the size of slices.
+            start_frame (int): index of the first slice to compute.
+            end_frame (int): index past the last slice to compute. All remaining slices if None.
+            dtype (np.dtype): float type to compute with, giving spectra of the matching complex type.
+                Defaults to `default.FLOAT_TYPE`.
+
+        Returns:
+            (np.ndarray): complex spectra whose magnitudes and angles are the amplitude and phase spectra of the
+                slices, as a (slices x bins) array, or (channels x slices x bins) for multichannel samples.
+        """
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+        if not isinstance(window, Window):
+            raise TypeError('DSPToolbox.stft: passed window is not a valid window.')
+
+        float_type, complex_type = DSPToolbox.float_types(dtype)
+        frames = DSPToolbox.frames(sample, size, start_frame, end_frame, float_type)
+        if not frames.shape[-2]:
+            return np.empty(frames.shape[:-1] + (size,), dtype=complex_type)
+
+        return DSPToolbox.frame_spectra(frames, window, float_type)
+
+    @staticmethod
+    def frames(sample, size, start_frame=0, end_frame=None, dtype=None):
+        """
+        Cuts consecutive slices of the input sample the way `stft` does, padded with zeros past its end, e.g. to analyse
+        slices lined up with spectrogram slices by other means than FFT.
+
+        Args:
+            sample (Sample): the input sample.
+            size (int): half the size of slices.
+            start_frame (int): index of the first slice to cut.
+            end_frame (int): index past the last slice to cut. All remaining slices if None.
+            dtype (np.dtype): float type of the slices. Defaults to `default.FLOAT_TYPE`.
+
+        Returns:
+            (np.ndarray): the slices, as a (slices x samples) array, or (channels x slices x samples) for multichannel
+                samples.
+        """
+        float_type, _ = DSPToolbox.float_types(dtype)
+        length = 2 * size
+        hop = DSPToolbox.hop_size(size)
+        if end_frame is None:
+            end_frame = DSPToolbox.frame_count(sample, size)
+
+        wave = np.asarray(sample.wave)
+        starts = (np.arange(start_frame, end_frame) * hop).astype(int)
+        if not len(starts):
+            return np.empty((0, length) if sample.channels == 1 else (sample.channels, 0, length), dtype=float_type)
+
+        # Gather all slices from a zero-padded copy of the part of the wave they cover
+        first, last = starts[0], starts[-1] + length
+        segment = np.zeros((last - first,) + wave.shape[1:], float_type)
+        available = wave[first:min(last, len(wave))]
+        segment[:len(available)] = available
+        frames = segment[(starts - first)[:, np.newaxis] + np.arange(length)]
+        if sample.channels > 1:
+            frames = np.moveaxis(frames, 2, 0)
+        return frames
+
+    @staticmethod
+    def frame_spectra(frames, window, dtype=None):
+        """
+        Computes the spectra of slices laid along the last axis, scaled like `fft` does, e.g. for slices cut by other
+        means than `stft`. The Nyquist frequency is left out, like in `stft`.
+
+        Args:
+            frames (np.ndarray): the slices, along the last axis, e.g. a (slices x samples) array.
+            window (Window): the window with which to process slices.
+            dtype (np.dtype): float type to compute with, giving spectra of the matching complex type.
+                Defaults to `default.FLOAT_TYPE`.
+
+        Returns:
+            (np.ndarray): complex spectra of half as many bins as slices have samples, along the last axis.
+        """
+        float_type, complex_type = DSPToolbox.float_types(dtype)
+        length = frames.shape[-1]
+        spectra = rfft(window.process(frames, float_type) / window.coherent_gain, axis=-1)[..., :length // 2]
+        spectra = spectra.astype(complex_type, copy=False)
+
+        # Same scaling as `fft`: relative to the slice length, doubled to account for the cut-off negative
+        # frequencies, except for the 0-frequency which has no alias
+        spectra *= 2 / length
+        spectra[..., 0] /= 2
+        return spectra
+
+    @staticmethod
+    def stft_blocks(sample, window=None, size=default.SPECTROGRAM_SIZE, block_frames=1024, dtype=None):
+        """
+        Computes the spectra of all slices of the input sample, in consecutive batches. See `stft`.
+
+        Args:
+            sample (Sample): the input sample.
+            window (Window): the window with which to process slices.
+            size (int): the number of frequency bins to keep - half the size of slices.
+            block_frames (int): number of slices per batch.
+            dtype (np.dtype): float type to compute with.
+
+        Yields:
+            (int, np.ndarray): index of the first slice of the batch, and complex spectra of the batch.
+        """
+        n_frames = DSPToolbox.frame_count(sample, size)
+        for start in range(0, n_frames, block_frames):
+            yield start, DSPToolbox.stft(sample, window, size, start, min(start + block_frames, n_frames), dtype)
+
+    @staticmethod
+    def hop_size(size):
+        """
+        Returns:
+            (float): the number of samples between the starts of two consecutive slices of a spectrogram.
+        """
+        return 2 * size - size / 2
+
+    @staticmethod
+    def frame_count(sample, size):
+        """
+        Returns:
+            (int): the number of slices in the spectrogram of the input sample.
+        """
+        return int(math.ceil(len(sample.wave) / DSPToolbox.hop_size(size)))
+
+    @staticmethod
+    def float_types(dtype=None):
+        """
+        Resolves the `dtype` argument of processing functions, so that other processors follow the same rules.
+
+        Args:
+            dtype (np.dtype): requested float type, np.float32 or np.float64, other types raising a ValueError.
+                `default.FLOAT_TYPE` if None.
+
+        Returns:
+            (np.dtype, np.dtype): the float type to process with and its complex counterpart.
+        """
+        float_type = np.dtype(default.FLOAT_TYPE if dtype is None else dtype)
+        if float_type not in (np.float32, np.float64):
+            raise ValueError('DSPToolbox.float_types: unsupported float type {}, use np.float32 or np.float64.'.format(float_type))
+
+        return float_type, np.result_type(float_type, np.complex64)
+
+    @staticmethod
+    def _matrix_spectrogram(amp, phase, size, sample, window):
+        """
+        Wraps amplitude and phase matrices into a spectrogram whose slices are built from matrix rows on first access,
+        then kept like those of a list.
+        """
+        # Slices only need the format of the sample, so the spectrogram does not keep its wave alive
+        sample_format = Sample(np.empty(0), sample.sample_rate, sample.sample_width)
+        slice_from_matrix = partial(_slice_from_matrix, amp, phase, size, sample_format, window)
+        fft_slices = LazyFrames(len(amp), slice_from_matrix)
+        return Spectrogram(fft_slices, size, DSPToolbox._spectrogram_metadata(sample, window),
+                           hop_size=DSPToolbox.hop_size(size), amp_matrix=amp, phase_matrix=phase)
+
+    @staticmethod
+    def slice_from_matrix(amp, phase, size, sample, window, index):
+        """
+        Builds one slice of a spectrogram from its amplitude and phase matrices, as `fft` would have returned it.
+
+        Args:
+            amp (np.ndarray): amplitude spectra of the slices as a (slices x bins) array.
+            phase (np.ndarray): phase spectra of the slices as a (slices x bins) array.
+            size (int): the size of the spectrogram - half the size of slices.
+            sample (Sample): the analysed sample. Only its format is used.
+            window (Window): the window the sample was analysed with.
+            index (int): index of the slice.
+
+        Returns:
+            (FFTResult): the slice.
+        """
+        return DSPToolbox.fft_result(amp[index], phase[index], 2 * size, sample, window)
+
+    @staticmethod
+    def _spectrogram_metadata(sample, window):
+        return {
             'sampling_frequency': sample.sample_rate,
             'window_type': type(window)
         }
 
-        return Spectrogram(fft_slices, size, metadata)
-
     @staticmethod
-    def sample_from_spectrogram(spectrogram):
+    def sample_from_spectrogram(spectrogram, dtype=None):
         """
-        Restores a sample from the input spectrogram
+        Restores a sample from the input spectrogram, using its amplitude and phase matrices. See `istft`.
 
         Args:
             spectrogram (Spectrogram): the input spectrogram
+            dtype (np.dtype): float type to compute with. Defaults to single precision for spectrograms stored in
+                single precision, and to `default.FLOAT_TYPE` otherwise.
 
         Returns:
             Sample: the restored sample
         """
+        amp = spectrogram.amp_matrix
+        if dtype is None and amp.dtype == np.float32:
+            dtype = np.float32
+        float_type, complex_type = DSPToolbox.float_types(dtype)
 
-        overlap = int(spectrogram.overlap)
-        wave = []
-        for i, slice in enumerate(spectrogram.fft_slices):
-            # Restore spectrum info in the same format as it came out of numpy
-            amp_array = slice.amp_spectrum / 2
-            amp_array[0] *= 2
-
-            sample_count = 2 * len(amp_array)
-            amp_array *= sample_count
-
-            # Append 0-axis symmetrical image of amp spectrum (frequency aliases)
-            amp_array = np.concatenate((amp_array, list(reversed(amp_array))))
-            # Remove duplicate 0-frequency
-            amp_array = amp_array[:-1]
-
-            # Restore phase spectrum
-            phase_array = slice.phase_spectrum
-            # Get 0-axis symmetrical image of phase spectrum
-            reversed_phase_array = list(reversed(phase_array))
-            # Remove duplicate 0-phase
-            reversed_phase_array = np.array(reversed_phase_array[:-1])
-            # Multiply by -1 to get symmetry around 0
-            reversed_phase_array = reversed_phase_array * (-1)
-            # Append to phase spectrum
-            phase_array = np.concatenate((phase_array, reversed_phase_array))
-
-            complex_array = 1j * phase_array
-            complex_array += amp_array
-            wave_slice = ifft(complex_array)
-            list_slice = deepcopy(np.abs(wave_slice).tolist())
-
-            if not wave:
-                wave = list_slice
-            elif len(wave) <= overlap:
-                wave.extend(list_slice)
-            else:
-                wave = wave[:-overlap]
-                wave.extend(list_slice)
+        spectra = np.exp(1j * spectrogram.phase_matrix.astype(float_type, copy=False)).astype(complex_type, copy=False)
+        spectra *= amp
+        window = spectrogram.metadata['window_type']()
+        wave = DSPToolbox.istft(spectra, window, dtype=float_type)
 
         reference_level = spectrogram.fft_slices[0].reference_level
         sample_width = ((int(reference_level).bit_length() - 1) // 8) + 1
 
-        wave = list(map(lambda x: x - reference_level, wave))
-
         return Sample(wave, spectrogram.metadata['sampling_frequency'], sample_width)
 
+    @staticmethod
+    def istft(spectra, window=None, length=None, dtype=None, eps=1e-3):
+        """
+        Restores a wave from complex spectra as computed by `stft`.
+        Slices are restored by inverse FFT, weighted by the window once more and added together, and the sum is divided
+        by the sum of the squared window factors: this least-squares overlap-add undoes windowing wherever slices
+        overlap. The Nyquist frequency, which `stft` leaves out, is restored as 0.
+
+        Args:
+            spectra (np.ndarray): complex spectra of consecutive slices, as a (slices x bins) array, or
+                (channels x slices x bins) for multichannel waves.
+            window (Window): the window with which slices were processed.
+            length (int): number of samples to restore. All samples covered by slices if None.
+            dtype (np.dtype): float type to compute with. Defaults to single precision for complex64 spectra, and to
+                `default.FLOAT_TYPE` otherwise.
+            eps (float): lower bound of the sum of squared window factors, relative to the maximum squared factor,
+                below which samples are attenuated rather than amplified. This avoids blowing up samples at the edges
+                of slices.
+
+        Returns:
+            (np.ndarray): the restored wave, of shape (samples) or (samples x channels).
+        """
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+        if not isinstance(window, Window):
+            raise TypeError('DSPToolbox.istft: passed window is not a valid window.')
+
+        spectra = np.asarray(spectra)
+        if dtype is None and spectra.dtype == np.complex64:
+            dtype = np.float32
+        float_type, complex_type = DSPToolbox.float_types(dtype)
+
+        size = spectra.shape[-1]
+        slice_length = 2 * size
+        n_frames = spectra.shape[-2]
+        starts = (np.arange(n_frames) * DSPToolbox.hop_size(size)).astype(int)
+        total = starts[-1] + slice_length if n_frames else 0
+
+        frames, factors = DSPToolbox.inverse_frames(spectra, window, float_type)
+
+        wave = np.zeros(spectra.shape[:-2] + (total,), float_type)
+        weights = np.zeros(total, float_type)
+        indices = starts[:, np.newaxis] + np.arange(slice_length)
+        # Slices two apart never overlap since the hop is at least half the slice length, so that each pass adds
+        # to distinct samples only
+        for parity in (0, 1):
+            wave[..., indices[parity::2]] += frames[..., parity::2, :]
+            weights[indices[parity::2]] += np.square(factors)
+
+        wave /= np.maximum(weights, eps * np.square(factors).max())
+        if length is not None:
+            if length > total:
+                wave = np.concatenate((wave, np.zeros(wave.shape[:-1] + (length - total,), float_type)), axis=-1)
+            wave = wave[..., :length]
+
+        return wave.T if wave.ndim == 2 else wave
+
+    @staticmethod
+    def inverse_frames(spectra, window, dtype=None):
+        """
+        Restores slices from their spectra as computed by `stft`, weighted by the window once more for least-squares
+        overlap-add. Slices are not added together: see `istft`, or `StreamingISTFT` for a wave restored block by block.
+
+        Args:
+            spectra (np.ndarray): complex spectra of slices along the last axis, e.g. a (slices x bins) array.
+            window (Window): the window with which slices were processed.
+            dtype (np.dtype): float type to compute with. Defaults to `default.FLOAT_TYPE`.
+
+        Returns:
+            (np.ndarray, np.ndarray): the weighted slices, of twice as many samples as spectra have bins, along the
+                last axis, and the window factors.
+        """
+        float_type, complex_type = DSPToolbox.float_types(dtype)
+        size = spectra.shape[-1]
+        slice_length = 2 * size
+
+        # Undo the scaling of `stft`
+        full = np.zeros(spectra.shape[:-1] + (size + 1,), complex_type)
+        full[..., :size] = spectra
+        full *= slice_length / 2 * window.coherent_gain
+        full[..., 0] *= 2
+        frames = irfft(full, slice_length, axis=-1).astype(float_type, copy=False)
+
+        factors = window.scaling_factors(slice_length, float_type)
+        frames *= factors
+        return frames, factors
+
     @staticmethod
     def image_from_spectrogram(spectrogram):
-        w, h = len(spectrogram.fft_slices), spectrogram.fft_size
-        im = Image.new('L', (w, h))
-        for i, slice in enumerate(spectrogram.fft_slices):
-            for j, amp in enumerate(slice.amp_spectrum):
-                val = int((amp / slice.reference_level) * 255)
-                im.putpixel((i, h - j - 1), val)
+        """
+        Renders the input spectrogram in grey, amplitudes relative to the reference level being scaled linearly to 8
+        bits. The whole amplitude matrix is quantised at once.
+
+        Args:
+            spectrogram (Spectrogram): the input spectrogram.
+
+        Returns:
+            SpectrogramImage: the rendered image.
+        """
+        reference_level = spectrogram.fft_slices[0].reference_level
+
+        # Bins vertically with highest frequencies on top, slices horizontally; values are truncated like int() does
+        values = np.multiply(spectrogram.amp_matrix.T[::-1], 255 / reference_level, dtype=np.float64)
+        np.clip(values, 0, 255, out=values)
+        im = Image.fromarray(values.astype(np.uint8))
 
         metadata = spectrogram.metadata
         metadata['reference_level'] = spectrogram.fft_slices[0].reference_level
         return SpectrogramImage(im, metadata)
 
     @staticmethod
-    def spectrogram_from_image(image):
+    def db_image_from_spectrogram(spectrogram, colormap='magma', floor_db=-100., ceiling_db=0., mode='RGB'):
+        """
+        Renders the input spectrogram in decibels through a colormap.
+        The whole spectrogram is converted at once: decibel scaling, quantisation to 8-bit indices and a table lookup.
+
+        Args:
+            spectrogram (Spectrogram): the input spectrogram.
+            colormap (str or Colormap): the colormap to render with.
+            floor_db (float): level, relative to the reference level, mapped to the first colour of the colormap.
+                Quieter content is clipped to it.
+            ceiling_db (float): level, relative to the reference level, mapped to the last colour of the colormap.
+            mode (str): 'RGB' for a true-colour image, 'P' for a palette image.
+
+        Returns:
+            SpectrogramImage: the rendered image.
+        """
+        if mode not in ('RGB', 'P'):
+            raise ValueError('DSPToolbox.db_image_from_spectrogram: unsupported image mode `{}`.'.format(mode))
+
+        cmap = Colormap.get(colormap)
+        reference_level = spectrogram.fft_slices[0].reference_level
+
+        # Bins vertically with highest frequencies on top, slices horizontally
+        indices = DSPToolbox.quantise_db(spectrogram.amp_matrix.T[::-1], reference_level, floor_db, ceiling_db)
+
+        if mode == 'P':
+            im = Image.fromarray(indices)
+            im.putpalette(cmap.palette())
+        else:
+            im = Image.fromarray(cmap.apply(indices))
+
+        metadata = dict(spectrogram.metadata)
+        metadata['reference_level'] = reference_level
+        metadata['amplitude_scale'] = 'db'
+        metadata['floor_db'] = floor_db
+        metadata['ceiling_db'] = ceiling_db
+        metadata['colormap'] = cmap.name
+        return SpectrogramImage(im, metadata)
+
+    @staticmethod
+    def quantise_db(levels, reference, floor_db=-100., ceiling_db=0.):
+        """
+        Converts amplitudes to decibels and quantises them to 8-bit indices.
+
+        Args:
+            levels (np.ndarray): amplitudes to convert.
+            reference (float): reference amplitude (0 dB).
+            floor_db (float): level mapped to index 0. Quieter amplitudes are clipped to it.
+            ceiling_db (float): level mapped to index 255. Louder amplitudes are clipped to it.
+
+        Returns:
+            (np.ndarray): array of np.uint8 indices with the shape of `levels`.
+        """
+        if ceiling_db <= floor_db:
+            raise ValueError('DSPToolbox.quantise_db: `ceiling_db` must be greater than `floor_db`.')
+
+        # All steps work in place on a single float32 buffer
+        scaled = DSPToolbox.to_db(levels, reference, floor_db=floor_db, dtype=np.float32)
+        np.subtract(scaled, floor_db, out=scaled)
+        np.multiply(scaled, 255 / (ceiling_db - floor_db), out=scaled)
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, 0, 255, out=scaled)
+
+        return scaled.astype(np.uint8)
+
+    @staticmethod
+    def spectrogram_from_image(image, phase_iterations=32, momentum=0.99):
         """
         Generates a spectrogram from an image.
+        Images only hold amplitudes: phases are estimated with `griffin_lim`.
+        Grey images are read as linear amplitudes, see `image_from_spectrogram`, and images in decibels through the
+        quantisation and colormap recorded in their metadata, see `db_image_from_spectrogram`.
 
         Args:
             image (SpectrogramImage): input image.
-            reference_level (int): maximum sample value.
+            phase_iterations (int): maximum number of iterations of phase reconstruction. Phases are left to 0 if 0.
+            momentum (float): momentum of phase reconstruction. See `griffin_lim`.
 
         Returns:
             Spectrogram: output spectrogram.
@@ -169,17 +547,36 @@ class DSPToolbox:
         sample_rate = meta['sampling_frequency']
         nyquist = sample_rate / 2
 
-        n_slices, fft_size = im.size
+        # Columns are slices, with low frequencies at the bottom
+        if meta.get('amplitude_scale') == 'db':
+            if im.mode == 'P':
+                indices = np.asarray(im)
+            elif im.mode == 'RGB':
+                indices = Colormap.get(meta['colormap']).indices(np.asarray(im))
+            else:
+                raise ValueError('DSPToolbox.spectrogram_from_image: unsupported mode `{}` for an image in decibels.'
+                                 .format(im.mode))
+
+            floor_db, ceiling_db = meta['floor_db'], meta['ceiling_db']
+            dbs = floor_db + indices[::-1].T * ((ceiling_db - floor_db) / 255)
+            amp_matrix = DSPToolbox.to_level(dbs, reference_level)
+        elif im.mode == 'L':
+            amp_matrix = np.asarray(im, dtype=float)[::-1].T * (reference_level / 255)
+        else:
+            raise ValueError('DSPToolbox.spectrogram_from_image: unsupported mode `{}` for a linear grey image.'
+                             .format(im.mode))
+        n_slices, fft_size = amp_matrix.shape
+
+        if phase_iterations:
+            phase_matrix, _ = DSPToolbox.griffin_lim(amp_matrix, meta['window_type'](), phase_iterations, momentum)
+        else:
+            phase_matrix = np.zeros(amp_matrix.shape)
+
         fft_slices = []
         for i in range(n_slices):
-            slice_values = []
-            for j in range(fft_size):
-                val = im.getpixel((i, fft_size - j - 1))
-                level = (float(val) / 255) * reference_level
-                slice_values.append(level)
-            fft_amp = np.array(slice_values)
-
-            # Restore further information from restored fft
+            fft_amp = amp_matrix[i]
+
+            # Restore further information from restored fft
             fft_rms = fft_amp * np.sqrt(2)
             fft_rms[0] /= np.sqrt(2)
             fft_pow = np.square(fft_rms)
@@ -188,8 +585,7 @@ class DSPToolbox:
             bin_spac = sample_rate / sample_count
             max_freq = nyquist - bin_spac
 
-            # TODO: restore phase properly
-            fft_phase = np.array([0] * len(fft_amp))
+            fft_phase = phase_matrix[i]
 
             fft_dict = {
                 'frequency_bins': fft_bins,
@@ -214,35 +610,93 @@ class DSPToolbox:
             'sampling_frequency': sample_rate,
             'window_type': meta['window_type']
         }
-        return Spectrogram(fft_slices, fft_size, metadata)
+        return Spectrogram(fft_slices, fft_size, metadata, hop_size=DSPToolbox.hop_size(fft_size),
+                           amp_matrix=amp_matrix, phase_matrix=phase_matrix)
 
     @staticmethod
-    def fft(sample, window=None):
+    def griffin_lim(amp, window=None, iterations=32, momentum=0.99, tolerance=None, phase=None, dtype=None):
+        """
+        Estimates phase spectra matching amplitude spectra, so that a wave can be restored from amplitudes alone.
+        Every iteration restores a wave from the amplitudes and the current phases with `istft`, then takes the phases
+        of its spectra from `stft`, both over the whole matrix at once. With a momentum, the fast Griffin-Lim
+        algorithm extrapolates phases from one iteration to the next, which converges in far fewer iterations.
+
+        Args:
+            amp (np.ndarray): amplitude spectra, as a (slices x bins) array or (channels x slices x bins).
+            window (Window): the window with which the spectra were computed.
+            iterations (int): maximum number of iterations.
+            momentum (float): extrapolation factor of the fast algorithm, usually 0.99. 0 gives the original
+                Griffin-Lim algorithm.
+            tolerance (float): spectral convergence at which to stop early. Runs all iterations if None.
+            phase (np.ndarray): initial phase spectra. Starts from zero phases if None.
+            dtype (np.dtype): float type to compute with. Defaults to the type of single-precision amplitudes, and
+                to `default.FLOAT_TYPE` otherwise.
+
+        Returns:
+            (np.ndarray, list of float): estimated phase spectra, and spectral convergence after every iteration: the
+                norm of the difference between the given amplitudes and those of the spectra of the restored wave,
+                relative to the norm of the given amplitudes.
+        """
         # Instantiate a default window if none provided
         if not window:
             window = default.WindowClass()
+        if iterations < 1:
+            raise ValueError('DSPToolbox.griffin_lim: `iterations` must be at least 1.')
 
-        # This is to cut the second half of the spectrum (aliases above the Nyquist freq or negative freqs)
-        # This is half the length of the input wave since the length of numpy's fft happens to be exactly that.
-        max_index = int(math.ceil(len(sample.wave) / 2))
-        max_value = 1 << (sample.bit_depth - 1)
+        amp = np.asarray(amp)
+        if dtype is None and amp.dtype == np.float32:
+            dtype = np.float32
+        float_type, complex_type = DSPToolbox.float_types(dtype)
+        amp = amp.astype(float_type, copy=False)
+        size = amp.shape[-1]
+        n_frames = amp.shape[-2]
 
-        # Compute frequency bins with spacing according to the sampling rate (in most cases 44.1kHz)
-        fft_bins = fftfreq(len(sample.wave), 1.0 / sample.sample_rate)
-        fft_bins = fft_bins[:max_index]
-        # Shortcuts for later
-        nyquist = sample.sample_rate / 2
-        bin_spac = sample.sample_rate / len(sample.wave)
-        max_freq = nyquist - bin_spac
+        if phase is None:
+            angles = np.ones(amp.shape, complex_type)
+        else:
+            angles = np.exp(1j * np.asarray(phase, float_type)).astype(complex_type, copy=False)
+
+        norm = max(np.linalg.norm(amp), np.finfo(float_type).tiny)
+        rebuilt = np.zeros(amp.shape, complex_type)
+        convergence = []
+        for _ in range(iterations):
+            previous = rebuilt
+            wave = DSPToolbox.istft(amp * angles, window, dtype=float_type)
+            rebuilt = DSPToolbox.stft(Sample(wave, default.SAMPLING_FREQUENCY, 2), window, size, 0, n_frames,
+                                      float_type)
+
+            convergence.append(float(np.linalg.norm(np.abs(rebuilt) - amp) / norm))
+
+            angles = rebuilt - (momentum / (1 + momentum)) * previous
+            angles /= np.maximum(np.abs(angles), np.finfo(float_type).tiny)
+
+            if tolerance is not None and convergence[-1] <= tolerance:
+                break
+
+        return np.angle(angles), convergence
+
+    @staticmethod
+    def fft(sample, window=None, dtype=None):
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
 
         if not isinstance(window, Window):
             raise TypeError('DSPToolbox.fft: passed window is not a valid window.')
+        if sample.channels > 1:
+            raise ValueError('DSPToolbox.fft: sample has {} channels, pick a channel or a downmix of it.'.format(sample.channels))
+
+        # This is to cut the second half of the spectrum (aliases above the Nyquist freq or negative freqs)
+        # This is half the length of the input wave since the length of numpy's fft happens to be exactly that.
+        max_index = int(math.ceil(len(sample.wave) / 2))
+
+        float_type, complex_type = DSPToolbox.float_types(dtype)
 
         # Window the sample
-        wave = window.process(sample.wave) / window.coherent_gain
+        wave = window.process(np.asarray(sample.wave, float_type), float_type) / window.coherent_gain
 
-        # Compute frequency coefficients
-        fft_y = fft(wave)
+        # Compute frequency coefficients. The real FFT skips the negative frequencies altogether
+        fft_y = rfft(wave).astype(complex_type, copy=False)
         # Cut off half of the spectrum
         fft_y = fft_y[:max_index]
 
@@ -260,9 +714,36 @@ class DSPToolbox:
         # The DC offset should be 0 so there would theoretically be no need for that, but we do it just to make sure
         fft_amp[0] /= 2
 
+        return DSPToolbox.fft_result(fft_amp, fft_phase, len(sample.wave), sample, window)
+
+    @staticmethod
+    def fft_result(fft_amp, fft_phase, sample_count, sample, window):
+        """
+        Wraps amplitude and phase spectra into an FFTResult, as returned by `fft`.
+
+        Args:
+            fft_amp (np.ndarray): amplitude spectrum, scaled like `fft` does.
+            fft_phase (np.ndarray): phase spectrum in radians.
+            sample_count (int): number of samples the spectra were computed from, which sets the bin spacing.
+            sample (Sample): the analysed sample. Only its sampling frequency and sample width are used.
+            window (Window): the window the sample was analysed with.
+
+        Returns:
+            (FFTResult): the wrapped spectra.
+        """
+        max_value = 1 << (sample.bit_depth - 1)
+
+        # Compute frequency bins with spacing according to the sampling rate (in most cases 44.1kHz)
+        fft_bins = fftfreq(sample_count, 1.0 / sample.sample_rate)
+        fft_bins = fft_bins[:len(fft_amp)]
+        # Shortcuts for later
+        nyquist = sample.sample_rate / 2
+        bin_spac = sample.sample_rate / sample_count
+        max_freq = nyquist - bin_spac
+
         # The RMS amplitude spectrum can be useful for certain computations
-        fft_rms = fft_amp * np.sqrt(2)
-        fft_rms[0] /= np.sqrt(2)
+        fft_rms = fft_amp * math.sqrt(2)
+        fft_rms[0] /= math.sqrt(2)
         # The power spectrum too
         fft_pow = np.square(fft_rms)
 
@@ -284,37 +765,107 @@ class DSPToolbox:
         return FFTResult(**fft_dict)
 
     @staticmethod
-    def to_db(levels, reference, square=True):
-        factor = 20
-        if not square:
-            factor = 10
+    def to_db(levels, reference, square=True, floor_db=None, out=None, dtype=None):
+        """
+        Converts levels to decibels relative to a reference level.
+
+        Args:
+            levels (np.ndarray or list or float): levels to convert.
+            reference (float): reference level (0 dB).
+            square (bool): whether levels are amplitudes (20 dB per decade) rather than powers (10 dB per decade).
+            floor_db (float): lowest level to return. Levels below it, zeros included, are clipped to it rather than
+                giving -inf. Levels are not clipped if None.
+            out (np.ndarray): array to write the result to. May be `levels` itself to convert in place.
+            dtype (np.dtype): float type of the result if `out` is not given, e.g. np.float32 to halve memory traffic.
+                Defaults to the float type of `levels`, or np.float64.
+
+        Returns:
+            levels in decibels: a list for a list, otherwise an array (`out` if given) or a scalar.
+        """
+        factor = 20 if square else 10
+        values, result = DSPToolbox._conversion_buffers(levels, out, dtype)
 
-        if isinstance(levels, list):
-            return list(map(lambda x: factor * np.log10(x / reference), levels))
+        if floor_db is not None:
+            np.maximum(values, reference * (10 ** (floor_db / factor)), out=result)
+            values = result
+        np.divide(values, reference, out=result)
+        np.log10(result, out=result)
+        np.multiply(result, factor, out=result)
 
-        return factor * np.log10(levels / reference)
+        return DSPToolbox._conversion_result(levels, out, result)
 
     @staticmethod
-    def to_level(dbs, reference, unsquare=True):
-        divisor = 20
-        if not unsquare:
-            divisor = 10
+    def to_level(dbs, reference, unsquare=True, out=None, dtype=None):
+        """
+        Converts decibels relative to a reference level back to levels, in the unit of the reference. Inverse of
+        `to_db`: 0 dB gives back the reference level itself.
 
-        if isinstance(dbs, list):
-            return list(map(lambda x: (10 ** (x / divisor)) / reference, dbs))
+        Args:
+            dbs (np.ndarray or list or float): decibels to convert.
+            reference (float): reference level (0 dB).
+            unsquare (bool): whether to return amplitudes (20 dB per decade) rather than powers (10 dB per decade).
+            out (np.ndarray): array to write the result to. May be `dbs` itself to convert in place.
+            dtype (np.dtype): float type of the result if `out` is not given. See `to_db`.
 
-        return (10 ** (dbs / divisor)) / reference
+        Returns:
+            levels: a list for a list, otherwise an array (`out` if given) or a scalar.
+        """
+        divisor = 20 if unsquare else 10
+        values, result = DSPToolbox._conversion_buffers(dbs, out, dtype)
+
+        np.divide(values, divisor, out=result)
+        np.power(10., result, out=result)
+        np.multiply(result, reference, out=result)
+
+        return DSPToolbox._conversion_result(dbs, out, result)
 
     @staticmethod
-    def to_deg(radians):
-        if isinstance(radians, list):
-            return list(map(lambda x: x * 180 / np.pi, radians))
+    def to_deg(radians, out=None, dtype=None):
+        """
+        Converts angles from radians to degrees. See `to_db` for `out` and `dtype`.
+        """
+        values, result = DSPToolbox._conversion_buffers(radians, out, dtype)
+        np.degrees(values, out=result)
+        return DSPToolbox._conversion_result(radians, out, result)
 
-        return radians * 180 / np.pi
+    @staticmethod
+    def to_rad(degrees, out=None, dtype=None):
+        """
+        Converts angles from degrees to radians. See `to_db` for `out` and `dtype`.
+        """
+        values, result = DSPToolbox._conversion_buffers(degrees, out, dtype)
+        np.radians(values, out=result)
+        return DSPToolbox._conversion_result(degrees, out, result)
 
     @staticmethod
-    def to_rad(degrees):
-        if isinstance(degrees, list):
-            return list(map(lambda x: x * np.pi / 180, degrees))
+    def _conversion_buffers(values, out, dtype):
+        """
+        Returns the input of a unit conversion as an array, and the float array to write its result to.
+        """
+        values = np.asarray(values)
+        if out is not None:
+            return values, out
+
+        if dtype is None:
+            dtype = values.dtype if values.dtype.kind == 'f' else np.float64
+        return values, np.empty(values.shape, dtype)
+
+    @staticmethod
+    def _conversion_result(values, out, result):
+        """
+        Returns the result of a unit conversion in the same form as its input.
+        """
+        if isinstance(values, list):
+            return result.tolist()
+        if out is None and result.ndim == 0:
+            return result[()]
+        return result
+
+# Slice builders of lazy spectrograms are module-level functions so that spectrograms can be pickled
+
+def _slice_from_sample(sample, window, size, dtype, k):
+    spectrum = DSPToolbox.stft(sample, window, size, k, k + 1, dtype)[0]
+    return DSPToolbox.fft_result(np.abs(spectrum), np.angle(spectrum), 2 * size, sample, window)
 
-        return degrees * np.pi / 180
+def _slice_from_matrix(amp, phase, size, sample, window, k):
+    return DSPToolbox.slice_from_matrix(amp, phase, size, sample, window, k)
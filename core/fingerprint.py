@@ -0,0 +1,316 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from core.dsp_toolbox import DSPToolbox
+from core.resampler import Resampler
+
+class Fingerprinter:
+    """
+    Extracts landmarks from samples, for recognising recordings from excerpts.
+    Constellation peaks are the bins of the spectrogram of the sample which are the loudest of their neighbourhood in
+    time and frequency. Every peak is paired with the next few peaks of a target zone following it, and each pair is
+    packed into an integer hash of the frequency bins of both peaks and of their distance in slices. Hashes do not
+    depend on the position of the pair in the recording, which is kept aside as the time of the landmark.
+    """
+
+    def __init__(self, sample_rate=11025, size=256, neighbourhood=(3, 8), floor_db=-60., peaks_per_frame=5,
+                 fan_out=5, max_distance=(32, 64)):
+        """
+        Args:
+            sample_rate (int): sampling frequency samples are resampled to before analysis. None to analyse samples at
+                their own rate, in which case all samples of an index must share it.
+            size (int): number of frequency bins of spectrograms - half the size of slices.
+            neighbourhood (tuple): half-extent in slices and in bins of the area a peak must dominate.
+            floor_db (float): level below the loudest bin of the sample, in dB, under which bins are not peaks.
+            peaks_per_frame (int): maximum number of peaks per slice, keeping the loudest.
+            fan_out (int): maximum number of peaks each peak is paired with.
+            max_distance (tuple): maximum distance in slices and in bins from a peak to the peaks it is paired with.
+        """
+        self.sample_rate = sample_rate
+        self.size = size
+        self.neighbourhood = tuple(neighbourhood)
+        self.floor_db = floor_db
+        self.peaks_per_frame = peaks_per_frame
+        self.fan_out = fan_out
+        self.max_distance = tuple(max_distance)
+
+        # Bits of the frequency bins of both peaks, then of their distance in slices
+        self._bin_bits = int(size - 1).bit_length()
+        self._distance_bits = int(self.max_distance[0]).bit_length()
+        if 2 * self._bin_bits + self._distance_bits > 32:
+            raise ValueError('Fingerprinter.__init__: hashes do not fit in 32 bits, reduce `size` or `max_distance`.')
+
+    @property
+    def parameters(self):
+        """
+        Returns:
+            (dict): the arguments of the fingerprinter, which landmarks compared with each other must share.
+        """
+        return {'sample_rate': self.sample_rate, 'size': self.size, 'neighbourhood': list(self.neighbourhood),
+                'floor_db': self.floor_db, 'peaks_per_frame': self.peaks_per_frame, 'fan_out': self.fan_out,
+                'max_distance': list(self.max_distance)}
+
+    def hop_duration(self, sample_rate=None):
+        """
+        Returns:
+            (float): the duration in seconds of the step between slices, in which landmark times are counted.
+        """
+        return DSPToolbox.hop_size(self.size) / (self.sample_rate or sample_rate)
+
+    def peaks(self, sample):
+        """
+        Finds the constellation peaks of a sample.
+
+        Args:
+            sample (Sample): the sample to analyse. Multichannel samples are downmixed.
+
+        Returns:
+            (np.ndarray, np.ndarray): slice and bin of every peak, sorted by slice then bin.
+        """
+        if sample.channels > 1:
+            sample = sample.downmix()
+        if self.sample_rate and sample.sample_rate != self.sample_rate:
+            sample = Resampler.resample(sample, self.sample_rate)
+
+        spectrogram = DSPToolbox.spectrogram_from_sample(sample, size=self.size, dtype=np.float32)
+        db = 20 * np.log10(np.maximum(spectrogram.amp_matrix, np.finfo(np.float32).tiny))
+        if not db.size:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+        # Maximum over the neighbourhood of every bin, one axis at a time
+        dominant = db
+        for axis, extent in enumerate(self.neighbourhood):
+            dominant = self._sliding_max(dominant, extent, axis)
+        is_peak = (db == dominant) & (db > db.max() + self.floor_db)
+
+        frames, bins = np.nonzero(is_peak)
+        if self.peaks_per_frame is not None:
+            # Rank peaks by decreasing level within their slice, then restore the order
+            order = np.lexsort((-db[frames, bins], frames))
+            starts = np.searchsorted(frames[order], frames[order])
+            kept = np.sort(order[np.arange(len(order)) - starts < self.peaks_per_frame])
+            frames, bins = frames[kept], bins[kept]
+        return frames, bins
+
+    def landmarks(self, sample):
+        """
+        Pairs the constellation peaks of a sample into landmarks.
+
+        Args:
+            sample (Sample): the sample to analyse.
+
+        Returns:
+            (np.ndarray, np.ndarray): hash and slice of the first peak of every landmark.
+        """
+        frames, bins = self.peaks(sample)
+        n_peaks = len(frames)
+        max_frames, max_bins = self.max_distance
+
+        # Peaks are sorted by slice, so that the targets of each peak follow it, starting in the next slice; look
+        # through a bounded number of candidates after the first one
+        first_target = np.searchsorted(frames, frames + 1)
+        candidates = first_target[:, np.newaxis] + np.arange(self.fan_out * 4)
+        valid = candidates < n_peaks
+        candidates = np.minimum(candidates, max(n_peaks - 1, 0))
+        distances = frames[candidates] - frames[:, np.newaxis]
+        valid &= (distances <= max_frames) & (np.abs(bins[candidates] - bins[:, np.newaxis]) <= max_bins)
+        valid &= np.cumsum(valid, axis=1) <= self.fan_out
+
+        anchors, targets = np.nonzero(valid)
+        targets = candidates[anchors, targets]
+        hashes = (bins[anchors].astype(np.uint32) << (self._bin_bits + self._distance_bits)) | \
+                 (bins[targets].astype(np.uint32) << self._distance_bits) | \
+                 (frames[targets] - frames[anchors]).astype(np.uint32)
+        return hashes, frames[anchors].astype(np.int32)
+
+    @staticmethod
+    def _sliding_max(values, extent, axis):
+        """
+        Maximum of every value and of its `extent` neighbours on either side along an axis.
+        """
+        result = values.copy()
+        length = values.shape[axis]
+        for shift in range(1, min(extent, length - 1) + 1):
+            ahead = [slice(None)] * values.ndim
+            behind = [slice(None)] * values.ndim
+            ahead[axis], behind[axis] = slice(shift, None), slice(None, -shift)
+            np.maximum(result[tuple(behind)], values[tuple(ahead)], out=result[tuple(behind)])
+            np.maximum(result[tuple(ahead)], values[tuple(behind)], out=result[tuple(ahead)])
+        return result
+
+
+class FingerprintIndex:
+    """
+    Inverted index from landmark hashes to the recordings and times where they occur.
+    Postings are kept sorted by hash in flat arrays, with the start of the postings of every hash, like a compressed
+    sparse row matrix; new recordings are merged in on the next query. Indexes are saved as a folder of arrays, which
+    are memory-mapped when loaded so that large libraries are not read into memory.
+    Queries look up all hashes of an excerpt at once, and vote for the time offset between the excerpt and every
+    recording sharing hashes with it: matching recordings gather many votes on a single offset.
+    """
+
+    def __init__(self, fingerprinter=None):
+        """
+        Args:
+            fingerprinter (Fingerprinter): extracts the landmarks of recordings and excerpts. Default one if None.
+        """
+        self.fingerprinter = fingerprinter or Fingerprinter()
+        self.names = []
+        self.sample_rates = []
+        self._keys = np.zeros(0, np.uint32)
+        self._offsets = np.zeros(1, np.int64)
+        self._tracks = np.zeros(0, np.int32)
+        self._times = np.zeros(0, np.int32)
+        self._pending = []
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def landmark_count(self):
+        """
+        Number of landmarks indexed, new recordings included.
+        """
+        return len(self._tracks) + sum(len(hashes) for hashes, _, _ in self._pending)
+
+    def add(self, name, sample):
+        """
+        Adds a recording to the index.
+
+        Args:
+            name (str): name to report the recording by in query results, e.g. its file name.
+            sample (Sample): the recording.
+
+        Returns:
+            (int): the identifier of the recording in the index.
+        """
+        track = len(self.names)
+        hashes, times = self.fingerprinter.landmarks(sample)
+        self.names.append(name)
+        self.sample_rates.append(sample.sample_rate)
+        self._pending.append((hashes, np.full(len(hashes), track, np.int32), times))
+        return track
+
+    def query(self, sample, top=5, min_votes=5):
+        """
+        Finds the recordings an excerpt comes from.
+
+        Args:
+            sample (Sample): the excerpt.
+            top (int): maximum number of matches to return.
+            min_votes (int): minimum number of landmarks agreeing on an offset for a recording to match.
+
+        Returns:
+            (list): (name, votes, offset) of the best matching recordings by decreasing votes, where offset is the
+                time in seconds of the start of the excerpt in the recording.
+        """
+        self._merge()
+        hashes, query_times = self.fingerprinter.landmarks(sample)
+        if not len(hashes) or not len(self._keys):
+            return []
+
+        # Postings of all query hashes, gathered from their ranges in the flat arrays
+        indices = np.minimum(np.searchsorted(self._keys, hashes), len(self._keys) - 1)
+        found = self._keys[indices] == hashes
+        indices, query_times = indices[found], query_times[found]
+        starts, counts = self._offsets[indices], self._offsets[indices + 1] - self._offsets[indices]
+        ends = np.cumsum(counts)
+        positions = np.repeat(starts - (ends - counts), counts) + np.arange(ends[-1] if len(ends) else 0)
+
+        tracks = self._tracks[positions].astype(np.int64)
+        offsets = self._times[positions].astype(np.int64) - np.repeat(query_times, counts)
+
+        # Votes for every (recording, offset) pair, of which the best offset of every recording is kept
+        span = int(np.iinfo(np.int32).max) + 1
+        pairs, votes = np.unique(tracks * 2 * span + (offsets + span), return_counts=True)
+        order = np.argsort(-votes, kind='mergesort')
+        best_tracks, first = np.unique(pairs[order] // (2 * span), return_index=True)
+        best = order[np.sort(first)]
+
+        matches = []
+        for pair, count in zip(pairs[best][:top], votes[best][:top]):
+            if count < min_votes:
+                break
+            track, offset = int(pair // (2 * span)), int(pair % (2 * span) - span)
+            matches.append((self.names[track], int(count),
+                            offset * self.fingerprinter.hop_duration(self.sample_rates[track])))
+        return matches
+
+    def save(self, folder):
+        """
+        Saves the index as a folder of arrays and a description of the index.
+        Every file is written aside then moved over the previous one, so that an index may be saved back to the folder
+        it was memory-mapped from.
+
+        Args:
+            folder (str): the folder to save the index to, created if need be.
+        """
+        self._merge()
+        os.makedirs(folder, exist_ok=True)
+        for name in ('keys', 'offsets', 'tracks', 'times'):
+            FingerprintIndex._replace(os.path.join(folder, name + '.npy'),
+                                      lambda f, array=getattr(self, '_' + name): np.save(f, array))
+
+        description = {'fingerprinter': self.fingerprinter.parameters, 'names': self.names,
+                       'sample_rates': self.sample_rates}
+        FingerprintIndex._replace(os.path.join(folder, 'index.json'),
+                                  lambda f: f.write(json.dumps(description, indent=4).encode('utf-8')))
+
+    @staticmethod
+    def load(folder, mmap=True):
+        """
+        Loads an index saved by `save`.
+
+        Args:
+            folder (str): the folder of the index.
+            mmap (bool): whether to memory-map the arrays of the index rather than reading them into memory.
+
+        Returns:
+            (FingerprintIndex): the index.
+        """
+        with open(os.path.join(folder, 'index.json')) as f:
+            description = json.load(f)
+
+        index = FingerprintIndex(Fingerprinter(**description['fingerprinter']))
+        index.names = description['names']
+        index.sample_rates = description['sample_rates']
+        for name in ('keys', 'offsets', 'tracks', 'times'):
+            setattr(index, '_' + name, np.load(os.path.join(folder, name + '.npy'), mmap_mode='r' if mmap else None))
+        return index
+
+    @staticmethod
+    def _replace(filename, write):
+        """
+        Writes a file through a temporary file in the same folder, moved over the file once complete.
+        """
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(filename) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                write(f)
+            os.replace(temporary, filename)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def _merge(self):
+        """
+        Merges the landmarks of new recordings into the sorted postings.
+        """
+        if not self._pending:
+            return
+
+        counts = np.diff(self._offsets)
+        hashes = np.concatenate([np.repeat(self._keys, counts)] + [p[0] for p in self._pending])
+        tracks = np.concatenate([self._tracks] + [p[1] for p in self._pending])
+        times = np.concatenate([self._times] + [p[2] for p in self._pending])
+        self._pending = []
+
+        order = np.argsort(hashes, kind='mergesort')
+        hashes, self._tracks, self._times = hashes[order], tracks[order], times[order]
+        starts = np.flatnonzero(np.concatenate(([True], hashes[1:] != hashes[:-1]))) if len(hashes) else \
+            np.zeros(0, np.int64)
+        self._keys = hashes[starts]
+        self._offsets = np.concatenate((starts, [len(hashes)])).astype(np.int64)
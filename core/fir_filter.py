@@ -0,0 +1,215 @@
+import math
+
+import numpy as np
+
+from core import default
+from core.dsp_toolbox import DSPToolbox, rfft, irfft
+from core.sample import Sample
+
+class FIRFilter:
+    """
+    Finite impulse response filter, applied by FFT convolution.
+    Whole waves are filtered by overlap-add, and waves coming in blocks are filtered by overlap-save, keeping the end of
+    the previous block as history. Kernels short enough for direct convolution to be faster skip FFTs altogether.
+    The spectrum of the kernel is computed once per FFT size.
+    Filtered waves are causal: they have the length of the input and are delayed by the group delay of the kernel.
+    """
+
+    def __init__(self, taps, fft_size=None, direct_threshold=64, dtype=None):
+        """
+        Args:
+            taps (np.ndarray): coefficients of the kernel.
+            fft_size (int): size of FFTs, which must be at least twice the length of the kernel.
+                Defaults to the power of 2 giving blocks of at least 3 times the length of the kernel.
+            direct_threshold (int): length of kernel up to which direct convolution is used instead of FFTs.
+            dtype (np.dtype): float type to compute with. Defaults to `default.FLOAT_TYPE`.
+        """
+        self.float_type, self.complex_type = DSPToolbox.float_types(dtype)
+        self.taps = np.asarray(taps, self.float_type)
+        if self.taps.ndim != 1 or not len(self.taps):
+            raise ValueError('FIRFilter.__init__: taps must be a non-empty one-dimensional array.')
+
+        n_taps = len(self.taps)
+        if fft_size is None:
+            fft_size = 1 << int(math.ceil(math.log2(4 * n_taps)))
+        if fft_size < 2 * n_taps:
+            raise ValueError('FIRFilter.__init__: `fft_size` must be at least twice the number of taps.')
+
+        self.fft_size = fft_size
+        self.direct = n_taps <= direct_threshold
+        self._spectra = {}
+        self.reset()
+
+    @staticmethod
+    def lowpass(cutoff, sample_rate, n_taps=101, window=None, dtype=None):
+        """
+        Designs a linear-phase low-pass filter by the windowed sinc method.
+
+        Args:
+            cutoff (float): cutoff frequency in Hz, at which the gain is -6 dB.
+            sample_rate (int): sampling frequency of the waves to filter.
+            n_taps (int): length of the kernel. Odd lengths give a whole number of samples of delay.
+            window (Window): the window tapering the sinc. Default window if None.
+            dtype (np.dtype): float type to compute with.
+
+        Returns:
+            (FIRFilter): the filter, with unit gain at 0 Hz.
+        """
+        return FIRFilter(FIRFilter._sinc_taps(cutoff / sample_rate, n_taps, window), dtype=dtype)
+
+    @staticmethod
+    def highpass(cutoff, sample_rate, n_taps=101, window=None, dtype=None):
+        """
+        Designs a linear-phase high-pass filter, by spectral inversion of the matching low-pass filter.
+        See `lowpass` for arguments; `n_taps` must be odd.
+        """
+        if not n_taps % 2:
+            raise ValueError('FIRFilter.highpass: `n_taps` must be odd.')
+
+        taps = -FIRFilter._sinc_taps(cutoff / sample_rate, n_taps, window)
+        taps[n_taps // 2] += 1
+        return FIRFilter(taps, dtype=dtype)
+
+    @staticmethod
+    def _sinc_taps(normalised_cutoff, n_taps, window):
+        if not 0 < normalised_cutoff < 0.5:
+            raise ValueError('FIRFilter: cutoff frequency must be between 0 and the Nyquist frequency.')
+        if not window:
+            window = default.WindowClass()
+
+        positions = np.arange(n_taps) - (n_taps - 1) / 2
+        taps = 2 * normalised_cutoff * np.sinc(2 * normalised_cutoff * positions)
+        taps *= window.scaling_factors(n_taps)
+        return taps / taps.sum()
+
+    @property
+    def delay(self):
+        """
+        Group delay in samples of linear-phase (symmetric) kernels.
+        """
+        return (len(self.taps) - 1) / 2
+
+    def spectrum(self, fft_size):
+        """
+        Returns:
+            (np.ndarray): the spectrum of the kernel padded to `fft_size`, computed once per size.
+        """
+        if fft_size not in self._spectra:
+            self._spectra[fft_size] = rfft(self.taps, fft_size).astype(self.complex_type, copy=False)
+        return self._spectra[fft_size]
+
+    def apply(self, sample):
+        """
+        Filters a whole sample.
+
+        Args:
+            sample (Sample): the sample to filter. All channels are filtered.
+
+        Returns:
+            (Sample): the filtered sample, with float samples.
+        """
+        return Sample(self.filter(sample.wave), sample.sample_rate, sample.sample_width)
+
+    def filter(self, wave):
+        """
+        Filters a whole wave by overlap-add, independently from any streaming state.
+
+        Args:
+            wave (np.ndarray): wave of shape (samples) or (samples x channels).
+
+        Returns:
+            (np.ndarray): the filtered wave, with the shape of the input.
+        """
+        signal = self._channels_first(wave)
+        n_samples = signal.shape[-1]
+        n_taps = len(self.taps)
+
+        if not n_samples:
+            return self._channels_last(signal)
+        if self.direct:
+            filtered = self._convolve_direct(signal)[..., :n_samples]
+            return self._channels_last(filtered)
+
+        # No need for FFTs longer than the whole convolution
+        fft_size = min(self.fft_size, max(2 * n_taps, 1 << int(math.ceil(math.log2(n_samples + n_taps - 1)))))
+        block = fft_size - n_taps + 1
+        n_blocks = -(-n_samples // block)
+
+        padded = np.zeros(signal.shape[:-1] + (n_blocks * block,), self.float_type)
+        padded[..., :n_samples] = signal
+        blocks = padded.reshape(signal.shape[:-1] + (n_blocks, block))
+
+        convolved = irfft(rfft(blocks, fft_size, axis=-1) * self.spectrum(fft_size), fft_size, axis=-1)
+        convolved = convolved[..., :block + n_taps - 1].astype(self.float_type, copy=False)
+
+        # Blocks are at least as long as the kernel, so that each tail only spills over the next block
+        heads = convolved[..., :block].copy()
+        heads[..., 1:, :n_taps - 1] += convolved[..., :-1, block:]
+
+        filtered = heads.reshape(signal.shape[:-1] + (n_blocks * block,))[..., :n_samples]
+        return self._channels_last(filtered)
+
+    def reset(self):
+        """
+        Clears the history of the streaming mode, as if the next block started a new wave.
+        """
+        self._history = None
+
+    def process(self, block):
+        """
+        Filters the next block of a wave by overlap-save. Consecutive blocks give the same result as filtering the
+        whole wave at once.
+
+        Args:
+            block (np.ndarray): next samples of the wave, of shape (samples) or (samples x channels).
+
+        Returns:
+            (np.ndarray): the filtered block, with the shape of the input.
+        """
+        signal = self._channels_first(block)
+        n_samples = signal.shape[-1]
+        n_taps = len(self.taps)
+
+        if self._history is None:
+            self._history = np.zeros(signal.shape[:-1] + (n_taps - 1,), self.float_type)
+        elif self._history.shape[:-1] != signal.shape[:-1]:
+            raise ValueError('FIRFilter.process: the number of channels changed.')
+
+        extended = np.concatenate((self._history, signal), axis=-1)
+        self._history = extended[..., extended.shape[-1] - (n_taps - 1):]
+        if not n_samples:
+            return self._channels_last(signal)
+
+        if self.direct:
+            filtered = self._convolve_direct(extended)[..., n_taps - 1:n_taps - 1 + n_samples]
+            return self._channels_last(filtered)
+
+        fft_size = self.fft_size
+        step = fft_size - n_taps + 1
+        n_segments = -(-n_samples // step)
+
+        padded = np.zeros(signal.shape[:-1] + ((n_taps - 1) + n_segments * step,), self.float_type)
+        padded[..., :extended.shape[-1]] = extended
+        # Overlapping segments, each starting with the last samples of the previous one
+        segments = padded[..., (np.arange(n_segments) * step)[:, np.newaxis] + np.arange(fft_size)]
+
+        convolved = irfft(rfft(segments, fft_size, axis=-1) * self.spectrum(fft_size), fft_size, axis=-1)
+        # The first samples of each segment are aliased by the circular convolution, and thrown away
+        valid = convolved[..., n_taps - 1:].astype(self.float_type, copy=False)
+
+        filtered = valid.reshape(signal.shape[:-1] + (n_segments * step,))[..., :n_samples]
+        return self._channels_last(filtered)
+
+    def _convolve_direct(self, signal):
+        flat = signal.reshape(-1, signal.shape[-1])
+        convolved = np.array([np.convolve(channel, self.taps) for channel in flat], dtype=self.float_type)
+        return convolved.reshape(signal.shape[:-1] + (-1,))
+
+    def _channels_first(self, wave):
+        wave = np.asarray(wave, self.float_type)
+        if wave.ndim > 2:
+            raise ValueError('FIRFilter: waves must be of shape (samples) or (samples x channels).')
+        return wave.T if wave.ndim == 2 else wave
+
+    def _channels_last(self, signal):
+        return signal.T if signal.ndim == 2 else signal
@@ -1,2 +1,3 @@
+from core.io.audio_file_info import AudioFileInfo
 from core.io.audio_file_reader import AudioFileReader
 from core.io.audio_file_writer import AudioFileWriter
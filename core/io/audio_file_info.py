@@ -0,0 +1,27 @@
+class AudioFileInfo:
+    """
+    Describes the format of an audio file, as read from its header.
+    """
+
+    def __init__(self, filename, channels, sample_width, sample_rate, frame_count, float_format=False):
+        """
+        Args:
+            filename (str): name of the described file.
+            channels (int): number of channels.
+            sample_width (int): width of a sample in bytes.
+            sample_rate (int): sampling frequency.
+            frame_count (int): number of samples per channel.
+            float_format (bool): whether samples are floating-point rather than integers.
+        """
+        self.filename = filename
+        self.channels = channels
+        self.sample_width = sample_width
+        self.sample_rate = sample_rate
+        self.frame_count = frame_count
+        self.float_format = float_format
+        self.duration = frame_count / sample_rate if sample_rate else 0.
+
+    def __repr__(self):
+        return '{}({}: {} channel(s), {} bits{}, {} Hz, {} frames, {:.3f} s)'.format(
+            self.__class__.__name__, self.filename, self.channels, 8 * self.sample_width,
+            ' float' if self.float_format else '', self.sample_rate, self.frame_count, self.duration)
@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 class AudioFileReader:
     def __init__(self):
         pass
@@ -6,4 +8,31 @@ class AudioFileReader:
         raise NotImplementedError('AudioFileReader.read: abstract method was called. Do all inherited file readers override read properly?')
 
     def get_sample(self):
-        raise NotImplementedError('AudioFileReader.get_sample: abstract method was called. Do all inherited file readers override get_sample properly?')
\ No newline at end of file
+        raise NotImplementedError('AudioFileReader.get_sample: abstract method was called. Do all inherited file readers override get_sample properly?')
+
+    def probe(self):
+        raise NotImplementedError('AudioFileReader.probe: abstract method was called. Do all inherited file readers override probe properly?')
+
+    @classmethod
+    def probe_many(cls, filenames, max_workers=32, ignore_errors=False):
+        """
+        Probes many files concurrently. Probing is bound by file access, so threads are enough to overlap it.
+
+        Args:
+            filenames (iterable of str): names of the files to probe.
+            max_workers (int): number of probing threads.
+            ignore_errors (bool): whether to return None for files which cannot be probed rather than raise.
+
+        Returns:
+            (list of AudioFileInfo): info on every file, in the order of `filenames`.
+        """
+        def probe_file(filename):
+            try:
+                return cls(filename).probe()
+            except ValueError:
+                if ignore_errors:
+                    return None
+                raise
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(probe_file, filenames))
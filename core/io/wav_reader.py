@@ -1,39 +1,140 @@
+import os
+import struct
 import wave
 from copy import deepcopy
 
-from core.io import AudioFileReader
+from core.io import AudioFileInfo, AudioFileReader
 from core.sample import Sample
 from util.byte_tools import ByteTools as b
 
 import numpy as np
 
 class WavReader(AudioFileReader):
-    def __init__(self, filename):
+    _WAVE_FORMAT_IEEE_FLOAT = 3
+    _WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+    def __init__(self, filename, all_channels=False):
+        """
+        Args:
+            filename (str): name of the file to read.
+            all_channels (bool): whether to keep every channel of multichannel files, as a (samples x channels) wave.
+                Only the first channel is kept otherwise, giving a mono wave.
+        """
         super(WavReader, self).__init__()
         
         if not filename:
             raise ValueError('WavReader.__init__: filename is needed.')
         self.filename = filename
+        self.all_channels = all_channels
 
     def read(self):
+        """
+        Decodes the whole file. Integer samples are kept as is, while float samples are scaled to the full scale of
+        integers of their width, e.g. 2 ** 31 for 32-bit floats.
+        """
         try:
-            f = wave.open(self.filename, 'rb')
-            n_channels, self.sample_width, self.sample_rate, length, compression, _ = f.getparams()
+            with open(self.filename, 'rb') as f:
+                header = self._read_header(f)
+            n_channels, self.sample_width, self.sample_rate, float_format = header[:4]
 
-            if compression is not 'NONE':
-                raise ValueError('Compression {} is not supported.'.format(compression))
+            if float_format:
+                self.wave = self._read_float(*header[4:])
+            else:
+                self.wave = self._read_pcm()
 
-            data = f.readframes(length)
+            # Interleaved channels become the columns of a (samples x channels) array
             if n_channels > 1:
-                print('WavReader.__trim_channels: {} audio channels were found. First channel only will be kept; others will be discarded.'.format(n_channels))
-                data = b.periodic_strip(data, self.sample_width, self.sample_width * n_channels)
-
-            self.wave = np.asarray(b.to_int(data, self.sample_width, little_endian=True))
+                self.wave = self.wave.reshape(-1, n_channels)
+                if not self.all_channels:
+                    self.wave = np.ascontiguousarray(self.wave[:, 0])
 
         except:
             raise ValueError('WavReader.__init__: File {} could not be read properly as a Wave file.'.format(self.filename))
 
+    def _read_pcm(self):
+        f = wave.open(self.filename, 'rb')
+        try:
+            _, _, _, length, compression, _ = f.getparams()
+            if compression != 'NONE':
+                raise ValueError('Compression {} is not supported.'.format(compression))
+            data = f.readframes(length)
+        finally:
+            f.close()
+
+        if self.sample_width == 1:
+            # 8-bit Wave samples are unsigned
+            return np.frombuffer(data, dtype=np.uint8).astype(np.int16) - 128
+        return b.to_array(data, self.sample_width, little_endian=True)
+
+    def _read_float(self, data_start, data_size, block_align):
+        if self.sample_width not in (4, 8):
+            raise ValueError('Float samples of {} bytes are not supported.'.format(self.sample_width))
+
+        with open(self.filename, 'rb') as f:
+            f.seek(data_start)
+            data = f.read(data_size - data_size % block_align)
+        # Truncated files end with a partial frame
+        data = data[:len(data) - len(data) % block_align]
+        values = np.frombuffer(data, dtype='<f{}'.format(self.sample_width))
+        return values * float(1 << (8 * self.sample_width - 1))
+
     def get_sample(self):
         if not hasattr(self, 'wave'):
             self.read()
         return Sample(deepcopy(self.wave), self.sample_rate, self.sample_width)
+
+    def probe(self):
+        """
+        Reads the format of the file from its RIFF header only, without decoding any frame.
+
+        Returns:
+            (AudioFileInfo): format of the file.
+        """
+        try:
+            with open(self.filename, 'rb') as f:
+                n_channels, sample_width, sample_rate, float_format, _, data_size, block_align = self._read_header(f)
+            return AudioFileInfo(self.filename, n_channels, sample_width, sample_rate, data_size // block_align,
+                                 float_format)
+
+        except Exception:
+            raise ValueError('WavReader.probe: File {} could not be probed as a Wave file.'.format(self.filename))
+
+    def _read_header(self, f):
+        """
+        Reads the RIFF header of a file up to the start of its data.
+
+        Returns:
+            (tuple): number of channels, sample width in bytes, sampling frequency, whether samples are floats, then
+                position and size of the data chunk in bytes and size of a frame in bytes.
+        """
+        riff, riff_size, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError('Not a RIFF/WAVE file.')
+
+        fmt = None
+        while True:
+            chunk_id, chunk_size = struct.unpack('<4sI', f.read(8))
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                f.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                data_start = f.tell()
+                break
+            else:
+                # Chunks are word-aligned
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+        # Files whose header was never finalised hold a placeholder data size: use whatever follows the header,
+        # unless the RIFF size accounts for it, as for an actual empty data chunk followed by other chunks
+        filesize = os.fstat(f.fileno()).st_size
+        if (chunk_size == 0xFFFFFFFF or (chunk_size == 0 and riff_size + 8 < filesize)) and filesize > data_start:
+            chunk_size = filesize - data_start
+
+        format_tag, n_channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == self._WAVE_FORMAT_EXTENSIBLE:
+            # The actual format is given by the first two bytes of the SubFormat GUID, after cbSize,
+            # wValidBitsPerSample and dwChannelMask
+            format_tag, = struct.unpack('<H', fmt[24:26])
+
+        return (n_channels, (bits + 7) // 8, sample_rate, format_tag == self._WAVE_FORMAT_IEEE_FLOAT, data_start,
+                chunk_size, block_align)
@@ -1,24 +1,186 @@
-import wave
+import struct
+
+import numpy as np
 
 from core.io import AudioFileWriter
 from util.byte_tools import ByteTools as b
 
 class WavWriter(AudioFileWriter):
-    def __init__(self, filename):
+    """
+    Writes Wave files, either from a whole sample at once or by appending blocks of samples as they are produced.
+    Integer PCM is supported in 8, 16, 24 and 32 bits, as well as 32-bit float.
+    """
+    _WAVE_FORMAT_PCM = 1
+    _WAVE_FORMAT_IEEE_FLOAT = 3
+    _clipping_modes = ('saturate', 'error')
+
+    def __init__(self, filename, bit_depth=None, float_format=False, clipping='saturate'):
+        """
+        Args:
+            filename (str): name of the file to write.
+            bit_depth (int): bit depth to write integer samples with, among 8, 16, 24 and 32.
+                Defaults to the bit depth of the written samples.
+            float_format (bool): whether to write 32-bit float samples instead of integers.
+            clipping (str): what to do with values out of the output range: 'saturate' clips them while 'error'
+                raises a ValueError.
+        """
         super(WavWriter, self).__init__()
 
         if not filename:
-            raise ValueError('WavReader.__init__: filename is needed.')
+            raise ValueError('WavWriter.__init__: filename is needed.')
+        if bit_depth not in (None, 8, 16, 24, 32):
+            raise ValueError('WavWriter.__init__: unsupported bit depth {}.'.format(bit_depth))
+        if clipping not in self._clipping_modes:
+            raise ValueError('WavWriter.__init__: unknown clipping mode `{}`.'.format(clipping))
+
         self.filename = filename
+        self.bit_depth = bit_depth
+        self.float_format = float_format
+        self.clipping = clipping
+
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def write(self, sample):
-        f = wave.open(self.filename, 'wb')
-        f.setnchannels(1)
-        f.setsampwidth(sample.sample_width)
-        f.setframerate(sample.sample_rate)
-        f.setnframes(len(sample.wave))
-        f.setcomptype('NONE', 'not compressed')
-
-        data = b.to_bytes(sample.wave, sample.sample_width, little_endian=True)
-        f.writeframes(data)
-        f.close()
+        """
+        Writes a whole sample to the file.
+
+        Args:
+            sample (Sample): the sample to write.
+        """
+        shape = np.shape(sample.wave)
+        channels = shape[1] if len(shape) == 2 else 1
+        self.open(sample.sample_rate, sample.sample_width, channels)
+        try:
+            self.append(sample.wave)
+        finally:
+            self.close()
+
+    def open(self, sample_rate, sample_width, channels=1):
+        """
+        Starts writing the file. Sizes in the header are left blank until the file is closed.
+
+        Args:
+            sample_rate (int): sampling frequency of the samples to write.
+            sample_width (int): width in bytes of the samples to be appended, which sets their full scale.
+            channels (int): number of channels of the samples to write.
+        """
+        if self._file is not None:
+            raise ValueError('WavWriter.open: file {} is already open.'.format(self.filename))
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.input_bit_depth = 8 * sample_width
+        self.output_bit_depth = 32 if self.float_format else (self.bit_depth or self.input_bit_depth)
+        self.frame_count = 0
+
+        self._file = open(self.filename, 'wb')
+        self._write_header()
+
+    def append(self, block):
+        """
+        Encodes and writes a block of samples.
+
+        Args:
+            block (np.ndarray): samples at the full scale of the sample width given to `open`, either one-dimensional
+                for mono or of shape (samples x channels).
+        """
+        if self._file is None:
+            raise ValueError('WavWriter.append: file {} is not open.'.format(self.filename))
+
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+        if block.shape[1] != self.channels:
+            raise ValueError('WavWriter.append: expected {} channels, got {}.'.format(self.channels, block.shape[1]))
+
+        self._file.write(self.encode(block, self.input_bit_depth))
+        self.frame_count += block.shape[0]
+
+    def close(self):
+        """
+        Fixes up the sizes in the header and closes the file.
+        """
+        if self._file is None:
+            return
+
+        data_size = self.frame_count * self.channels * (self.output_bit_depth // 8)
+        # Chunks are word-aligned
+        if data_size % 2:
+            self._file.write(b'\x00')
+
+        self._file.seek(4)
+        self._file.write(struct.pack('<I', self._data_offset - 8 + data_size + data_size % 2))
+        if self.float_format:
+            self._file.seek(self._data_offset - 12)
+            self._file.write(struct.pack('<I', self.frame_count))
+        self._file.seek(self._data_offset - 4)
+        self._file.write(struct.pack('<I', data_size))
+
+        self._file.close()
+        self._file = None
+
+    def encode(self, values, input_bit_depth):
+        """
+        Converts samples to the byte representation of the output format.
+
+        Args:
+            values (np.ndarray): the samples to convert, interleaved if multichannel.
+            input_bit_depth (int): bit depth giving the full scale of the input samples.
+
+        Returns:
+            (bytes): the encoded samples.
+        """
+        values = np.asarray(values)
+
+        if self.float_format:
+            scaled = values.astype(np.float32) / (1 << (input_bit_depth - 1))
+            return self._clip(scaled, -1., 1.).astype('<f4').tobytes()
+
+        shift = self.output_bit_depth - input_bit_depth
+        scaled = values.astype(np.float64) * (2. ** shift) if shift else values
+        if scaled.dtype.kind == 'f':
+            scaled = np.rint(scaled)
+
+        full_scale = 1 << (self.output_bit_depth - 1)
+        scaled = self._clip(scaled, -full_scale, full_scale - 1).astype(np.int64)
+
+        # 8-bit Wave samples are unsigned
+        if self.output_bit_depth == 8:
+            return (scaled + 128).astype(np.uint8).tobytes()
+
+        return bytes(b.to_bytearray(scaled.reshape(-1), self.output_bit_depth // 8, little_endian=True))
+
+    def _clip(self, values, low, high):
+        if self.clipping == 'saturate':
+            return np.clip(values, low, high)
+
+        if values.size and (values.min() < low or values.max() > high):
+            raise ValueError('WavWriter: values out of the range of the output format.')
+
+        return values
+
+    def _write_header(self):
+        bytes_per_sample = self.output_bit_depth // 8
+        format_tag = self._WAVE_FORMAT_IEEE_FLOAT if self.float_format else self._WAVE_FORMAT_PCM
+
+        fmt = struct.pack('<HHIIHH', format_tag, self.channels, self.sample_rate,
+                          self.sample_rate * self.channels * bytes_per_sample,
+                          self.channels * bytes_per_sample, self.output_bit_depth)
+        header = b'RIFF' + struct.pack('<I', 0) + b'WAVE'
+        if self.float_format:
+            # Non-PCM formats carry an (empty) extension size and a fact chunk holding the frame count
+            fmt += struct.pack('<H', 0)
+            header += b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+            header += b'fact' + struct.pack('<II', 4, 0)
+        else:
+            header += b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+        header += b'data' + struct.pack('<I', 0)
+
+        self._file.write(header)
+        self._data_offset = len(header)
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+
+class LazyFrames:
+    """
+    Read-only sequence of FFT slices which are only computed when accessed.
+    Can stand in for the list of slices of a spectrogram whose frames are backed by a file, a sample or a cache.
+    """
+
+    def __init__(self, length, compute, cache_size=None):
+        """
+        Args:
+            length (int): number of frames in the sequence.
+            compute (callable): function taking a frame index and returning the corresponding :obj:`FFTResult`.
+            cache_size (int): maximum number of computed frames to keep around. Unbounded if None.
+        """
+        if length < 0:
+            raise ValueError('LazyFrames.__init__: `length` cannot be lower than 0.')
+        if cache_size is not None and cache_size < 1:
+            raise ValueError('LazyFrames.__init__: `cache_size` must be at least 1.')
+
+        self.length = length
+        self.compute = compute
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(self.length))]
+
+        index = int(index)
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError('LazyFrames: frame index out of range.')
+
+        return self._get(index)
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self._get(i)
+
+    def is_computed(self, index):
+        """
+        Tells whether a frame is currently held in cache.
+
+        Args:
+            index (int): index of the frame.
+
+        Returns:
+            bool: whether the frame has been computed and is still cached.
+        """
+        return index in self._cache
+
+    def _get(self, index):
+        if index in self._cache:
+            self._cache.move_to_end(index)
+            return self._cache[index]
+
+        frame = self.compute(index)
+        self._cache[index] = frame
+        if self.cache_size is not None and len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return frame
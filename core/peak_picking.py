@@ -0,0 +1,226 @@
+import numpy as np
+
+from core import default
+from core.window import Window
+
+class SpectralPeaks:
+    """
+    Peaks of a sequence of spectra, stored as ragged rows like a compressed sparse row matrix: the peaks of slice i are
+    the entries `offsets[i]:offsets[i + 1]` of the flat peak arrays.
+    """
+
+    def __init__(self, offsets, bins, frequencies, amplitudes, prominences):
+        """
+        Args:
+            offsets (np.ndarray): start of the peaks of every slice in the flat arrays, followed by the peak count.
+            bins (np.ndarray): bin of the local maximum of every peak.
+            frequencies (np.ndarray): interpolated frequency of every peak, in Hz.
+            amplitudes (np.ndarray): interpolated amplitude of every peak, i.e. of the sinusoid it stems from.
+            prominences (np.ndarray): height of every peak above the higher of its neighbouring valleys, in dB.
+        """
+        self.offsets = offsets
+        self.bins = bins
+        self.frequencies = frequencies
+        self.amplitudes = amplitudes
+        self.prominences = prominences
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def counts(self):
+        """
+        Number of peaks of every slice.
+        """
+        return np.diff(self.offsets)
+
+    @property
+    def frames(self):
+        """
+        Slice of every peak, aligned with the flat peak arrays.
+        """
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    def frame(self, index):
+        """
+        Returns:
+            (tuple): frequencies, amplitudes and prominences of the peaks of a slice, in increasing frequency.
+        """
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return self.frequencies[start:stop], self.amplitudes[start:stop], self.prominences[start:stop]
+
+    @staticmethod
+    def concatenate(peaks):
+        """
+        Joins the peaks of consecutive blocks of slices.
+
+        Args:
+            peaks (list): SpectralPeaks of consecutive blocks.
+
+        Returns:
+            (SpectralPeaks): the peaks of all slices.
+        """
+        counts = np.concatenate([p.counts for p in peaks])
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return SpectralPeaks(offsets, *[np.concatenate([getattr(p, name) for p in peaks])
+                                        for name in ('bins', 'frequencies', 'amplitudes', 'prominences')])
+
+
+class PeakPicker:
+    """
+    Finds the peaks of amplitude spectra, for all slices at once.
+    Peaks are local maxima whose amplitude reaches a threshold and whose prominence - their height in dB above the
+    higher of the valleys on either side - reaches a minimum. Their frequency and amplitude are interpolated from the
+    three bins around the maximum, and corrected with the main lobe of the window, so that sinusoids falling between
+    bins are measured without the bias of the plain interpolation or the scalloping loss of the window.
+    Correction tables are computed once per window and slice length, and shared by all peak pickers.
+    """
+    interpolations = ('gaussian', 'parabolic', None)
+    # Store computed correction tables in class scope to save some processing power
+    __corrections = {}
+    _table_size = 257
+
+    def __init__(self, window=None, threshold=0., prominence=6., interpolation='gaussian', max_peaks=None):
+        """
+        Args:
+            window (Window): the window with which the spectra were computed.
+            threshold (float): minimum amplitude of peaks, in sample units.
+            prominence (float): minimum prominence of peaks, in dB.
+            interpolation (str): 'gaussian' fits a parabola to the amplitudes in dB, which suits the main lobe of most
+                windows; 'parabolic' fits it to linear amplitudes; None keeps the bins of local maxima.
+            max_peaks (int): maximum number of peaks per slice, keeping the loudest. No limit if None.
+        """
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+        if not isinstance(window, Window):
+            raise TypeError('PeakPicker.__init__: passed window is not a valid window.')
+        if interpolation not in self.interpolations:
+            raise ValueError('PeakPicker.__init__: `interpolation` must be one of {}.'.format(self.interpolations))
+
+        self.window = window
+        self.threshold = threshold
+        self.prominence = prominence
+        self.interpolation = interpolation
+        self.max_peaks = max_peaks
+
+    @staticmethod
+    def from_spectrogram(spectrogram, threshold=0., prominence=6., interpolation='gaussian', max_peaks=None,
+                         block_frames=1024):
+        """
+        Finds the peaks of all slices of a spectrogram. Lazy spectrograms are processed a block of slices at a time.
+
+        Args:
+            spectrogram (Spectrogram): the spectrogram to analyse.
+            block_frames (int): number of slices to process at once.
+            See `__init__` for other arguments.
+
+        Returns:
+            (SpectralPeaks): the peaks of every slice.
+        """
+        picker = PeakPicker(spectrogram.metadata['window_type'](), threshold, prominence, interpolation, max_peaks)
+        sample_rate = spectrogram.metadata['sampling_frequency']
+        blocks = [picker.pick(spectrogram.spectra(start, start + block_frames)[0], sample_rate)
+                  for start in range(0, len(spectrogram.fft_slices), block_frames)]
+        return SpectralPeaks.concatenate(blocks) if blocks else picker.pick(np.zeros((0, spectrogram.fft_size)),
+                                                                             sample_rate)
+
+    def pick(self, amp, sample_rate=default.SAMPLING_FREQUENCY):
+        """
+        Finds the peaks of amplitude spectra.
+
+        Args:
+            amp (np.ndarray): amplitude spectra, as a (slices x bins) array.
+            sample_rate (int): sampling frequency of the analysed wave.
+
+        Returns:
+            (SpectralPeaks): the peaks of every slice.
+        """
+        amp = np.asarray(amp)
+        if amp.ndim != 2:
+            raise ValueError('PeakPicker.pick: spectra must be a (slices x bins) array.')
+        n_frames, size = amp.shape
+        bin_spacing = sample_rate / (2 * size)
+
+        db = 20 * np.log10(np.maximum(amp, np.finfo(np.float64).tiny))
+        rising = db[:, 1:] > db[:, :-1]
+
+        # Strict rise on the left and no rise on the right, so that flat tops give a single peak
+        is_peak = np.zeros(amp.shape, bool)
+        is_peak[:, 1:-1] = rising[:, :-1] & ~rising[:, 1:]
+        # Ends of spectra always bound valleys
+        is_valley = np.ones(amp.shape, bool)
+        is_valley[:, 1:-1] = ~rising[:, :-1] & rising[:, 1:]
+
+        # Nearest valley on either side of every bin
+        positions = np.arange(size)
+        left = np.maximum.accumulate(np.where(is_valley, positions, 0), axis=1)
+        right = np.minimum.accumulate(np.where(is_valley, positions, size - 1)[:, ::-1], axis=1)[:, ::-1]
+
+        frames, bins = np.nonzero(is_peak)
+        base = np.maximum(db[frames, left[frames, bins - 1]], db[frames, right[frames, bins + 1]])
+        prominences = db[frames, bins] - base
+
+        kept = (amp[frames, bins] >= self.threshold) & (prominences >= self.prominence)
+        frames, bins, prominences = frames[kept], bins[kept], prominences[kept]
+
+        offsets_in_bins, amplitudes = self._interpolate(amp, db, frames, bins, size)
+
+        if self.max_peaks is not None:
+            # Rank peaks by decreasing amplitude within their slice, then restore the frequency order
+            order = np.lexsort((-amplitudes, frames))
+            starts = np.searchsorted(frames[order], frames[order])
+            ranked = order[np.arange(len(order)) - starts < self.max_peaks]
+            kept = np.sort(ranked)
+            frames, bins, prominences = frames[kept], bins[kept], prominences[kept]
+            offsets_in_bins, amplitudes = offsets_in_bins[kept], amplitudes[kept]
+
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(frames, minlength=n_frames)))).astype(np.int64)
+        return SpectralPeaks(offsets, bins, (bins + offsets_in_bins) * bin_spacing, amplitudes, prominences)
+
+    def _interpolate(self, amp, db, frames, bins, size):
+        """
+        Returns the offset from the peak bin of the maximum of every peak, in bins, and its amplitude.
+        """
+        if self.interpolation is None or not len(bins):
+            return np.zeros(len(bins)), amp[frames, bins].astype(np.float64)
+
+        values = db if self.interpolation == 'gaussian' else amp
+        left, centre, right = (values[frames, bins + k].astype(np.float64) for k in (-1, 0, 1))
+        curvature = left - 2 * centre + right
+        estimate = np.where(curvature < 0, 0.5 * (left - right) / np.where(curvature < 0, curvature, -1), 0.)
+
+        offsets_table, estimates_table, gains_table = self._correction(self.window, 2 * size, self.interpolation)
+        offsets = np.interp(np.clip(estimate, -0.5, 0.5), estimates_table, offsets_table)
+        amplitudes = amp[frames, bins] / np.interp(offsets, offsets_table, gains_table)
+        return offsets, amplitudes
+
+    @staticmethod
+    def _correction(window, length, interpolation):
+        """
+        Returns the table mapping the offset of a sinusoid from its nearest bin, from -0.5 to 0.5 bins, to the offset
+        estimated by the interpolation, and to the ratio of the amplitude of the peak bin to that of the sinusoid. Both
+        are computed from the transform of the window itself.
+        """
+        key = (type(window), getattr(window, 'scale', None), length, interpolation)
+        if key in PeakPicker.__corrections:
+            return PeakPicker.__corrections[key]
+
+        factors = window.scaling_factors(length)
+        offsets = np.linspace(-0.5, 0.5, PeakPicker._table_size)
+        # Response of the bins on either side of a sinusoid lying `offset` bins above the centre bin
+        distances = offsets[:, np.newaxis] + np.array([1, 0, -1])
+        phases = np.exp(-2j * np.pi * distances[..., np.newaxis] * np.arange(length) / length)
+        response = np.abs(phases.dot(factors)) / factors.sum()
+
+        values = 20 * np.log10(np.maximum(response, np.finfo(np.float64).tiny)) \
+            if interpolation == 'gaussian' else response
+        left, centre, right = values[:, 0], values[:, 1], values[:, 2]
+        estimates = 0.5 * (left - right) / (left - 2 * centre + right)
+
+        # Keep the table increasing, which it is for all windows with a main lobe wider than 2 bins
+        estimates = np.maximum.accumulate(estimates)
+        # Spectra are scaled by the nominal coherent gain of the window rather than the actual mean of its factors
+        gains = response[:, 1] * factors.mean() / window.coherent_gain
+        PeakPicker.__corrections[key] = offsets, estimates, gains
+        return PeakPicker.__corrections[key]
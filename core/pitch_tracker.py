@@ -0,0 +1,204 @@
+import math
+
+import numpy as np
+
+from core.dsp_toolbox import DSPToolbox, rfft, irfft
+
+class PitchTracker:
+    """
+    Estimates the fundamental frequency of waves slice by slice with the YIN algorithm.
+    Slices are cut the same way as for spectrograms, so that pitch tracks line up with spectrogram slices. The
+    difference function of every slice is computed from its autocorrelation, by FFT, for whole batches of slices at
+    once. Waves may be tracked whole, or block by block with the samples of the next slice kept across blocks; both give
+    the same track.
+    """
+
+    def __init__(self, sample_rate, size=1024, min_frequency=80., max_frequency=1000., threshold=0.1, block_frames=256,
+                 dtype=None):
+        """
+        Args:
+            sample_rate (int): sampling frequency of the waves to track.
+            size (int): half the size of slices, as for spectrograms. Slices must be longer than the period of
+                `min_frequency`.
+            min_frequency (float): lowest fundamental frequency to look for, in Hz.
+            max_frequency (float): highest fundamental frequency to look for, in Hz.
+            threshold (float): highest normalised difference, between 0 and 1, for a slice to be considered voiced.
+                Lower values reject more noisy slices.
+            block_frames (int): number of slices to process per batch, to bound temporary memory.
+            dtype (np.dtype): float type to compute with. Defaults to `default.FLOAT_TYPE`.
+        """
+        if not 0 < min_frequency < max_frequency:
+            raise ValueError('PitchTracker.__init__: frequencies must verify 0 < `min_frequency` < `max_frequency`.')
+
+        self.sample_rate = sample_rate
+        self.size = size
+        self.threshold = threshold
+        self.block_frames = block_frames
+        self.float_type, _ = DSPToolbox.float_types(dtype)
+
+        self.slice_length = 2 * size
+        self.hop = DSPToolbox.hop_size(size)
+        # Lags searched, leaving one lag on either side for interpolation
+        self.min_lag = max(2, int(sample_rate / max_frequency))
+        self.max_lag = int(math.ceil(sample_rate / min_frequency)) + 1
+        if self.max_lag >= self.slice_length:
+            raise ValueError('PitchTracker.__init__: slices are too short for `min_frequency`, increase `size`.')
+
+        self.reset()
+
+    @staticmethod
+    def pitch_track(sample, min_frequency=80., max_frequency=1000., threshold=0.1, size=1024):
+        """
+        Tracks the fundamental frequency of a whole sample. See `__init__` for arguments.
+
+        Returns:
+            (np.ndarray, np.ndarray): see `track`.
+        """
+        return PitchTracker(sample.sample_rate, size, min_frequency, max_frequency, threshold).track(sample)
+
+    def frame_time(self, index):
+        """
+        Returns:
+            (float): the time in seconds of the centre of a slice, or of every slice of an array of indices.
+        """
+        return (np.floor(np.asarray(index) * self.hop) + self.size) / self.sample_rate
+
+    def track(self, sample):
+        """
+        Tracks the fundamental frequency of a whole sample, independently from any streaming state.
+
+        Args:
+            sample (Sample): the sample to track, at the sampling frequency of the tracker.
+
+        Returns:
+            (np.ndarray, np.ndarray): fundamental frequency of every slice in Hz, NaN for unvoiced slices, and
+                periodicity of every slice, from 0 for noise to 1 for perfectly periodic waves. Arrays are of shape
+                (slices), or (channels x slices) for multichannel samples.
+        """
+        if sample.sample_rate != self.sample_rate:
+            raise ValueError('PitchTracker.track: expected a sample at {} Hz, got {} Hz.'.format(self.sample_rate,
+                                                                                                sample.sample_rate))
+
+        n_frames = DSPToolbox.frame_count(sample, self.size)
+        blocks = [self._pitch(DSPToolbox.frames(sample, self.size, start, min(start + self.block_frames, n_frames),
+                                                self.float_type))
+                  for start in range(0, n_frames, self.block_frames)]
+        if not blocks:
+            empty = np.zeros((0,) if sample.channels == 1 else (sample.channels, 0))
+            return empty, empty.copy()
+
+        return tuple(np.concatenate(parts, axis=-1) for parts in zip(*blocks))
+
+    def reset(self):
+        """
+        Drops any pending samples and starts a new wave.
+        """
+        self.frame_count = 0
+        self.sample_count = 0
+        self._pending = None
+        # Position in the wave of the first pending sample
+        self._offset = 0
+
+    def process(self, block):
+        """
+        Tracks the next block of a wave.
+
+        Args:
+            block (np.ndarray): next samples of the wave, of shape (samples) or (samples x channels).
+
+        Returns:
+            (np.ndarray, np.ndarray): see `track`, for the slices which the block completes.
+        """
+        signal = np.asarray(block, self.float_type)
+        signal = signal.T if signal.ndim == 2 else signal
+
+        if self._pending is None:
+            self._pending = np.zeros(signal.shape[:-1] + (0,), self.float_type)
+        elif self._pending.shape[:-1] != signal.shape[:-1]:
+            raise ValueError('PitchTracker.process: the number of channels changed.')
+
+        self._pending = np.concatenate((self._pending, signal), axis=-1)
+        self.sample_count += signal.shape[-1]
+
+        # Slices lying entirely within the samples received so far
+        last_start = self.sample_count - self.slice_length
+        end_frame = int(math.ceil((last_start + 1) / self.hop)) if last_start >= 0 else 0
+        return self._track_pending(self._pending, end_frame)
+
+    def flush(self):
+        """
+        Tracks the last slices, which reach past the end of the wave and are padded with zeros, then starts a new wave.
+
+        Returns:
+            (np.ndarray, np.ndarray): see `track`, for the last slices.
+        """
+        pending = self._pending if self._pending is not None else np.zeros(0, self.float_type)
+        padded = np.concatenate((pending, np.zeros(pending.shape[:-1] + (self.slice_length,), self.float_type)),
+                                axis=-1)
+        track = self._track_pending(padded, int(math.ceil(self.sample_count / self.hop)))
+        self.reset()
+        return track
+
+    def _track_pending(self, samples, end_frame):
+        """
+        Tracks the slices up to `end_frame` taken from samples starting at `self._offset` in the wave, then only keeps
+        the pending samples from the start of the next slice.
+        """
+        frames = np.arange(self.frame_count, max(self.frame_count, end_frame))
+        starts = (frames * self.hop).astype(int) - self._offset
+        track = self._pitch(samples[..., starts[:, np.newaxis] + np.arange(self.slice_length)])
+
+        self.frame_count += len(frames)
+        next_start = int(self.frame_count * self.hop)
+        if self._pending is not None:
+            self._pending = self._pending[..., next_start - self._offset:]
+        self._offset = next_start
+        return track
+
+    def _pitch(self, frames):
+        """
+        Runs YIN on slices laid along the last axis.
+        """
+        length = frames.shape[-1]
+        window = length - self.max_lag
+        tiny = np.finfo(self.float_type).tiny
+
+        # Autocorrelation of the start of every slice with the whole slice, for all lags at once
+        spectra = rfft(frames, length, axis=-1)
+        head_spectra = rfft(frames[..., :window], length, axis=-1)
+        correlation = irfft(np.conj(head_spectra) * spectra, length, axis=-1)[..., :self.max_lag + 1]
+
+        # Energies of the start of every slice, and of the same stretch shifted by every lag
+        energies = np.zeros(frames.shape[:-1] + (length + 1,), np.float64)
+        np.cumsum(np.square(frames, dtype=np.float64), axis=-1, out=energies[..., 1:])
+        lags = np.arange(self.max_lag + 1)
+        shifted = energies[..., lags + window] - energies[..., lags]
+        head = shifted[..., :1]
+
+        difference = np.maximum(head + shifted - 2 * correlation, 0)
+        # Cumulative mean normalised difference
+        normalised = np.ones(difference.shape)
+        normalised[..., 1:] = difference[..., 1:] * lags[1:] / np.maximum(np.cumsum(difference[..., 1:], axis=-1),
+                                                                           tiny)
+
+        # First dip under the threshold, followed down to its minimum; the deepest dip for unvoiced slices
+        searched = normalised[..., self.min_lag:self.max_lag]
+        candidates = np.arange(self.min_lag, self.max_lag)
+        below = searched < self.threshold
+        first = self.min_lag + np.argmax(below, axis=-1)
+        rising = (normalised[..., self.min_lag + 1:self.max_lag + 1] >= searched) & \
+                 (candidates >= first[..., np.newaxis])
+        # A dip still falling at the longest lag has its minimum below `min_frequency`
+        voiced = below.any(axis=-1) & rising.any(axis=-1) & (head[..., 0] > tiny)
+        lag = np.where(voiced, self.min_lag + np.argmax(rising, axis=-1), self.min_lag + np.argmin(searched, axis=-1))
+
+        # Parabolic interpolation of the minimum
+        left, centre, right = (np.take_along_axis(normalised, (lag + k)[..., np.newaxis], axis=-1)[..., 0]
+                               for k in (-1, 0, 1))
+        curvature = left - 2 * centre + right
+        offset = np.where(curvature > 0, 0.5 * (left - right) / np.where(curvature > 0, curvature, 1), 0.)
+        offset = np.clip(offset, -1, 1)
+
+        frequencies = np.where(voiced, self.sample_rate / (lag + offset), np.nan)
+        periodicity = np.clip(1 - centre, 0, 1)
+        return frequencies, periodicity
@@ -0,0 +1,188 @@
+from fractions import Fraction
+
+import numpy as np
+
+from core.dsp_toolbox import DSPToolbox
+from core.fir_filter import FIRFilter
+from core.sample import Sample
+from core.windows.blackman_harris import BlackmanHarrisWindow
+
+class Resampler:
+    """
+    Converts waves from one sampling frequency to another by polyphase filtering.
+    The ratio of rates is reduced to up / down: conceptually, waves are upsampled by `up`, low-pass filtered and
+    downsampled by `down`, but only the filter phases giving kept output samples are ever computed. Outputs are computed
+    by blocks of vectorized dot products with the filter bank.
+    Filter banks are computed once per ratio and shared by all resamplers.
+    Waves may be resampled whole, or block by block with the filter state kept across blocks; both give the same output,
+    aligned with the input and of length `ceil(input length * up / down)`.
+    """
+    # Store computed filter banks in class scope to save some processing power
+    __banks = {}
+    _chunk_size = 4096
+
+    def __init__(self, source_rate, target_rate, half_width=10, window=None, dtype=None):
+        """
+        Args:
+            source_rate (int): sampling frequency of input waves.
+            target_rate (int): sampling frequency of output waves.
+            half_width (int): length of each half of the filter in periods of the lower of both rates. Longer filters
+                give steeper transitions at a proportional cost.
+            window (Window): the window tapering the filter. Blackman-Harris window if None.
+            dtype (np.dtype): float type to compute with. Defaults to `default.FLOAT_TYPE`.
+        """
+        if source_rate <= 0 or target_rate <= 0:
+            raise ValueError('Resampler.__init__: sampling frequencies must be positive.')
+
+        ratio = Fraction(int(target_rate), int(source_rate))
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.up = ratio.numerator
+        self.down = ratio.denominator
+        self.float_type, _ = DSPToolbox.float_types(dtype)
+
+        self.bank, self.delay = self._bank(self.up, self.down, half_width, window or BlackmanHarrisWindow(),
+                                           self.float_type)
+        self.reset()
+
+    @staticmethod
+    def resample(sample, target_rate, half_width=10):
+        """
+        Resamples a whole sample.
+
+        Args:
+            sample (Sample): the sample to resample. All channels are resampled.
+            target_rate (int): sampling frequency of the output sample.
+            half_width (int): see `__init__`.
+
+        Returns:
+            (Sample): the resampled sample, with float samples.
+        """
+        return Resampler(sample.sample_rate, target_rate, half_width).apply(sample)
+
+    def apply(self, sample):
+        """
+        Resamples a whole sample, independently from any streaming state.
+
+        Args:
+            sample (Sample): the sample to resample, at the source rate.
+
+        Returns:
+            (Sample): the resampled sample, with float samples.
+        """
+        if sample.sample_rate != self.source_rate:
+            raise ValueError('Resampler.apply: expected a sample at {} Hz, got {} Hz.'.format(self.source_rate,
+                                                                                             sample.sample_rate))
+
+        state = self._state()
+        self.reset()
+        wave = np.concatenate((self.process(sample.wave), self.flush()))
+        self._restore(state)
+        return Sample(wave, self.target_rate, sample.sample_width)
+
+    def reset(self):
+        """
+        Clears the filter state, as if the next block started a new wave.
+        """
+        self._history = None
+        self._consumed = 0
+        # The first outputs are the delay of the filter, and are skipped to align the output with the input
+        self._next_output = self.delay
+        self._emitted = 0
+
+    def process(self, block):
+        """
+        Resamples the next block of a wave.
+
+        Args:
+            block (np.ndarray): next samples of the wave, of shape (samples) or (samples x channels).
+
+        Returns:
+            (np.ndarray): the output samples which the block completes, of shape (samples) or (samples x channels).
+        """
+        signal = np.asarray(block, self.float_type)
+        signal = signal.T if signal.ndim == 2 else signal
+        n_phases, n_taps = self.bank.shape
+
+        if self._history is None:
+            self._history = np.zeros(signal.shape[:-1] + (n_taps - 1,), self.float_type)
+        elif self._history.shape[:-1] != signal.shape[:-1]:
+            raise ValueError('Resampler.process: the number of channels changed.')
+
+        # Inputs preceding the block which the filter still reaches, then the block
+        extended = np.concatenate((self._history, signal), axis=-1)
+        first_input = self._consumed - (n_taps - 1)
+        self._consumed += signal.shape[-1]
+
+        # Outputs whose last input is available
+        end_output = (self._consumed * self.up - 1) // self.down + 1 if self._consumed else 0
+        outputs = []
+        for start in range(self._next_output, end_output, self._chunk_size):
+            positions = np.arange(start, min(start + self._chunk_size, end_output), dtype=np.int64) * self.down
+            last_inputs = positions // self.up - first_input
+            # Inputs reached by each output, most recent first, against the filter phase of each output
+            reached = extended[..., last_inputs[:, np.newaxis] - np.arange(n_taps)]
+            outputs.append(np.einsum('...ij,ij->...i', reached, self.bank[positions % self.up]))
+
+        self._history = extended[..., extended.shape[-1] - (n_taps - 1):]
+        if end_output > self._next_output:
+            self._next_output = end_output
+
+        output = np.concatenate(outputs, axis=-1) if outputs else np.zeros(signal.shape[:-1] + (0,), self.float_type)
+        self._emitted += output.shape[-1]
+        return output.T if output.ndim == 2 else output
+
+    def flush(self):
+        """
+        Returns the last output samples, which depend on inputs past the end of the wave, then starts a new wave.
+
+        Returns:
+            (np.ndarray): the last output samples, of shape (samples) or (samples x channels).
+        """
+        if self._history is None:
+            self.reset()
+            return np.zeros(0, self.float_type)
+
+        expected = -(-self._consumed * self.up // self.down)
+        last_output = self.delay + expected - 1
+        padding = max(0, (last_output * self.down) // self.up + 1 - self._consumed)
+        missing = expected - self._emitted
+
+        output = self.process(np.zeros(self._history.shape[:-1] + (padding,), self.float_type).T)[:missing]
+        self.reset()
+        return output
+
+    def _state(self):
+        return self._history, self._consumed, self._next_output, self._emitted
+
+    def _restore(self, state):
+        self._history, self._consumed, self._next_output, self._emitted = state
+
+    @staticmethod
+    def _bank(up, down, half_width, window, float_type):
+        """
+        Returns the polyphase filter bank of a ratio, as an (up x taps) array whose rows are the phases of the low-pass
+        filter, tap k of a phase applying to the k-th most recent input, and the delay of the filter in output samples.
+        """
+        key = (up, down, half_width, type(window), getattr(window, 'scale', None), np.dtype(float_type))
+        if key in Resampler.__banks:
+            return Resampler.__banks[key]
+
+        max_rate = max(up, down)
+        n_taps = 2 * half_width * max_rate + 1
+        if max_rate > 1:
+            # Cut off at the Nyquist frequency of the lower rate, with the gain lost by upsampling restored
+            taps = FIRFilter._sinc_taps(0.5 / max_rate, n_taps, window) * up
+        else:
+            taps = np.ones(1)
+
+        # Pad the filter so that its centre falls on an output sample, giving a whole number of samples of delay,
+        # then to a whole number of taps per phase
+        centre = (len(taps) - 1) // 2
+        front = (-centre) % down
+        taps = np.concatenate((np.zeros(front), taps))
+        taps = np.concatenate((taps, np.zeros((-len(taps)) % up)))
+
+        bank = taps.reshape(-1, up).T.astype(float_type)
+        Resampler.__banks[key] = bank, (centre + front) // down
+        return Resampler.__banks[key]
@@ -1,14 +1,18 @@
 from copy import deepcopy
 
+import numpy as np
+
 
 class Sample:
     """
     Encapsulates a raw wave, either read from a file or created from existing values.
+    Multichannel waves are stored as (samples x channels) arrays.
     """
 
     def __init__(self, wave, sample_rate, sample_width):
         self.wave = wave
         self.length = len(wave)
+        self.channels = wave.shape[1] if getattr(wave, 'ndim', 1) == 2 else 1
 
         self.sample_rate = sample_rate
         self.sample_width = sample_width
@@ -26,3 +30,55 @@ class Sample:
             raise ValueError('Sample.slice: `start` cannot be greater than `end`.')
 
         return Sample(deepcopy(self.wave[start:end]), self.sample_rate, self.sample_width)
+
+    def channel(self, index):
+        """
+        Returns one channel of the sample. The wave of the returned sample is a view, no data is copied.
+
+        Args:
+            index (int): index of the channel.
+
+        Returns:
+            (Sample): mono sample of the channel.
+        """
+        if not 0 <= index < self.channels:
+            raise ValueError('Sample.channel: channel {} does not exist in a {}-channel sample.'.format(index, self.channels))
+        if self.channels == 1:
+            return Sample(self.wave, self.sample_rate, self.sample_width)
+
+        return Sample(self.wave[:, index], self.sample_rate, self.sample_width)
+
+    def downmix(self, weights=None):
+        """
+        Mixes all channels down to a single one.
+
+        Args:
+            weights (iterable of float): gain of every channel in the mix. Channels are averaged if None.
+
+        Returns:
+            (Sample): mono downmix of the sample.
+        """
+        if self.channels == 1:
+            return Sample(self.wave, self.sample_rate, self.sample_width)
+
+        if weights is None:
+            wave = np.mean(self.wave, axis=1)
+        else:
+            weights = np.asarray(weights, dtype=float)
+            if weights.shape != (self.channels,):
+                raise ValueError('Sample.downmix: expected {} weights.'.format(self.channels))
+            wave = np.dot(self.wave, weights)
+
+        return Sample(wave, self.sample_rate, self.sample_width)
+
+    def mid_side(self):
+        """
+        Converts a stereo sample to mid/side: mid is the average of both channels, side is half their difference.
+
+        Returns:
+            (Sample): two-channel sample holding mid and side.
+        """
+        if self.channels != 2:
+            raise ValueError('Sample.mid_side: a stereo sample is needed, got {} channels.'.format(self.channels))
+
+        return Sample(np.dot(self.wave, [[0.5, 0.5], [0.5, -0.5]]), self.sample_rate, self.sample_width)
@@ -0,0 +1,220 @@
+import weakref
+from functools import partial
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Shared memory blocks are only available from Python 3.8 on
+    shared_memory = None
+
+from core.dsp_toolbox import DSPToolbox
+from core.lazy_frames import LazyFrames
+from core.sample import Sample
+from core.spectrogram import Spectrogram
+
+class SharedArray:
+    """
+    Numpy array stored in a shared memory block.
+    Pickling a shared array only sends the name of its block, so that other processes attach to the same memory
+    rather than receiving a copy of the data.
+    The process creating the block owns it: the block is unlinked when the owner closes the array, leaves its context
+    or drops its last reference to it. Other processes only close their own mapping.
+    """
+
+    def __init__(self, shape, dtype=np.float64, name=None):
+        """
+        Args:
+            shape (tuple of int): shape of the array.
+            dtype (np.dtype): type of the array elements.
+            name (str): name of an existing block to attach to. A new block is created if None.
+        """
+        if shared_memory is None:
+            raise ImportError('SharedArray.__init__: shared memory requires Python 3.8 or later.')
+
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        if self.owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+        self.array = np.ndarray(self.shape, self.dtype, buffer=self._memory.buf)
+
+        # Releases the block should the array be garbage collected without being closed
+        self._finalizer = weakref.finalize(self, _release, self._memory, self.owner)
+
+    @staticmethod
+    def from_array(array):
+        """
+        Copies an array into a new shared memory block.
+
+        Args:
+            array (np.ndarray): the array to copy.
+
+        Returns:
+            (SharedArray): the shared copy, owned by the calling process.
+        """
+        array = np.asarray(array)
+        shared = SharedArray(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        return SharedArray, (self.shape, self.dtype.str, self.name)
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def close(self):
+        """
+        Closes the mapping of the block in this process, and unlinks the block if this process owns it.
+        Views of `array` must not be used afterwards.
+        """
+        self.array = None
+        self._finalizer()
+
+
+def _release(memory, owner):
+    try:
+        memory.close()
+    except BufferError:
+        # Views of the array are still alive somewhere; the mapping goes away with them
+        pass
+
+    if owner:
+        try:
+            memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedSample(Sample):
+    """
+    Sample whose wave is stored in shared memory, so that it can be handed to worker processes without being copied.
+    """
+
+    def __init__(self, shared_wave, sample_rate, sample_width):
+        """
+        Args:
+            shared_wave (SharedArray): the wave of the sample.
+            sample_rate (int): sampling frequency of the sample.
+            sample_width (int): width in bytes of the samples.
+        """
+        super(SharedSample, self).__init__(shared_wave.array, sample_rate, sample_width)
+        self.shared_wave = shared_wave
+
+    @staticmethod
+    def from_sample(sample):
+        """
+        Copies a sample into shared memory.
+
+        Args:
+            sample (Sample): the sample to copy.
+
+        Returns:
+            (SharedSample): the shared copy, owned by the calling process.
+        """
+        return SharedSample(SharedArray.from_array(sample.wave), sample.sample_rate, sample.sample_width)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        return SharedSample, (self.shared_wave, self.sample_rate, self.sample_width)
+
+    def close(self):
+        """
+        See `SharedArray.close`.
+        """
+        self.wave = None
+        self.shared_wave.close()
+
+
+class SharedSpectrogram(Spectrogram):
+    """
+    Spectrogram whose amplitude and phase matrices are stored in shared memory.
+    Slices are built from matrix rows on first access, so that nothing but the matrix handles and the format of the
+    analysed sample is sent to other processes.
+    """
+
+    def __init__(self, shared_amp, shared_phase, fft_size, metadata, hop_size, sample_width, window):
+        """
+        Args:
+            shared_amp (SharedArray): amplitude spectra of the slices as a (slices x bins) array.
+            shared_phase (SharedArray): phase spectra of the slices as a (slices x bins) array.
+            fft_size (int): used FFT size.
+            metadata (dict): various info, including the sampling frequency.
+            hop_size (float): number of samples between the starts of two consecutive slices.
+            sample_width (int): width in bytes of the analysed samples, which sets the reference level of slices.
+            window (Window): the window the sample was analysed with.
+        """
+        self.shared_amp = shared_amp
+        self.shared_phase = shared_phase
+        self.sample_width = sample_width
+        self.window = window
+
+        sample_format = Sample(np.empty(0), metadata['sampling_frequency'], sample_width)
+        compute_slice = partial(DSPToolbox.slice_from_matrix, shared_amp.array, shared_phase.array, fft_size,
+                                sample_format, window)
+        fft_slices = LazyFrames(len(shared_amp.array), compute_slice)
+
+        super(SharedSpectrogram, self).__init__(fft_slices, fft_size, metadata, hop_size, shared_amp.array,
+                                                shared_phase.array)
+
+    @staticmethod
+    def from_spectrogram(spectrogram, window=None):
+        """
+        Copies the matrices of a spectrogram into shared memory.
+
+        Args:
+            spectrogram (Spectrogram): the spectrogram to copy.
+            window (Window): the window the spectrogram was computed with. An instance of the window type found in
+                the metadata of the spectrogram if None.
+
+        Returns:
+            (SharedSpectrogram): the shared copy, owned by the calling process.
+        """
+        if not window:
+            window = spectrogram.metadata['window_type']()
+        reference_level = spectrogram.fft_slices[0].reference_level
+        sample_width = (int(reference_level).bit_length()) // 8
+
+        return SharedSpectrogram(SharedArray.from_array(spectrogram.amp_matrix),
+                                 SharedArray.from_array(spectrogram.phase_matrix),
+                                 spectrogram.fft_size, dict(spectrogram.metadata), spectrogram.hop_size,
+                                 sample_width, window)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        return SharedSpectrogram, (self.shared_amp, self.shared_phase, self.fft_size, self.metadata, self.hop_size,
+                                   self.sample_width, self.window)
+
+    def close(self):
+        """
+        See `SharedArray.close`.
+        """
+        self.fft_slices = LazyFrames(0, None)
+        self._amp_matrix = None
+        self._phase_matrix = None
+        self.shared_amp.close()
+        self.shared_phase.close()
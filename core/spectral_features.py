@@ -0,0 +1,150 @@
+import numpy as np
+
+from core import default
+from core.dsp_toolbox import DSPToolbox
+from core.window import Window
+
+class SpectralFeatures:
+    """
+    Computes per-slice features of amplitude spectra, for whole matrices of slices at once.
+    Features are returned as a structured array with one record per slice and one float field per feature:
+        centroid: amplitude-weighted mean frequency, in Hz.
+        bandwidth: amplitude-weighted standard deviation of frequencies around the centroid, in Hz.
+        rolloff: frequency below which lies a given fraction of the power of the slice, in Hz.
+        flatness: ratio of the geometric mean to the arithmetic mean of powers, between 0 (tonal) and 1 (noisy).
+        flux: norm of the increase of amplitudes since the previous slice, 0 for the first slice.
+        rms: root mean square level of the slice in sample units, from its spectrum and the noise power bandwidth of
+            the window.
+        peak_frequency: frequency of the loudest bin, in Hz.
+    Instances keep the last slice of the previous call, so that features of a wave may be computed block by block as
+    its spectra are produced.
+    """
+    names = ('centroid', 'bandwidth', 'rolloff', 'flatness', 'flux', 'rms', 'peak_frequency')
+
+    def __init__(self, frequencies, window=None, rolloff=0.85, dtype=np.float32):
+        """
+        Args:
+            frequencies (np.ndarray): frequency of every bin of the spectra, in Hz.
+            window (Window): the window with which the spectra were computed.
+            rolloff (float): fraction of the power of slices giving their rolloff frequency.
+            dtype (np.dtype): float type of the features.
+        """
+        if not 0 < rolloff <= 1:
+            raise ValueError('SpectralFeatures.__init__: `rolloff` must be within (0, 1].')
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+        if not isinstance(window, Window):
+            raise TypeError('SpectralFeatures.__init__: passed window is not a valid window.')
+
+        self.frequencies = np.asarray(frequencies, dtype=float)
+        self.window = window
+        self.rolloff = rolloff
+        self.dtype = np.dtype([(name, dtype) for name in self.names])
+        self.reset()
+
+    @staticmethod
+    def of_spectrogram(spectrogram, rolloff=0.85, block_frames=1024):
+        """
+        Computes the features of all slices of a spectrogram. Lazy spectrograms are processed a block of slices at a
+        time, without building their whole matrices.
+
+        Args:
+            spectrogram (Spectrogram): the spectrogram to describe.
+            rolloff (float): see `__init__`.
+            block_frames (int): number of slices to process at once.
+
+        Returns:
+            (np.ndarray): structured array of features, one record per slice.
+        """
+        features = SpectralFeatures(spectrogram.frequency_bins, spectrogram.metadata['window_type'](), rolloff)
+        blocks = [features.compute(spectrogram.spectra(start, start + block_frames)[0])
+                  for start in range(0, len(spectrogram.fft_slices), block_frames)]
+        return np.concatenate(blocks) if blocks else np.zeros(0, features.dtype)
+
+    @staticmethod
+    def of_sample(sample, window=None, size=default.SPECTROGRAM_SIZE, rolloff=0.85, block_frames=1024, dtype=None):
+        """
+        Computes the features of the slices of a sample straight from its spectra, batch by batch, without ever
+        building its spectrogram. See `DSPToolbox.stft_blocks`.
+
+        Args:
+            sample (Sample): the sample to describe.
+            window (Window): the window with which to process slices.
+            size (int): the number of frequency bins - half the size of slices.
+            rolloff (float): see `__init__`.
+            block_frames (int): number of slices to process at once.
+            dtype (np.dtype): float type to compute spectra with.
+
+        Returns:
+            (np.ndarray): structured array of features, one record per slice, or (channels x slices) for multichannel
+                samples.
+        """
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+
+        frequencies = np.arange(size) * sample.sample_rate / (2 * size)
+        features = SpectralFeatures(frequencies, window, rolloff)
+        blocks = [features.compute(np.abs(spectra))
+                  for _, spectra in DSPToolbox.stft_blocks(sample, window, size, block_frames, dtype)]
+        return np.concatenate(blocks, axis=-1) if blocks else np.zeros(0, features.dtype)
+
+    def reset(self):
+        """
+        Forgets the previous slice, as if the next call started a new wave.
+        """
+        self._previous = None
+
+    def compute(self, amp):
+        """
+        Computes the features of the next slices.
+
+        Args:
+            amp (np.ndarray): amplitude spectra, as a (slices x bins) array, or (channels x slices x bins).
+
+        Returns:
+            (np.ndarray): structured array of features, of shape (slices) or (channels x slices).
+        """
+        amp = np.asarray(amp)
+        if amp.shape[-1] != len(self.frequencies):
+            raise ValueError('SpectralFeatures.compute: expected spectra of {} bins, got {}.'.format(
+                len(self.frequencies), amp.shape[-1]))
+
+        features = np.zeros(amp.shape[:-1], self.dtype)
+        if not amp.shape[-2]:
+            return features
+
+        tiny = np.finfo(amp.dtype if amp.dtype.kind == 'f' else float).tiny
+        frequencies = self.frequencies
+        power = np.square(amp)
+        amp_sum = amp.sum(axis=-1)
+        power_sum = power.sum(axis=-1)
+        safe_amp_sum = np.maximum(amp_sum, tiny)
+
+        centroid = amp.dot(frequencies) / safe_amp_sum
+        features['centroid'] = centroid
+        spread = np.square(frequencies - centroid[..., np.newaxis])
+        features['bandwidth'] = np.sqrt(np.sum(amp * spread, axis=-1) / safe_amp_sum)
+
+        cumulated = np.cumsum(power, axis=-1)
+        reached = cumulated >= self.rolloff * power_sum[..., np.newaxis]
+        features['rolloff'] = frequencies[np.argmax(reached, axis=-1)]
+
+        # Silent slices are as flat as can be
+        log_mean = np.mean(np.log(np.maximum(power, tiny)), axis=-1)
+        mean = power_sum / power.shape[-1]
+        features['flatness'] = np.where(mean > tiny, np.exp(log_mean) / np.maximum(mean, tiny), 1.)
+
+        previous = self._previous if self._previous is not None else amp[..., :1, :]
+        shifted = np.concatenate((previous, amp[..., :-1, :]), axis=-2)
+        features['flux'] = np.sqrt(np.sum(np.square(np.maximum(amp - shifted, 0)), axis=-1))
+        self._previous = amp[..., -1:, :].copy()
+
+        # Amplitudes are those of sinusoids, whose mean power is half their squared amplitude except at 0 Hz, and are
+        # spread over the noise power bandwidth of the window
+        mean_power = (power_sum + power[..., 0]) / 2
+        features['rms'] = np.sqrt(mean_power / self.window.noise_pow_bw)
+
+        features['peak_frequency'] = frequencies[np.argmax(amp, axis=-1)]
+        return features
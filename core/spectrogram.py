@@ -1,4 +1,9 @@
+import math
+
+import numpy as np
+
 from core import default
+from core.lazy_frames import LazyFrames
 
 class Spectrogram:
     _default_metadata = {
@@ -6,20 +11,27 @@ class Spectrogram:
         'window_type': default.WindowClass
     }
 
-    def __init__(self, fft_slices, fft_size, metadata=None):
+    def __init__(self, fft_slices, fft_size, metadata=None, hop_size=None, amp_matrix=None, phase_matrix=None):
         """
         Represents a spectrogram.
 
         Args:
-            fft_slices (:obj:`list` of :obj:`FFTResult`): Overlapping FFT slices
+            fft_slices (:obj:`list` of :obj:`FFTResult`): Overlapping FFT slices. Any sequence supporting `len` and
+                indexing may be used instead, such as :obj:`LazyFrames` computing slices on demand.
             fft_size: used FFT size
             metadata: various info.
+            hop_size (float): number of samples between the starts of two consecutive slices.
+                Defaults to the hop of slices cut by `DSPToolbox`, 1.5 times the FFT size, if not provided.
+            amp_matrix (np.ndarray): amplitude spectra of the slices as a (slices x bins) array, if already available.
+            phase_matrix (np.ndarray): phase spectra of the slices as a (slices x bins) array, if already available.
         """
 
         self.fft_slices = fft_slices
         self.fft_size = fft_size
         self.overlap = fft_size / 2
-        self.sample_span = fft_size + ((len(fft_slices) - 1) * (fft_size / 2))
+        # Slices of 2 * fft_size samples, see `DSPToolbox.hop_size`
+        self.hop_size = hop_size or 2 * fft_size - self.overlap
+        self.sample_span = 2 * fft_size + (len(fft_slices) - 1) * self.hop_size if len(fft_slices) else 0
 
         self.metadata = metadata
         if not isinstance(metadata, dict):
@@ -29,3 +41,164 @@ class Spectrogram:
         for k, v in self._default_metadata.items():
             if k not in self.metadata:
                 self.metadata[k] = v
+
+        # Time and frequency axes, so that lookups never need to walk the slices
+        sampling_frequency = self.metadata['sampling_frequency']
+        self.time_step = self.hop_size / sampling_frequency
+        self.bin_spacing = sampling_frequency / (2 * fft_size)
+        self.frame_times = np.arange(len(fft_slices)) * self.time_step
+        self.frequency_bins = np.arange(fft_size) * self.bin_spacing
+
+        self._amp_matrix = amp_matrix
+        self._phase_matrix = phase_matrix
+
+    @property
+    def amp_matrix(self):
+        """
+        Amplitude spectra of all slices stacked in a (slices x bins) array, built on first access.
+        """
+        if self._amp_matrix is None:
+            self._amp_matrix, = self._stack_spectra(('amp_spectrum',), 0, len(self.fft_slices))
+        return self._amp_matrix
+
+    @property
+    def phase_matrix(self):
+        """
+        Phase spectra of all slices stacked in a (slices x bins) array, built on first access.
+        """
+        if self._phase_matrix is None:
+            self._phase_matrix, = self._stack_spectra(('phase_spectrum',), 0, len(self.fft_slices))
+        return self._phase_matrix
+
+    def frame_index(self, time):
+        """
+        Returns the index of the slice in progress at a given time.
+
+        Args:
+            time (float): time in seconds from the beginning of the spectrogram.
+
+        Returns:
+            int: index of the last slice starting at or before `time`, clamped to valid indices.
+        """
+        # Rounding guards against times computed from the time axis landing just below a slice start
+        index = int(math.floor(round(time / self.time_step, 9)))
+        return min(max(index, 0), len(self.fft_slices) - 1)
+
+    def bin_index(self, frequency):
+        """
+        Returns the index of the frequency bin nearest to a given frequency.
+
+        Args:
+            frequency (float): frequency in Hz.
+
+        Returns:
+            int: index of the nearest bin, clamped to valid indices.
+        """
+        index = int(round(frequency / self.bin_spacing))
+        return min(max(index, 0), self.fft_size - 1)
+
+    def frame_range(self, start_time=None, end_time=None):
+        """
+        Returns the bounds of the slices covering a time interval.
+
+        Args:
+            start_time (float): beginning of the interval in seconds. Start of the spectrogram if None.
+            end_time (float): end of the interval in seconds. End of the spectrogram if None.
+
+        Returns:
+            (int, int): index of the first slice and index past the last slice.
+        """
+        start = 0 if start_time is None else self.frame_index(start_time)
+        stop = len(self.fft_slices) if end_time is None else self.frame_index(end_time) + 1
+        return start, max(start, stop)
+
+    def bin_range(self, low_frequency=None, high_frequency=None):
+        """
+        Returns the bounds of the bins covering a frequency band.
+
+        Args:
+            low_frequency (float): lower bound of the band in Hz. First bin if None.
+            high_frequency (float): upper bound of the band in Hz. Last bin if None.
+
+        Returns:
+            (int, int): index of the first bin and index past the last bin.
+        """
+        low = 0 if low_frequency is None else self.bin_index(low_frequency)
+        high = self.fft_size if high_frequency is None else self.bin_index(high_frequency) + 1
+        return low, max(low, high)
+
+    def frames(self, start_time=None, end_time=None):
+        """
+        Returns the FFT slices covering a time interval.
+        Slices of lazy spectrograms are only computed for the requested interval.
+
+        Args:
+            start_time (float): beginning of the interval in seconds.
+            end_time (float): end of the interval in seconds.
+
+        Returns:
+            (:obj:`list` of :obj:`FFTResult`): the slices covering the interval.
+        """
+        start, stop = self.frame_range(start_time, end_time)
+        return list(self.fft_slices[start:stop])
+
+    def region(self, start_time=None, end_time=None, low_frequency=None, high_frequency=None):
+        """
+        Returns the amplitudes of a time and frequency region of the spectrogram.
+        The result is a view into `amp_matrix`, except for lazy spectrograms whose matrix has not been built yet:
+        only the requested slices are then computed, and the result is a new array.
+
+        Args:
+            start_time (float): beginning of the region in seconds.
+            end_time (float): end of the region in seconds.
+            low_frequency (float): lower frequency bound of the region in Hz.
+            high_frequency (float): upper frequency bound of the region in Hz.
+
+        Returns:
+            (np.ndarray): (slices x bins) amplitudes of the region.
+        """
+        start, stop = self.frame_range(start_time, end_time)
+        low, high = self.bin_range(low_frequency, high_frequency)
+
+        if self._amp_matrix is None and isinstance(self.fft_slices, LazyFrames):
+            return self._stack_spectra(('amp_spectrum',), start, stop)[0][:, low:high]
+
+        return self.amp_matrix[start:stop, low:high]
+
+    def spectra(self, start=0, stop=None):
+        """
+        Returns the amplitude and phase spectra of a range of slices.
+        Results are views into the matrices, except for lazy spectrograms whose matrices have not been built yet: only
+        the requested slices are then computed, which allows going through long spectrograms in constant memory.
+
+        Args:
+            start (int): index of the first slice.
+            stop (int): index past the last slice. All remaining slices if None.
+
+        Returns:
+            (np.ndarray, np.ndarray): (slices x bins) amplitude and phase spectra.
+        """
+        stop = len(self.fft_slices) if stop is None else min(stop, len(self.fft_slices))
+
+        if self._amp_matrix is None and isinstance(self.fft_slices, LazyFrames):
+            return tuple(self._stack_spectra(('amp_spectrum', 'phase_spectrum'), start, stop))
+
+        return self.amp_matrix[start:stop], self.phase_matrix[start:stop]
+
+    def _stack_spectra(self, attributes, start, stop):
+        """
+        Stacks spectra of slices `start` to `stop` into (slices x bins) matrices, one per attribute of the slices, going
+        through the slices once.
+        """
+        slices = self.fft_slices[start:stop]
+        matrices = []
+        for attribute in attributes:
+            spectra = [getattr(s, attribute) for s in slices]
+            # Spectra computed in single precision are stacked in single precision
+            dtype = np.result_type(np.float32, *set(np.asarray(s).dtype for s in spectra)) if spectra else np.float64
+            matrix = np.zeros((len(spectra), self.fft_size), dtype)
+            for i, spectrum in enumerate(spectra):
+                n_bins = min(len(spectrum), self.fft_size)
+                matrix[i, :n_bins] = spectrum[:n_bins]
+            matrices.append(matrix)
+        return matrices
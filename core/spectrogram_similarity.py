@@ -0,0 +1,235 @@
+import heapq
+
+import numpy as np
+
+from core import default
+from core.dsp_toolbox import DSPToolbox, rfft, irfft
+
+class SpectrogramSimilarity:
+    """
+    Compares spectrograms of the same size and sampling frequency, slice by slice.
+    Distances and correlations are computed on levels in dB relative to the reference level of the spectrograms, floored
+    so that silences compare equal however silent they are. Spectrograms of different durations are compared over the
+    slices they share, from their start.
+    """
+
+    @staticmethod
+    def levels(spectrogram, floor_db=-100., start=0, stop=None):
+        """
+        Returns:
+            (np.ndarray): levels in dB of slices `start` to `stop` of a spectrogram, as a (slices x bins) float32 array.
+        """
+        amp, _ = spectrogram.spectra(start, stop)
+        reference = spectrogram.fft_slices[0].reference_level if len(spectrogram.fft_slices) else \
+            default.REFERENCE_LEVEL
+        return DSPToolbox.to_db(amp, reference, floor_db=floor_db, dtype=np.float32)
+
+    @staticmethod
+    def spectral_distance(a, b, floor_db=-100.):
+        """
+        Computes the log-spectral distance between two spectrograms.
+
+        Args:
+            a (Spectrogram): the first spectrogram.
+            b (Spectrogram): the second spectrogram.
+            floor_db (float): level under which bins are considered silent.
+
+        Returns:
+            (float, np.ndarray): root mean square difference of levels in dB over all shared slices, and the same for
+                every shared slice.
+        """
+        n_frames = SpectrogramSimilarity._shared_frames(a, b)
+        difference = SpectrogramSimilarity.levels(a, floor_db, 0, n_frames) - \
+            SpectrogramSimilarity.levels(b, floor_db, 0, n_frames)
+        squares = np.mean(np.square(difference, dtype=np.float64), axis=-1)
+        return float(np.sqrt(squares.mean())) if n_frames else 0., np.sqrt(squares)
+
+    @staticmethod
+    def cosine_similarity(a, b):
+        """
+        Computes the cosine similarity of the amplitude spectra of every shared slice of two spectrograms.
+
+        Args:
+            a (Spectrogram): the first spectrogram.
+            b (Spectrogram): the second spectrogram.
+
+        Returns:
+            (np.ndarray): similarity of every shared slice, from 0 for spectra without common bins to 1 for spectra
+                differing by a gain. Slices silent in both spectrograms are similar, and silent in one only dissimilar.
+        """
+        n_frames = SpectrogramSimilarity._shared_frames(a, b)
+        amp_a = np.asarray(a.spectra(0, n_frames)[0], np.float64)
+        amp_b = np.asarray(b.spectra(0, n_frames)[0], np.float64)
+
+        norms = np.sqrt(np.sum(np.square(amp_a), axis=-1) * np.sum(np.square(amp_b), axis=-1))
+        dots = np.sum(amp_a * amp_b, axis=-1)
+        silent = (np.sum(amp_a, axis=-1) == 0) & (np.sum(amp_b, axis=-1) == 0)
+        return np.where(norms > 0, dots / np.where(norms > 0, norms, 1), silent.astype(float))
+
+    @staticmethod
+    def cross_correlation(a, b, floor_db=-100.):
+        """
+        Computes the normalised cross-correlation of two spectrograms along time, for all lags at once by FFT.
+        The levels of every bin are centred on their mean over the spectrogram, so that constant spectra do not
+        correlate.
+
+        Args:
+            a (Spectrogram): the first spectrogram.
+            b (Spectrogram): the second spectrogram.
+            floor_db (float): level under which bins are considered silent.
+
+        Returns:
+            (np.ndarray, np.ndarray): lags in slices, from `1 - len(a)` to `len(b) - 1`, and the correlation at every
+                lag, between -1 and 1. A lag of k means that slice t of `a` lines up with slice t + k of `b`.
+        """
+        SpectrogramSimilarity._shared_frames(a, b)
+        levels_a = SpectrogramSimilarity.levels(a, floor_db).astype(np.float64)
+        levels_b = SpectrogramSimilarity.levels(b, floor_db).astype(np.float64)
+        levels_a -= levels_a.mean(axis=0) if len(levels_a) else 0
+        levels_b -= levels_b.mean(axis=0) if len(levels_b) else 0
+
+        n_a, n_b = len(levels_a), len(levels_b)
+        lags = np.arange(1 - n_a, n_b)
+        if not n_a or not n_b:
+            return lags, np.zeros(len(lags))
+
+        # Correlations of all bins are summed in the frequency domain, leaving a single inverse FFT
+        n_fft = 1 << int(n_a + n_b - 1).bit_length()
+        spectra = np.sum(np.conj(rfft(levels_a, n_fft, axis=0)) * rfft(levels_b, n_fft, axis=0), axis=1)
+        correlation = irfft(spectra, n_fft)
+        correlation = np.concatenate((correlation[n_fft - (n_a - 1):], correlation[:n_b]))
+
+        norm = np.sqrt(np.sum(np.square(levels_a)) * np.sum(np.square(levels_b)))
+        return lags, correlation / norm if norm > 0 else np.zeros(len(lags))
+
+    @staticmethod
+    def align(a, b, floor_db=-100.):
+        """
+        Finds the time offset between two spectrograms, at the peak of their cross-correlation.
+
+        Args:
+            a (Spectrogram): the first spectrogram.
+            b (Spectrogram): the second spectrogram.
+            floor_db (float): level under which bins are considered silent.
+
+        Returns:
+            (int, float, float): lag in slices and in seconds by which `b` is late on `a`, and the correlation at that
+                lag.
+        """
+        lags, correlation = SpectrogramSimilarity.cross_correlation(a, b, floor_db)
+        best = int(np.argmax(correlation))
+        return int(lags[best]), float(lags[best] * a.time_step), float(correlation[best])
+
+    @staticmethod
+    def _shared_frames(a, b):
+        """
+        Checks that two spectrograms are comparable, and returns the number of slices they share.
+        """
+        if a.fft_size != b.fft_size or a.metadata['sampling_frequency'] != b.metadata['sampling_frequency']:
+            raise ValueError('SpectrogramSimilarity: spectrograms must share their size and sampling frequency.')
+        return min(len(a.fft_slices), len(b.fft_slices))
+
+
+class SpectrogramCatalogue:
+    """
+    Set of reference spectrograms which queries are compared to by spectral distance, see
+    `SpectrogramSimilarity.spectral_distance`.
+    Every reference is summarised by the mean of its levels over blocks of slices and bins. The distance between
+    summaries is a lower bound of the distance between spectrograms, by convexity, so that references are compared in
+    increasing order of bound and the search stops as soon as no remaining reference can make it into the results.
+    Only those references are read in full again, so that lazy references need not keep their slices in memory.
+    """
+
+    def __init__(self, references, floor_db=-100., pool=(8, 8)):
+        """
+        Args:
+            references (list): the reference spectrograms, which must share their size and sampling frequency.
+            floor_db (float): level under which bins are considered silent.
+            pool (tuple): number of slices and of bins averaged together in summaries. Larger blocks give smaller
+                summaries but looser bounds.
+        """
+        self.references = list(references)
+        self.floor_db = floor_db
+        self.pool = tuple(pool)
+        for reference in self.references[1:]:
+            SpectrogramSimilarity._shared_frames(self.references[0], reference)
+
+        self.frame_counts = np.array([len(r.fft_slices) for r in self.references], np.int64)
+        summaries = [self._summary(r) for r in self.references]
+        n_blocks = max([len(s) for s in summaries] + [0])
+        n_bins = summaries[0].shape[1] if summaries else 0
+        # Summaries padded to the longest, shorter references being masked by their block counts
+        self._summaries = np.zeros((len(summaries), n_blocks, n_bins), np.float32)
+        for i, summary in enumerate(summaries):
+            self._summaries[i, :len(summary)] = summary
+        # Number of references read in full by the last search
+        self.evaluated = 0
+
+    def __len__(self):
+        return len(self.references)
+
+    def bounds(self, query):
+        """
+        Computes lower bounds of the spectral distance between a query and every reference.
+
+        Args:
+            query (Spectrogram): the query.
+
+        Returns:
+            (np.ndarray): the lower bound for every reference.
+        """
+        if self.references:
+            SpectrogramSimilarity._shared_frames(query, self.references[0])
+
+        frame_pool, bin_pool = self.pool
+        summary = self._summary(query)
+        n_blocks = min(len(summary), self._summaries.shape[1])
+        squares = np.sum(np.square(self._summaries[:, :n_blocks] - summary[:n_blocks], dtype=np.float64), axis=-1)
+
+        # Only blocks of slices shared by the query and each reference count, as in the distance
+        shared = np.minimum(self.frame_counts, len(query.fft_slices))
+        squares[np.arange(n_blocks) >= (shared // frame_pool)[:, np.newaxis]] = 0
+        total = frame_pool * bin_pool * squares.sum(axis=-1)
+        return np.sqrt(total / np.maximum(shared * query.fft_size, 1))
+
+    def search(self, query, top=5, max_distance=None):
+        """
+        Finds the references closest to a query.
+
+        Args:
+            query (Spectrogram): the query.
+            top (int): maximum number of references to return.
+            max_distance (float): distance in dB beyond which references are not returned. No limit if None.
+
+        Returns:
+            (list): (index, distance) of the closest references, by increasing distance.
+        """
+        bounds = self.bounds(query)
+        # Max-heap of the best results so far, as (-distance, index)
+        best = []
+        self.evaluated = 0
+        for index in np.argsort(bounds, kind='mergesort'):
+            bound = bounds[index]
+            if (max_distance is not None and bound > max_distance) or (len(best) == top and bound >= -best[0][0]):
+                break
+
+            distance, _ = SpectrogramSimilarity.spectral_distance(query, self.references[index], self.floor_db)
+            self.evaluated += 1
+            if max_distance is not None and distance > max_distance:
+                continue
+            if len(best) < top:
+                heapq.heappush(best, (-distance, int(index)))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, int(index)))
+
+        return sorted(((index, -distance) for distance, index in best), key=lambda result: result[1])
+
+    def _summary(self, spectrogram):
+        """
+        Mean levels over whole blocks of slices and bins, as a (blocks x bin blocks) array.
+        """
+        frame_pool, bin_pool = self.pool
+        levels = SpectrogramSimilarity.levels(spectrogram, self.floor_db)
+        n_blocks, n_bins = len(levels) // frame_pool, spectrogram.fft_size // bin_pool
+        levels = levels[:n_blocks * frame_pool, :n_bins * bin_pool]
+        return levels.reshape(n_blocks, frame_pool, n_bins, bin_pool).mean(axis=(1, 3))
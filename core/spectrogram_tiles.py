@@ -0,0 +1,175 @@
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from core import default
+
+class TiledSpectrogramRenderer:
+    """
+    Renders a spectrogram as a pyramid of fixed-size image tiles, for viewers zooming over very long audio.
+    Level 0 holds one pixel column per slice and one pixel row per bin; every further level halves both resolutions.
+    Tiles are written to `<folder>/<level>/<x>_<y>.png` as soon as they are complete, so slices can be fed while they
+    are being produced and only a few tiles worth of columns are ever held in memory.
+    """
+    _modes = {
+        'max': np.maximum,
+        'mean': lambda a, b: (a + b) / 2
+    }
+
+    def __init__(self, folder, fft_size, reference_level=default.REFERENCE_LEVEL, tile_size=256, levels=8, mode='max',
+                       metadata=None):
+        """
+        Args:
+            folder (str): folder to write tiles to.
+            fft_size (int): number of frequency bins of the slices to render.
+            reference_level (float): amplitude mapped to full white.
+            tile_size (int): width and height of tiles in pixels.
+            levels (int): number of levels in the pyramid.
+            mode (str): how to decimate the spectrogram from one level to the next, either 'max' or 'mean'.
+            metadata (dict): extra info written to the pyramid description file.
+        """
+        if mode not in self._modes:
+            raise ValueError('TiledSpectrogramRenderer.__init__: unknown decimation mode `{}`.'.format(mode))
+        if tile_size < 1 or levels < 1:
+            raise ValueError('TiledSpectrogramRenderer.__init__: `tile_size` and `levels` must be at least 1.')
+
+        self.folder = folder
+        self.fft_size = fft_size
+        self.reference_level = reference_level
+        self.tile_size = tile_size
+        self.levels = levels
+        self.mode = mode
+        self.metadata = dict(metadata) if isinstance(metadata, dict) else {}
+
+        self._reduce = self._modes[mode]
+        self._heights = [max(1, -(-fft_size // (1 << level))) for level in range(levels)]
+        self._columns = [[] for _ in range(levels)]
+        self._pending = [None] * levels
+        self._widths = [0] * levels
+        self._closed = False
+
+    def add_frame(self, amp_spectrum):
+        """
+        Feeds the amplitude spectrum of the next slice to the renderer.
+
+        Args:
+            amp_spectrum (np.ndarray): amplitudes of the slice, one per frequency bin.
+        """
+        if self._closed:
+            raise ValueError('TiledSpectrogramRenderer.add_frame: renderer was closed.')
+
+        column = np.zeros(self.fft_size)
+        n_bins = min(len(amp_spectrum), self.fft_size)
+        column[:n_bins] = amp_spectrum[:n_bins]
+        self._push(0, column)
+
+    def add_frames(self, amp_spectra):
+        """
+        Feeds several slices to the renderer.
+
+        Args:
+            amp_spectra (iterable of np.ndarray): amplitude spectra of the slices, in order.
+        """
+        for amp_spectrum in amp_spectra:
+            self.add_frame(amp_spectrum)
+
+    def close(self):
+        """
+        Writes the remaining incomplete tiles as well as the pyramid description file.
+
+        Returns:
+            (dict): the pyramid description.
+        """
+        if self._closed:
+            return self.description()
+
+        # Carry unpaired columns over to the next level before flushing, so that coarser levels cover the full duration
+        for level in range(self.levels - 1):
+            if self._pending[level] is not None:
+                self._push(level + 1, self._decimate_frequencies(self._pending[level]))
+                self._pending[level] = None
+
+        for level in range(self.levels):
+            if self._columns[level]:
+                self._write_tiles(level)
+
+        self._closed = True
+        description = self.description()
+        os.makedirs(self.folder, exist_ok=True)
+        with open(os.path.join(self.folder, 'tiles.json'), 'w') as f:
+            json.dump(description, f, indent=4)
+
+        return description
+
+    def description(self):
+        """
+        Describes the pyramid for viewers.
+
+        Returns:
+            (dict): tile size, and width and height of every level in pixels.
+        """
+        description = {
+            'tile_size': self.tile_size,
+            'mode': self.mode,
+            'levels': [{'width': w, 'height': h} for w, h in zip(self._widths, self._heights)]
+        }
+        description.update(self.metadata)
+        return description
+
+    def render(self, spectrogram):
+        """
+        Renders all slices of a spectrogram and closes the renderer.
+        Slices of lazy spectrograms are computed one after the other as tiles are written.
+
+        Args:
+            spectrogram (Spectrogram): the spectrogram to render.
+
+        Returns:
+            (dict): the pyramid description.
+        """
+        self.metadata.setdefault('time_step', spectrogram.time_step)
+        self.metadata.setdefault('bin_spacing', spectrogram.bin_spacing)
+        self.add_frames(s.amp_spectrum for s in spectrogram.fft_slices)
+        return self.close()
+
+    def _push(self, level, column):
+        self._columns[level].append(column)
+        self._widths[level] += 1
+        if len(self._columns[level]) == self.tile_size:
+            self._write_tiles(level)
+
+        if level + 1 >= self.levels:
+            return
+
+        if self._pending[level] is None:
+            self._pending[level] = column
+        else:
+            merged = self._reduce(self._pending[level], column)
+            self._pending[level] = None
+            self._push(level + 1, self._decimate_frequencies(merged))
+
+    def _decimate_frequencies(self, column):
+        if len(column) == 1:
+            return column
+        if len(column) % 2:
+            column = np.append(column, column[-1])
+        pairs = column.reshape(-1, 2)
+        return self._reduce(pairs[:, 0], pairs[:, 1])
+
+    def _write_tiles(self, level):
+        columns = self._columns[level]
+        x = (self._widths[level] - 1) // self.tile_size
+
+        # Highest frequencies on top
+        matrix = np.stack(columns, axis=1)[::-1]
+        pixels = np.clip(matrix / self.reference_level * 255, 0, 255).astype(np.uint8)
+
+        level_folder = os.path.join(self.folder, str(level))
+        os.makedirs(level_folder, exist_ok=True)
+        for y in range(0, pixels.shape[0], self.tile_size):
+            tile = Image.fromarray(np.ascontiguousarray(pixels[y:y + self.tile_size]))
+            tile.save(os.path.join(level_folder, '{}_{}.png'.format(x, y // self.tile_size)))
+
+        self._columns[level] = []
@@ -0,0 +1,172 @@
+import numpy as np
+
+from core import default
+from core.dsp_toolbox import DSPToolbox
+from core.window import Window
+
+class StreamingISTFT:
+    """
+    Restores a wave from spectra fed in order, a few slices at a time, the same way `DSPToolbox.istft` would.
+    Only the tail of the wave which later slices still overlap is kept between calls, so that restoring arbitrarily
+    long spectrograms takes constant memory. Blocks of finished samples can be written straight to a
+    `WavWriter` opened for appending.
+    """
+
+    def __init__(self, window=None, size=default.SPECTROGRAM_SIZE, length=None, dtype=None, eps=1e-3):
+        """
+        Args:
+            window (Window): the window with which the spectra were computed.
+            size (int): the number of frequency bins of the spectra - half the size of slices.
+            length (int): number of samples of the wave, e.g. the length of the analysed sample. Samples past it are
+                dropped, and the wave is padded with zeros up to it when flushed. All samples covered by slices if None.
+            dtype (np.dtype): float type to compute with. Defaults to `default.FLOAT_TYPE`.
+            eps (float): see `DSPToolbox.istft`.
+        """
+        # Instantiate a default window if none provided
+        if not window:
+            window = default.WindowClass()
+        if not isinstance(window, Window):
+            raise TypeError('StreamingISTFT.__init__: passed window is not a valid window.')
+
+        self.window = window
+        self.size = size
+        self.length = length
+        self.float_type, self.complex_type = DSPToolbox.float_types(dtype)
+        self.slice_length = 2 * size
+        self.hop = DSPToolbox.hop_size(size)
+
+        squares = np.square(window.scaling_factors(self.slice_length, self.float_type))
+        self._squares = squares
+        self._floor = eps * squares.max()
+
+        self.reset()
+
+    def reset(self):
+        """
+        Drops any pending samples and starts a new wave.
+        """
+        self.frame_count = 0
+        self.sample_count = 0
+        self._tail = None
+        self._tail_weights = np.zeros(0, self.float_type)
+
+    def process(self, spectra):
+        """
+        Adds the next slices to the wave.
+
+        Args:
+            spectra (np.ndarray): complex spectra of the next slices, as a (slices x bins) array, or
+                (channels x slices x bins) for multichannel waves. A single slice may be given as a (bins) array.
+
+        Returns:
+            (np.ndarray): the samples which no later slice overlaps, of shape (samples) or (samples x channels).
+                May be empty.
+        """
+        spectra = np.asarray(spectra)
+        if spectra.ndim == 1:
+            spectra = spectra[np.newaxis]
+        if spectra.shape[-1] != self.size:
+            raise ValueError('StreamingISTFT.process: expected spectra of {} bins, got {}.'.format(self.size,
+                                                                                                  spectra.shape[-1]))
+
+        n_frames = spectra.shape[-2]
+        channel_shape = spectra.shape[:-2]
+        if self._tail is None:
+            self._tail = np.zeros(channel_shape + (0,), self.float_type)
+        elif self._tail.shape[:-1] != channel_shape:
+            raise ValueError('StreamingISTFT.process: the number of channels changed.')
+        if not n_frames:
+            return self._output(np.zeros(channel_shape + (0,), self.float_type))
+
+        frames, _ = DSPToolbox.inverse_frames(spectra, self.window, self.float_type)
+
+        # Offsets of the slices from the first pending sample
+        starts = (np.arange(self.frame_count, self.frame_count + n_frames) * self.hop).astype(int)
+        offsets = starts - self.sample_count
+        span = offsets[-1] + self.slice_length
+
+        wave = np.zeros(channel_shape + (span,), self.float_type)
+        weights = np.zeros(span, self.float_type)
+        wave[..., :self._tail.shape[-1]] = self._tail
+        weights[:len(self._tail_weights)] = self._tail_weights
+
+        indices = offsets[:, np.newaxis] + np.arange(self.slice_length)
+        # Slices two apart never overlap, see `DSPToolbox.istft`
+        for parity in (0, 1):
+            wave[..., indices[parity::2]] += frames[..., parity::2, :]
+            weights[indices[parity::2]] += self._squares
+
+        # Samples before the start of the next slice are complete
+        self.frame_count += n_frames
+        done = int(self.frame_count * self.hop) - self.sample_count
+        return self._emit(wave, weights, done)
+
+    def flush(self):
+        """
+        Returns all pending samples, then starts a new wave.
+
+        Returns:
+            (np.ndarray): the last samples of the wave, of shape (samples) or (samples x channels).
+        """
+        tail = self._tail if self._tail is not None else np.zeros(0, self.float_type)
+        padding = 0 if self.length is None else max(0, self.length - self.sample_count - tail.shape[-1])
+        if padding:
+            tail = np.concatenate((tail, np.zeros(tail.shape[:-1] + (padding,), self.float_type)), axis=-1)
+            weights = np.concatenate((self._tail_weights, np.zeros(padding, self.float_type)))
+        else:
+            weights = self._tail_weights
+
+        block = self._emit(tail, weights, tail.shape[-1])
+        self.reset()
+        return block
+
+    def stream(self, spectrogram, block_frames=256):
+        """
+        Restores the wave of a whole spectrogram, block by block.
+
+        Args:
+            spectrogram (Spectrogram): the spectrogram to restore. Slices of lazy spectrograms are computed one block
+                at a time.
+            block_frames (int): number of slices to restore per block.
+
+        Yields:
+            (np.ndarray): consecutive blocks of samples, the last one included.
+        """
+        self.reset()
+        for start in range(0, len(spectrogram.fft_slices), block_frames):
+            amp, phase = spectrogram.spectra(start, start + block_frames)
+            spectra = np.exp(1j * phase.astype(self.float_type, copy=False)).astype(self.complex_type, copy=False)
+            spectra *= amp
+            yield self.process(spectra)
+
+        yield self.flush()
+
+    def write(self, spectrogram, writer, block_frames=256):
+        """
+        Restores the wave of a whole spectrogram straight into an audio file.
+
+        Args:
+            spectrogram (Spectrogram): the spectrogram to restore.
+            writer (WavWriter): writer of the file, which is opened and closed here.
+            block_frames (int): number of slices to restore per block.
+        """
+        reference_level = spectrogram.fft_slices[0].reference_level
+        sample_width = ((int(reference_level).bit_length() - 1) // 8) + 1
+
+        writer.open(spectrogram.metadata['sampling_frequency'], sample_width)
+        try:
+            for block in self.stream(spectrogram, block_frames):
+                writer.append(block)
+        finally:
+            writer.close()
+
+    def _emit(self, wave, weights, done):
+        emitted = done if self.length is None else min(done, max(0, self.length - self.sample_count))
+        block = wave[..., :emitted] / np.maximum(weights[:emitted], self._floor)
+        self._tail = wave[..., done:]
+        self._tail_weights = weights[done:]
+        self.sample_count += done
+        return self._output(block)
+
+    def _output(self, block):
+        return block.T if block.ndim == 2 else block
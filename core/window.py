@@ -39,12 +39,14 @@ class Window:
 
         return res
 
-    def _generate_scaling_factors(self, length):
+    def _generate_scaling_factors(self, length, dtype=None):
         """
         Generate the scaling factors corresponding to the window type, given a certain length.
+        Concrete windows must implement this method, including its `dtype` argument.
 
         Args:
             length (int): number of scaling factors to generate.
+            dtype (np.dtype): float type of the scaling factors. Double precision if None.
 
         Returns:
             (np.ndarray): the sequence of scaling factors.
@@ -52,12 +54,28 @@ class Window:
 
         raise NotImplementedError('Base Window.__generate_scaling_factors was called. A concrete window class might not be properly implemented.')
 
-    def process(self, samples):
+    def scaling_factors(self, length, dtype=None):
+        """
+        Returns the scaling factors of the window for a given length, e.g. to weight filter taps or overlapping slices.
+
+        Args:
+            length (int): number of scaling factors.
+            dtype (np.dtype): float type of the scaling factors. Double precision if None.
+
+        Returns:
+            (np.ndarray): the sequence of scaling factors. It may be shared between calls and must not be modified.
+        """
+        return self._generate_scaling_factors(length, dtype)
+
+    def process(self, samples, dtype=None):
         """
         Effectively windows the input sample and returns it.
 
         Args:
-            sample (np.ndarray): input samples to window.
+            sample (np.ndarray): input samples to window. Multidimensional arrays are windowed along their last axis,
+                which allows windowing a whole batch of slices at once.
+            dtype (np.dtype): float type of the scaling factors, which sets the type of the result for integer samples.
+                Defaults to the type of single-precision float samples, and to double precision otherwise.
 
         Returns:
             (nd.array): windowed samples
@@ -65,6 +83,10 @@ class Window:
 
         # The following is the basic template that basically implements the windowing.
         # It should not need to be overriden.
-        factors = self._generate_scaling_factors(len(samples))
+        length = samples.shape[-1] if isinstance(samples, np.ndarray) else len(samples)
+        if dtype is None:
+            single = isinstance(samples, np.ndarray) and samples.dtype == np.float32
+            dtype = np.float32 if single else np.float64
+        factors = self.scaling_factors(length, dtype)
 
         return factors * samples
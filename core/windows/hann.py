@@ -19,23 +19,28 @@ class HannWindow(Window):
         self.dB6_width = 2.
         self.scale = scale
 
-    def _generate_scaling_factors(self, length):
+    def _generate_scaling_factors(self, length, dtype=None):
         """
         Generate the scaling factors corresponding to the window type, given a certain length.
 
         Args:
             length (int): number of scaling factors to generate.
+            dtype (np.dtype): float type of the scaling factors. Double precision if None.
 
         Returns:
             (np.ndarray): the sequence of scaling factors.
         """
-        if length in self.__factors:
-            return self.__factors[length]
+        dtype = np.dtype(np.float64 if dtype is None else dtype)
+        key = (length, dtype)
+        if key in self.__factors:
+            return self.__factors[key]
 
         factors = (np.arange(length) * np.pi) / (length - 1)
         factors = np.sin(np.sin(factors)) * self.scale
 
-        self.__factors[length] = factors
+        # Factors are always computed in double precision, then rounded once if needed
+        factors = factors.astype(dtype)
+        self.__factors[key] = factors
         return factors
 
     def __repr__(self):
@@ -49,19 +54,3 @@ class HannWindow(Window):
         res += 'Parameters:\n'
         res += 'Scale: {}.\n'.format(self.scale)
         return res
-
-    # def process(self, samples):
-    #     """
-    #     Effectively windows the input sample and returns it.
-    #
-    #     Args:
-    #         sample (np.ndarray): input samples to window.
-    #
-    #     Returns:
-    #         (nd.array): windowed samples
-    #     """
-    #
-    #     factors = self.__generate_scaling_factors(len(samples))
-    #     new_samples = factors * samples
-    #
-    #     return new_samples
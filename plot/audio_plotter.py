@@ -10,44 +10,61 @@ from core.dsp_toolbox import DSPToolbox as DSP
 from core.fft_result import FFTResult
 
 from plot.audio_hz_scale import AudioHzScale
+from plot.wave_envelope import WaveEnvelope
 
 class AudioPlotter:
     """
     Provides static methods to plot all kinds of audio-related stuff.
+    `plot_*` methods go through pyplot, while `draw_*` methods draw onto given axes and leave any pyplot state alone.
     """
     @staticmethod
-    def plot_wave(sample, title='', save_image=False, filename=''):
+    def plot_wave(sample, title='', save_image=False, filename='', start_time=None, end_time=None, envelope=None,
+                  columns=None):
         """
         Plots the waveform of a given sample.
+        Long waveforms are decimated to one min/max pair per pixel column before plotting.
 
         Args:
             sample (Sample): sample whose waveform is to plot
             title (str): title of the plot
             save_image (bool): whether to write the plot to the disk as an image
             filename (str): filename to save the plot image to if saving
+            start_time (float): time in seconds to start the plot at, if not the beginning of the sample
+            end_time (float): time in seconds to end the plot at, if not the end of the sample
+            envelope (WaveEnvelope): envelope cache of the sample waveform, to speed up repeated plots at different zooms
+            columns (int): number of pixel columns to decimate to. Defaults to the width of the figure in pixels
         """
-        x = np.arange(len(sample.wave)) / sample.sample_rate
-        y = np.asarray(sample.wave) / (1 << (sample.bit_depth - 1))
-        plt.plot(x, y)
+        AudioPlotter.draw_wave(plt.gca(), sample, title, start_time, end_time, envelope, columns)
+        AudioPlotter._show('wave', save_image, filename)
 
-        axes = plt.gca()
-        axes.set_xlim([0, x[-1]])
+    @staticmethod
+    def draw_wave(axes, sample, title='', start_time=None, end_time=None, envelope=None, columns=None):
+        """
+        Draws the waveform of a given sample onto matplotlib axes. See `plot_wave` for arguments.
+        """
+        wave = np.asarray(sample.wave)
+        start = 0 if start_time is None else int(start_time * sample.sample_rate)
+        end = len(wave) if end_time is None else int(end_time * sample.sample_rate)
+        # Times outside of the sample would wrap around when slicing
+        start = min(max(0, start), len(wave))
+        end = min(max(start, end), len(wave))
+
+        if columns is None:
+            figure = axes.get_figure()
+            columns = int(figure.get_figwidth() * figure.dpi)
+
+        positions, mins, maxs = AudioPlotter._wave_envelope(wave, start, end, columns, envelope)
+        x = positions / sample.sample_rate
+        full_scale = 1 << (sample.bit_depth - 1)
+
+        if mins is maxs:
+            axes.plot(x, mins / full_scale)
+        else:
+            axes.fill_between(x, mins / full_scale, maxs / full_scale, linewidth=0.5)
+
+        axes.set_xlim([start / sample.sample_rate, max(start, end - 1) / sample.sample_rate])
         axes.set_ylim([-1, 1])
-
-        plt.title(title)
-
-        if matplotlib.get_backend() == 'agg':
-            save_image = True
-
-        if save_image:
-            file = filename or 'wave_{}.png'.format(datetime.now().strftime('%Y-%m-%d_%H:%M:%S'))
-            plt.draw()
-            plt.savefig(file)
-
-        try:
-            plt.show()
-        except:
-            pass
+        axes.set_title(title)
 
     @staticmethod
     def plot_spectrum(fft, title='', fill=True, show_constant=None, save_image=False, filename=''):
@@ -61,62 +78,103 @@ class AudioPlotter:
             save_image (bool): whether to write the plot to the disk as an image
             filename (str): filename to save the plot image to if saving
         """
+        AudioPlotter.draw_spectrum(plt.gca(), fft, title, fill, show_constant)
+        AudioPlotter._show('spectrum', save_image, filename)
+
+    @staticmethod
+    def draw_spectrum(axes, fft, title='', fill=True, show_constant=None):
+        """
+        Draws the spectrum corresponding to input FFT data onto matplotlib axes. See `plot_spectrum` for arguments.
+        """
         dbs = DSP.to_db(fft.amp_spectrum, fft.reference_level)
-        plt.plot(fft.frequency_bins, dbs, lw=0.25)
+        axes.plot(fft.frequency_bins, dbs, lw=0.25)
         min_value = dbs.min()
 
         if fill:
             dbs[0] = min_value
             dbs[-1] = min_value
-            plt.fill(fft.frequency_bins, dbs)
+            axes.fill(fft.frequency_bins, dbs)
 
         if show_constant is not None:
-            plt.plot(fft.frequency_bins, np.full(fft.frequency_bins.shape[0], show_constant))
+            axes.plot(fft.frequency_bins, np.full(fft.frequency_bins.shape[0], show_constant))
 
-        axes = plt.gca()
         axes.set_xscale('audio_hz')
         axes.set_xlim([20, 20000])
         axes.set_ylim([min_value, 0])
+        axes.set_title(title)
 
-        plt.title(title)
-
-        if matplotlib.get_backend() == 'agg':
-            save_image = True
+    @staticmethod
+    def plot_spectrogram(spectrogram, title='', save_image=False, filename='', scale='linear', floor_db=-100.,
+                         cmap='gray', resolution=None):
+        """
+        Plots a spectrogram straight from its amplitude matrix.
+        The matrix is first max-decimated down to the resolution of the figure.
 
-        if save_image:
-            file = filename or 'spectrum_{}.png'.format(datetime.now().strftime('%Y-%m-%d_%H:%M:%S'))
-            plt.draw()
-            plt.savefig(file)
+        Args:
+            spectrogram (Spectrogram): the spectrogram to plot
+            title (str): title of the plot
+            save_image (bool): whether to write the plot to the disk as an image
+            filename (str): filename to save the plot image to if saving
+            scale (str): 'linear' to plot amplitudes relative to the reference level, 'db' to plot them in decibels
+            floor_db (float): lowest level to plot if in decibels
+            cmap (str): name of the matplotlib colormap to plot with
+            resolution ((int, int)): number of pixel columns and rows to decimate to. Defaults to the figure size
+        """
+        AudioPlotter.draw_spectrogram(plt.gca(), spectrogram, title, scale, floor_db, cmap, resolution)
+        AudioPlotter._show('spectrogram', save_image, filename)
 
-        try:
-            plt.show()
-        except:
-            pass
+    @staticmethod
+    def draw_spectrogram(axes, spectrogram, title='', scale='linear', floor_db=-100., cmap='gray', resolution=None):
+        """
+        Draws a spectrogram onto matplotlib axes. See `plot_spectrogram` for arguments.
+        """
+        if scale not in ('linear', 'db'):
+            raise ValueError('AudioPlotter.draw_spectrogram: unknown scale `{}`.'.format(scale))
+
+        if resolution is None:
+            figure = axes.get_figure()
+            resolution = (int(figure.get_figwidth() * figure.dpi), int(figure.get_figheight() * figure.dpi))
+
+        matrix = AudioPlotter._decimate_max(spectrogram.amp_matrix, resolution[0], axis=0)
+        matrix = AudioPlotter._decimate_max(matrix, resolution[1], axis=1)
+
+        reference_level = spectrogram.fft_slices[0].reference_level
+        if scale == 'db':
+            values = DSP.to_db(matrix, reference_level, floor_db=floor_db, dtype=np.float32)
+            vmin, vmax = floor_db, 0
+        else:
+            values = matrix / reference_level
+            vmin, vmax = 0, 1
+
+        extent = [
+            0, spectrogram.frame_times[-1] + spectrogram.time_step,
+            0, spectrogram.frequency_bins[-1] + spectrogram.bin_spacing
+        ]
+        axes.imshow(values.T, origin='lower', aspect='auto', interpolation='nearest', extent=extent,
+                    cmap=cmap, vmin=vmin, vmax=vmax)
+        axes.set_xlabel('Time (s)')
+        axes.set_ylabel('Frequency (Hz)')
+        axes.set_title(title)
 
     @staticmethod
-    def plot_spectrogram(spectrogram, save_image=False, filename=''):
-        spectro_im = DSP.image_from_spectrogram(spectrogram)
-        im = spectro_im.i
+    def plot_image(im):
         matrix = np.asarray(im)
-
-        max_freq = spectrogram.fft_slices[0].max_frequency
-        sampling_freq = spectrogram.fft_slices[0].metadata['sampling_frequency']
-        sample_duration = 1 / sampling_freq
-        spectrogram_duration = sample_duration * spectrogram.sample_span
-
-        xticks, xlabels, yticks, ylabels = AudioPlotter._get_spectrogram_axis_info(spectrogram_duration, im.width, max_freq, im.height)
-
         plt.imshow(matrix, cmap='gray', vmin=0, vmax=255)
-        plt.xticks(xticks, xlabels)
-        plt.yticks(yticks, ylabels)
+        plt.draw()
         plt.show()
 
+    @staticmethod
+    def _show(kind, save_image, filename):
+        """
+        Saves the current pyplot figure if requested or if no display is available, then shows it.
+        """
         if matplotlib.get_backend() == 'agg':
             save_image = True
 
         if save_image:
-            file = filename or 'spectrogram_{}.png'.format(datetime.now().strftime('%Y-%m-%d_%H:%M:%S'))
-            plt.imsave(file, matrix)
+            file = filename or '{}_{}.png'.format(kind, datetime.now().strftime('%Y-%m-%d_%H:%M:%S'))
+            plt.draw()
+            plt.savefig(file)
 
         try:
             plt.show()
@@ -124,23 +182,36 @@ class AudioPlotter:
             pass
 
     @staticmethod
-    def plot_image(im):
-        matrix = np.asarray(im)
-        plt.imshow(matrix, cmap='gray', vmin=0, vmax=255)
-        plt.draw()
-        plt.show()
+    def _decimate_max(matrix, size, axis):
+        """
+        Reduces a matrix along an axis to at most about `size` elements, keeping the maximum of every group.
+        """
+        factor = -(-matrix.shape[axis] // max(1, size))
+        if factor <= 1:
+            return matrix
 
-    @staticmethod
-    def _get_spectrogram_axis_info(duration, width, max_freq, height):
-        N_XTICKS = 6
-        N_YTICKS = 6
+        matrix = np.moveaxis(matrix, axis, 0)
+        n_groups = -(-matrix.shape[0] // factor)
+        padding = n_groups * factor - matrix.shape[0]
+        if padding:
+            matrix = np.concatenate((matrix, np.repeat(matrix[-1:], padding, axis=0)))
+
+        reduced = matrix.reshape((n_groups, factor) + matrix.shape[1:]).max(axis=1)
+        return np.moveaxis(reduced, 0, axis)
 
-        xtick_period = width / (N_XTICKS - 1)
-        xticks = [int(i * xtick_period) for i in range(N_XTICKS)]
-        xlabels = [int(i * (duration / (N_XTICKS - 1))) for i in range(N_XTICKS)]
+    @staticmethod
+    def _wave_envelope(wave, start, end, columns, envelope=None):
+        """
+        Decimates part of a waveform to about one min/max pair per pixel column.
+        Returns the same array as minimums and maximums if there are too few samples to be worth decimating.
+        """
+        if envelope is not None:
+            return envelope.envelope(start, end, columns)
 
-        ytick_period = height / (N_YTICKS - 1)
-        yticks = [int(i * ytick_period) for i in range(N_YTICKS)]
-        ylabels = [int(i * (max_freq / (N_YTICKS - 1))) for i in reversed(range(N_YTICKS))]
+        samples_per_column = (end - start) // max(1, columns)
+        if samples_per_column < 2:
+            samples = wave[start:end]
+            return np.arange(start, end), samples, samples
 
-        return xticks, xlabels, yticks, ylabels
\ No newline at end of file
+        mins, maxs = WaveEnvelope.minmax(wave[start:end], samples_per_column)
+        return start + np.arange(len(mins)) * samples_per_column, mins, maxs
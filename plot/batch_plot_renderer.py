@@ -0,0 +1,136 @@
+from multiprocessing import Pool
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from plot.audio_plotter import AudioPlotter
+
+class PlotJob:
+    """
+    Describes one plot to render to an image file.
+    """
+    kinds = {
+        'wave': AudioPlotter.draw_wave,
+        'spectrum': AudioPlotter.draw_spectrum,
+        'spectrogram': AudioPlotter.draw_spectrogram
+    }
+
+    def __init__(self, kind, filename, *args, **kwargs):
+        """
+        Args:
+            kind (str): what to plot, one of 'wave', 'spectrum' or 'spectrogram'.
+            filename (str): file to write the plot image to.
+            *args: arguments to the matching `AudioPlotter.draw_*` method, axes excluded.
+            **kwargs: keyword arguments to the matching `AudioPlotter.draw_*` method.
+        """
+        if kind not in self.kinds:
+            raise ValueError('PlotJob.__init__: unknown plot kind `{}`.'.format(kind))
+
+        self.kind = kind
+        self.filename = filename
+        self.args = args
+        self.kwargs = kwargs
+
+
+class BatchPlotRenderer:
+    """
+    Renders plots to image files without any pyplot state.
+    A single Agg figure and its axes are reused from one plot to the next, so rendering many plots keeps memory flat.
+    """
+
+    def __init__(self, size=(6.4, 4.8), dpi=100):
+        """
+        Args:
+            size ((float, float)): width and height of the figure in inches.
+            dpi (int): resolution of rendered images in dots per inch.
+        """
+        self.size = size
+        self.dpi = dpi
+        self.figure = Figure(figsize=size, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot(111)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def render(self, job):
+        """
+        Renders a plot to its image file.
+
+        Args:
+            job (PlotJob): the plot to render.
+
+        Returns:
+            (str): the name of the written file.
+        """
+        if self.figure is None:
+            raise ValueError('BatchPlotRenderer.render: renderer was closed.')
+
+        self.axes.clear()
+        PlotJob.kinds[job.kind](self.axes, *job.args, **job.kwargs)
+        self.figure.savefig(job.filename)
+        return job.filename
+
+    def render_all(self, jobs):
+        """
+        Renders plots one after the other.
+
+        Args:
+            jobs (iterable of PlotJob): the plots to render.
+
+        Returns:
+            (list of str): the names of the written files.
+        """
+        return [self.render(job) for job in jobs]
+
+    def close(self):
+        """
+        Releases the figure and everything drawn onto it.
+        """
+        if self.figure is not None:
+            self.figure.clear()
+        self.figure = None
+        self.canvas = None
+        self.axes = None
+
+    @staticmethod
+    def render_parallel(jobs, processes=None, size=(6.4, 4.8), dpi=100, chunksize=4, maxtasksperchild=None):
+        """
+        Fans plots out to a pool of processes, each rendering with its own reused figure.
+
+        Args:
+            jobs (iterable of PlotJob): the plots to render. Their data is pickled to the worker processes.
+            processes (int): number of worker processes. As many as CPUs if None.
+            size ((float, float)): width and height of figures in inches.
+            dpi (int): resolution of rendered images in dots per inch.
+            chunksize (int): number of jobs sent to a worker at once.
+            maxtasksperchild (int): number of jobs after which a worker is replaced. Workers are never replaced if None.
+
+        Returns:
+            (list of str): the names of the written files, in the order of the jobs.
+        """
+        pool = Pool(processes, _init_worker, (size, dpi), maxtasksperchild)
+        try:
+            filenames = pool.map(_render_in_worker, jobs, chunksize)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        return filenames
+
+
+# Renderer of the current worker process, set up once by the pool initializer
+_worker_renderer = None
+
+def _init_worker(size, dpi):
+    global _worker_renderer
+    _worker_renderer = BatchPlotRenderer(size, dpi)
+
+def _render_in_worker(job):
+    return _worker_renderer.render(job)
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+
+class WaveEnvelope:
+    """
+    Multi-level cache of the min/max envelopes of a waveform.
+    Level k holds the minimum and maximum of every block of `block_size * 2**k` samples, so any zoom level can be
+    rendered from the closest level instead of from the full waveform.
+    """
+
+    def __init__(self, wave, block_size=64, levels=None):
+        """
+        Args:
+            wave (np.ndarray): the waveform.
+            block_size (int): number of samples per block on the finest level.
+            levels (int): number of levels to build. As many as needed to go down to a single block if None.
+        """
+        if block_size < 1:
+            raise ValueError('WaveEnvelope.__init__: `block_size` must be at least 1.')
+
+        self.wave = np.asarray(wave)
+        self.block_size = block_size
+
+        mins, maxs = WaveEnvelope.minmax(self.wave, block_size)
+        self.levels = [(mins, maxs)]
+        while len(mins) > 1 and (levels is None or len(self.levels) < levels):
+            mins, maxs = WaveEnvelope._reduce(mins, maxs, 2)
+            self.levels.append((mins, maxs))
+
+    @staticmethod
+    def minmax(wave, block):
+        """
+        Computes the min/max envelope of a waveform over consecutive blocks of samples.
+
+        Args:
+            wave (np.ndarray): the waveform.
+            block (int): number of samples per block. The last block may be shorter.
+
+        Returns:
+            (np.ndarray, np.ndarray): minimum and maximum of every block.
+        """
+        return WaveEnvelope._reduce(wave, wave, block)
+
+    @staticmethod
+    def _reduce(mins, maxs, factor):
+        n_full = (len(mins) // factor) * factor
+        new_mins = mins[:n_full].reshape(-1, factor).min(axis=1)
+        new_maxs = maxs[:n_full].reshape(-1, factor).max(axis=1)
+
+        if n_full < len(mins):
+            new_mins = np.append(new_mins, mins[n_full:].min())
+            new_maxs = np.append(new_maxs, maxs[n_full:].max())
+
+        return new_mins, new_maxs
+
+    def envelope(self, start, end, columns):
+        """
+        Computes the envelope of part of the waveform with about one min/max pair per pixel column.
+
+        Args:
+            start (int): index of the first sample to render.
+            end (int): index past the last sample to render.
+            columns (int): number of pixel columns to render to.
+
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray): index of the first sample of every column, and minimum and maximum
+                of every column. Minimums and maximums are the same raw samples if there are too few to decimate.
+        """
+        start = max(0, int(start))
+        end = min(len(self.wave), int(end))
+        samples_per_column = max(1, (end - start) // max(1, columns))
+
+        if samples_per_column < 2:
+            samples = self.wave[start:end]
+            return np.arange(start, end), samples, samples
+
+        # Pick the coarsest level whose blocks fit in a column, falling back to the raw wave
+        level = -1
+        if samples_per_column >= self.block_size:
+            level = min(int(math.floor(math.log2(samples_per_column / self.block_size))), len(self.levels) - 1)
+
+        if level < 0:
+            block = 1
+            mins = maxs = self.wave[start:end]
+            offset = start
+        else:
+            block = self.block_size << level
+            first, last = start // block, -(-end // block)
+            mins, maxs = self.levels[level]
+            mins, maxs = mins[first:last], maxs[first:last]
+            offset = first * block
+
+        factor = max(1, samples_per_column // block)
+        mins, maxs = WaveEnvelope._reduce(mins, maxs, factor)
+        positions = offset + np.arange(len(mins)) * (block * factor)
+
+        return positions, mins, maxs
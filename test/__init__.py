@@ -1,2 +1,19 @@
 from test.all_examples_run_test import *
-from test.byte_tools_test import *
\ No newline at end of file
+from test.byte_tools_test import *
+from test.spectrogram_test import *
+from test.spectrogram_tiles_test import *
+from test.plot_test import *
+from test.batch_plot_renderer_test import *
+from test.wav_io_test import *
+from test.async_toolbox_test import *
+from test.shared_memory_test import *
+from test.dsp_toolbox_test import *
+from test.fir_filter_test import *
+from test.resampler_test import *
+from test.spectral_features_test import *
+from test.peak_picking_test import *
+from test.pitch_tracker_test import *
+from test.fingerprint_test import *
+from test.spectrogram_similarity_test import *
+from test.batch_pipeline_test import *
+from test.average_spectrum_test import *
\ No newline at end of file
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.async_toolbox import AsyncDSPToolbox
+from core.sample import Sample
+from core.io.wav_writer import WavWriter
+
+def test_concurrent_requests(tmp_path):
+    wave = np.round(np.sin(np.arange(8000) / 10) * 30000).astype(np.int64)
+    filename = str(tmp_path / 'async.wav')
+    WavWriter(filename).write(Sample(wave, 8000, 2))
+
+    toolbox = AsyncDSPToolbox(ThreadPoolExecutor(2), max_concurrency=2)
+
+    async def serve():
+        sample = await toolbox.read(filename)
+        spectrogram = await toolbox.spectrogram_from_sample(sample, size=128)
+        images = await asyncio.gather(*[toolbox.spectrogram_image_from_file(filename, size=128, colormap='magma')
+                                        for _ in range(4)])
+        return spectrogram, images
+
+    loop = asyncio.new_event_loop()
+    try:
+        spectrogram, images = loop.run_until_complete(serve())
+    finally:
+        loop.close()
+
+    assert spectrogram.amp_matrix.shape[1] == 128
+    assert all(image.i.size == images[0].i.size for image in images)
+    assert images[0].i.size[1] == 128
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class _Tracker:
+    """
+    Blocking job counting how many of its calls run at once.
+    """
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.started = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, duration=None):
+        with self._lock:
+            self.running += 1
+            self.started += 1
+            self.max_running = max(self.max_running, self.running)
+        if duration is None:
+            self.release.wait(10)
+        else:
+            time.sleep(duration)
+        with self._lock:
+            self.running -= 1
+
+def test_concurrency_limit():
+    job = _Tracker()
+    toolbox = AsyncDSPToolbox(ThreadPoolExecutor(8), max_concurrency=2)
+
+    def serve():
+        async def calls():
+            await asyncio.gather(*[toolbox.run(job, 0.02) for _ in range(6)])
+        _run(calls())
+
+    # Two loops in two threads share the limit
+    threads = [threading.Thread(target=serve) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert job.started == 12
+    assert job.max_running == 2
+
+def test_cancellation():
+    job = _Tracker()
+    toolbox = AsyncDSPToolbox(ThreadPoolExecutor(4), max_concurrency=1)
+
+    async def calls():
+        running = asyncio.ensure_future(toolbox.run(job))
+        queued = asyncio.ensure_future(toolbox.run(job))
+        while not job.started:
+            await asyncio.sleep(0.01)
+
+        # A cancelled call which had not started never runs, and one which had keeps its slot until its job completes
+        queued.cancel()
+        running.cancel()
+        following = asyncio.ensure_future(toolbox.run(job, 0.))
+        await asyncio.sleep(0.1)
+        assert job.started == 1 and not following.done()
+
+        job.release.set()
+        await following
+        assert running.cancelled() and queued.cancelled()
+
+    _run(calls())
+    assert job.started == 2
+    assert job.max_running == 1
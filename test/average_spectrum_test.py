@@ -0,0 +1,29 @@
+import numpy as np
+
+from core.average_spectrum import AverageSpectrum
+from core.dsp_toolbox import DSPToolbox
+from core.sample import Sample
+from core.windows.uniform import UniformWindow
+
+def test_matches_spectrogram():
+    wave = np.random.RandomState(0).randn(50001) * 1000
+    sample = Sample(wave, 44100, 2)
+    spectrogram = DSPToolbox.spectrogram_from_sample(sample, size=128)
+
+    average = AverageSpectrum(44100, 2, size=128)
+    for start in range(0, len(wave), 3333):
+        average.add(wave[start:start + 3333])
+        # Every slice lying within the samples received so far is already summed, so that only the samples of the
+        # next slice need keeping
+        assert average.sample_count - int(average.frame_count * average.hop) < average.slice_length
+
+    np.testing.assert_allclose(average.mean_power(), np.mean(np.square(spectrogram.amp_matrix), axis=0))
+    assert average.result().metadata['frame_count'] == len(spectrogram.fft_slices)
+
+def test_noise_density():
+    wave = np.random.RandomState(1).randn(200000) * 1000
+    average = AverageSpectrum(44100, 2, UniformWindow(), size=512)
+    average.add(wave)
+
+    # One-sided density of white noise
+    assert abs(np.mean(average.power_spectral_density()[1:]) / (2 * 1000 ** 2 / 44100) - 1) < 0.05
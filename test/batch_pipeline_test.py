@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+from core.batch_pipeline import BatchPipeline
+from core.sample import Sample
+from core.io.wav_writer import WavWriter
+
+def _write_sine(filename, length=4000):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    wave = np.round(np.sin(np.arange(length) / 10) * 30000).astype(np.int64)
+    WavWriter(filename).write(Sample(np.stack([wave, wave // 2], axis=1), 8000, 2))
+
+def test_outputs_and_stats(tmp_path):
+    filenames = [str(tmp_path / 'audio' / '{}.wav'.format(i)) for i in range(3)]
+    for filename in filenames:
+        _write_sine(filename)
+    broken = str(tmp_path / 'audio' / 'broken.wav')
+    with open(broken, 'wb') as f:
+        f.write(b'not a wave file')
+
+    pipeline = BatchPipeline(str(tmp_path / 'images'), size=128, readers=2, workers=2, writers=2)
+    outputs = pipeline.run(str(tmp_path / 'audio' / '*.wav'))
+
+    assert sorted(outputs) == [str(tmp_path / 'images' / '{}.png'.format(i)) for i in range(3)]
+    assert all(os.path.getsize(output) > 0 for output in outputs)
+    assert [filename for filename, _ in pipeline.failures] == [broken]
+    assert pipeline.stats['read'].items == pipeline.stats['analyse'].items == pipeline.stats['write'].items == 3
+    assert pipeline.stats['write'].bytes == sum(os.path.getsize(output) for output in outputs)
+
+def test_name_collisions(tmp_path):
+    filenames = [str(tmp_path / 'audio' / folder / 'take.wav') for folder in ('a', 'b', os.path.join('b', 'c'))]
+    for filename in filenames:
+        _write_sine(filename, 1000)
+    # Same name as an existing image once the extension is dropped
+    _write_sine(str(tmp_path / 'audio' / 'a' / 'take.WAV'), 1000)
+
+    pipeline = BatchPipeline(str(tmp_path / 'images'), size=64, readers=1, workers=1, writers=1)
+    outputs = pipeline.run(str(tmp_path / 'audio' / '**' / '*.wav'))
+
+    assert sorted(outputs) == sorted(str(tmp_path / 'images' / folder / 'take.png')
+                                     for folder in ('a', 'b', os.path.join('b', 'c')))
+    assert not pipeline.failures
+
+    outputs = pipeline.run(filenames[:1] + [str(tmp_path / 'audio' / 'a' / 'take.WAV')])
+    assert outputs == [str(tmp_path / 'images' / 'take.png')]
+    assert len(pipeline.failures) == 1 and isinstance(pipeline.failures[0][1], ValueError)
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pytest
+
+from core.dsp_toolbox import DSPToolbox as DSP
+from core.sample import Sample
+from plot.batch_plot_renderer import BatchPlotRenderer, PlotJob
+
+def _jobs(folder):
+    rng = np.random.RandomState(0)
+    jobs = []
+    for i in range(6):
+        sample = Sample(rng.randn(4000) * 1000, 8000, 2)
+        if i % 2:
+            jobs.append(PlotJob('spectrogram', os.path.join(folder, 'spectrogram_{}.png'.format(i)),
+                                DSP.spectrogram_from_sample(sample, size=64), title=str(i)))
+        else:
+            jobs.append(PlotJob('wave', os.path.join(folder, 'wave_{}.png'.format(i)), sample, title=str(i)))
+    return jobs
+
+def test_render_serial_and_parallel(tmp_path):
+    for name in ['serial', 'parallel']:
+        folder = tmp_path / name
+        folder.mkdir()
+        jobs = _jobs(str(folder))
+
+        if name == 'serial':
+            with BatchPlotRenderer(size=(3, 2)) as renderer:
+                filenames = renderer.render_all(jobs)
+        else:
+            filenames = BatchPlotRenderer.render_parallel(jobs, processes=2, size=(3, 2), chunksize=1)
+
+        assert filenames == [job.filename for job in jobs]
+        for filename in filenames:
+            assert os.path.getsize(filename) > 0
+
+def test_render_after_close(tmp_path):
+    renderer = BatchPlotRenderer()
+    job = _jobs(str(tmp_path))[0]
+    assert renderer.render(job) == job.filename
+
+    renderer.close()
+    with pytest.raises(ValueError):
+        renderer.render(job)
+    with pytest.raises(ValueError):
+        PlotJob('histogram', str(tmp_path / 'histogram.png'))
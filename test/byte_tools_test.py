@@ -131,3 +131,20 @@ def test_power2_pad():
         arr.extend([pad_number] * pad_length)
 
         assert arr == padded
+
+def test_int_bytes_round_trip():
+    # Includes packed widths which do not map to a NumPy integer type
+    for byte_length in [1, 2, 3, 4, 5, 8]:
+        for little_endian in [False, True]:
+            endianness = 'little' if little_endian else 'big'
+            bit_depth = 8 * byte_length
+            arr = [randint(-(2 ** (bit_depth - 1)), 2 ** (bit_depth - 1) - 1) for i in range(256)]
+            arr.extend([-(2 ** (bit_depth - 1)), 2 ** (bit_depth - 1) - 1, 0, -1])
+
+            byte_arr = bytearray()
+            for n in arr:
+                byte_arr.extend(n.to_bytes(byte_length, endianness, signed=True))
+
+            assert b.to_bytearray(arr, byte_length, little_endian) == byte_arr
+            assert b.to_int(byte_arr, byte_length, little_endian) == arr
+            assert b.to_array(memoryview(byte_arr), byte_length, little_endian).tolist() == arr
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from core.dsp_toolbox import DSPToolbox
+from core.sample import Sample
+from core.streaming_istft import StreamingISTFT
+from core.window import Window
+from core.windows.hann import HannWindow
+
+def test_unit_conversions():
+    levels = np.array([1., 0.5, 0.])
+
+    assert DSPToolbox.to_db([1., 0.1], 1.) == [0., -20.]
+    dbs = DSPToolbox.to_db(levels, 1., floor_db=-90.)
+    assert dbs[-1] == -90.
+    np.testing.assert_allclose(DSPToolbox.to_level(dbs[:2], 1.), levels[:2])
+
+    # Levels are given back in the unit of the reference
+    amplitudes = np.array([32768., 16384., 100.])
+    amplitude_dbs = DSPToolbox.to_db(amplitudes, 32768)
+    np.testing.assert_allclose(DSPToolbox.to_level(amplitude_dbs, 32768), amplitudes)
+    np.testing.assert_allclose(DSPToolbox.to_level(list(amplitude_dbs), 32768), amplitudes)
+    np.testing.assert_allclose(DSPToolbox.to_level(DSPToolbox.to_db(amplitudes, 32768, square=False), 32768,
+                                                   unsquare=False), amplitudes)
+    assert DSPToolbox.to_level(-6., 32768) == 32768 * 10 ** (-6 / 20)
+
+    out = np.empty(3, np.float32)
+    assert DSPToolbox.to_db(levels, 1., floor_db=-90., out=out) is out
+    np.testing.assert_allclose(out, dbs, rtol=1e-6)
+    assert DSPToolbox.to_db(levels, 1., floor_db=-90., dtype=np.float32).dtype == np.float32
+
+    np.testing.assert_allclose(DSPToolbox.to_rad(DSPToolbox.to_deg(levels)), levels)
+
+def test_normalise():
+    sample = Sample(np.array([[100, -200], [50, 0]], dtype=np.int16), 44100, 2)
+
+    normalised = DSPToolbox.normalise(sample)
+    np.testing.assert_array_equal(normalised.wave, [[16384, -32768], [8192, 0]])
+
+    assert DSPToolbox.normalise(sample, in_place=True) is sample
+    np.testing.assert_array_equal(sample.wave, [[16384, -32767], [8192, 0]])
+
+def test_normalise_full_scale():
+    sample = Sample(np.array([-32768, 1000, -500], dtype=np.int16), 44100, 2)
+
+    normalised = DSPToolbox.normalise(sample)
+    np.testing.assert_array_equal(normalised.wave, [-32768, 1000, -500])
+
+    DSPToolbox.normalise(sample, in_place=True)
+    np.testing.assert_array_equal(sample.wave, [-32767, 1000, -500])
+
+def test_single_precision():
+    wave = np.round(np.sin(np.arange(20000) / 10) * 20000)
+    sample = Sample(wave, 44100, 2)
+
+    double = DSPToolbox.spectrogram_from_sample(sample, size=256)
+    single = DSPToolbox.spectrogram_from_sample(sample, size=256, dtype=np.float32)
+    assert single.amp_matrix.dtype == np.float32 and single.phase_matrix.dtype == np.float32
+    assert single.fft_slices[1].power_spectrum.dtype == np.float32
+    np.testing.assert_allclose(single.amp_matrix, double.amp_matrix, atol=1e-2 * double.amp_matrix.max())
+
+    assert DSPToolbox.fft(sample, dtype=np.float32).amp_spectrum.dtype == np.float32
+
+    restored = DSPToolbox.sample_from_spectrogram(single)
+    assert restored.wave.dtype == np.float32
+    assert np.abs(restored.wave[1000:19000] - wave[1000:19000]).max() < 1.
+
+    assert DSPToolbox.float_types(np.float32) == (np.float32, np.complex64)
+    with pytest.raises(ValueError):
+        DSPToolbox.float_types(np.int16)
+
+def test_istft_inverts_stft():
+    wave = np.round(np.sin(np.arange(30000) / 20)[:, np.newaxis] * [20000, -10000])
+    sample = Sample(wave, 44100, 2)
+
+    spectra = DSPToolbox.stft(sample, size=128)
+    restored = DSPToolbox.istft(spectra, length=len(wave))
+    assert restored.shape == wave.shape
+    assert np.abs(restored[500:-500] - wave[500:-500]).max() < 1.
+
+def test_griffin_lim():
+    t = np.arange(30000)
+    wave = np.round((np.sin(t / 10) + 0.5 * np.sin(t / 3 * (1 + t / 1e5))) * 10000)
+    amp = DSPToolbox.spectrogram_from_sample(Sample(wave, 44100, 2), size=256).amp_matrix
+
+    _, plain = DSPToolbox.griffin_lim(amp, iterations=30, momentum=0.)
+    phase, fast = DSPToolbox.griffin_lim(amp, iterations=30)
+    assert phase.shape == amp.shape
+    assert fast[-1] < fast[0] and fast[-1] < plain[-1]
+
+    _, stopped = DSPToolbox.griffin_lim(amp, iterations=30, tolerance=fast[10])
+    assert len(stopped) <= 11
+
+def test_streaming_istft():
+    wave = np.round(np.sin(np.arange(30001) / 20)[:, np.newaxis] * [20000, -10000])
+    spectra = DSPToolbox.stft(Sample(wave, 44100, 2), size=100)
+    restored = DSPToolbox.istft(spectra, length=len(wave))
+
+    streaming = StreamingISTFT(size=100, length=len(wave))
+    blocks = [streaming.process(spectra[:, i:i + 7]) for i in range(0, spectra.shape[1], 7)]
+    blocks.append(streaming.flush())
+    assert max(len(block) for block in blocks) < 7 * 150 + 200
+    np.testing.assert_allclose(np.concatenate(blocks), restored)
+
+    frames, factors = DSPToolbox.inverse_frames(spectra, HannWindow(), np.float32)
+    assert frames.shape == spectra.shape[:-1] + (200,) and frames.dtype == np.float32
+    np.testing.assert_array_equal(factors, HannWindow().process(np.ones(200, np.float32)))
+
+
+class _SineWindow(Window):
+    def __init__(self):
+        super(_SineWindow, self).__init__()
+        self.name = 'sine'
+        self.coherent_gain = 2 / np.pi
+
+    def _generate_scaling_factors(self, length, dtype=None):
+        return np.sin(np.pi * (np.arange(length) + 0.5) / length).astype(np.float64 if dtype is None else dtype)
+
+def test_custom_window():
+    # Windows only implementing `_generate_scaling_factors` work in either precision
+    wave = np.round(np.sin(np.arange(5000) / 10) * 20000)
+    sample = Sample(wave, 44100, 2)
+
+    reference = DSPToolbox.spectrogram_from_sample(sample, _SineWindow(), 128)
+    for dtype in [np.float64, np.float32]:
+        spectrogram = DSPToolbox.spectrogram_from_sample(sample, _SineWindow(), 128, dtype=dtype)
+        assert spectrogram.amp_matrix.dtype == dtype
+        np.testing.assert_allclose(spectrogram.amp_matrix, reference.amp_matrix, rtol=1e-4,
+                                   atol=1e-4 * reference.amp_matrix.max())
+
+        restored = DSPToolbox.sample_from_spectrogram(spectrogram, dtype=dtype)
+        assert len(restored.wave) >= len(wave)
+
+    assert _SineWindow().process(np.ones(8, np.float32)).dtype == np.float32
+    assert _SineWindow().process(np.ones(8, np.int16)).dtype == np.float64
+    assert _SineWindow().scaling_factors(8, np.float32).dtype == np.float32
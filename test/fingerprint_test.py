@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from core.fingerprint import FingerprintIndex
+from core.sample import Sample
+
+def _recording(seed, seconds=20, sample_rate=22050):
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(0.4 * sample_rate)) / sample_rate
+    wave = rng.randn(seconds * sample_rate) * 50
+    for _ in range(4 * seconds):
+        start = int(rng.uniform(0, seconds - 0.5) * sample_rate)
+        wave[start:start + len(t)] += np.sin(2 * np.pi * rng.uniform(200, 3000) * t) * np.exp(-5 * t) * \
+            rng.uniform(1000, 5000)
+    return wave
+
+def test_fingerprint_query(tmp_path):
+    index = FingerprintIndex()
+    recordings = [_recording(seed) for seed in range(5)]
+    for i, wave in enumerate(recordings):
+        assert index.add('recording{}'.format(i), Sample(wave, 22050, 2)) == i
+
+    excerpt = recordings[3][int(7.5 * 22050):int(12.5 * 22050)] + np.random.RandomState(100).randn(5 * 22050) * 300
+    for searched in [index, None]:
+        if searched is None:
+            folder = str(tmp_path)
+            index.save(folder)
+            searched = FingerprintIndex.load(folder)
+        matches = searched.query(Sample(excerpt, 22050, 2))
+        name, votes, offset = matches[0]
+        assert name == 'recording3'
+        assert abs(offset - 7.5) < 0.05
+        assert all(other_votes < votes / 2 for _, other_votes, _ in matches[1:])
+
+    assert index.query(Sample(_recording(1000, seconds=5), 22050, 2)) == []
+
+def test_save_loaded_index(tmp_path):
+    folder = str(tmp_path / 'index')
+    recordings = [_recording(seed, seconds=8) for seed in range(3)]
+    index = FingerprintIndex()
+    for i, wave in enumerate(recordings[:2]):
+        index.add('recording{}'.format(i), Sample(wave, 22050, 2))
+    index.save(folder)
+
+    # Saved back over its own memory-mapped arrays, as loaded then with a new recording
+    loaded = FingerprintIndex.load(folder)
+    loaded.save(folder)
+    loaded.add('recording2', Sample(recordings[2], 22050, 2))
+    loaded.save(folder)
+    FingerprintIndex.load(folder).save(folder)
+
+    reloaded = FingerprintIndex.load(folder)
+    assert reloaded.names == ['recording0', 'recording1', 'recording2']
+    assert reloaded.landmark_count == loaded.landmark_count > index.landmark_count
+    for i, wave in enumerate(recordings):
+        assert reloaded.query(Sample(wave[2 * 22050:5 * 22050], 22050, 2))[0][0] == 'recording{}'.format(i)
+    assert sorted(os.listdir(folder)) == ['index.json', 'keys.npy', 'offsets.npy', 'times.npy', 'tracks.npy']
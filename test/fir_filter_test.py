@@ -0,0 +1,27 @@
+import numpy as np
+
+from core.fir_filter import FIRFilter
+from core.sample import Sample
+
+def test_fft_convolution_matches_direct():
+    rng = np.random.RandomState(0)
+    wave = rng.randn(20011, 2)
+
+    for n_taps in [31, 513]:
+        taps = rng.randn(n_taps)
+        expected = np.stack([np.convolve(wave[:, c], taps)[:len(wave)] for c in range(2)], axis=1)
+
+        fir = FIRFilter(taps)
+        np.testing.assert_allclose(fir.filter(wave), expected, atol=1e-9)
+
+        blocks = [fir.process(wave[i:i + 777]) for i in range(0, len(wave), 777)]
+        np.testing.assert_allclose(np.concatenate(blocks), expected, atol=1e-9)
+
+def test_lowpass():
+    t = np.arange(44100)
+    lowpass = FIRFilter.lowpass(1000, 44100, n_taps=201)
+
+    passed = lowpass.apply(Sample(np.sin(2 * np.pi * 200 * t / 44100) * 10000, 44100, 2))
+    stopped = lowpass.apply(Sample(np.sin(2 * np.pi * 5000 * t / 44100) * 10000, 44100, 2))
+    assert abs(np.abs(passed.wave[1000:]).max() - 10000) < 200
+    assert np.abs(stopped.wave[1000:]).max() < 10
@@ -0,0 +1,38 @@
+import numpy as np
+
+from core.dsp_toolbox import DSPToolbox
+from core.peak_picking import PeakPicker
+from core.sample import Sample
+from core.windows.blackman_harris import BlackmanHarrisWindow
+
+def test_interpolated_peaks():
+    t = np.arange(44100)
+    frequencies, amplitudes = [1003.7, 2500.2, 7777.7], [10000, 3000, 500]
+    wave = sum(a * np.sin(2 * np.pi * f * t / 44100) for a, f in zip(amplitudes, frequencies))
+
+    for window in [None, BlackmanHarrisWindow()]:
+        spectrogram = DSPToolbox.spectrogram_from_sample(Sample(wave, 44100, 2), window=window, size=1024)
+        peaks = PeakPicker.from_spectrogram(spectrogram, threshold=100, prominence=20)
+
+        assert len(peaks) == len(spectrogram.fft_slices)
+        assert np.all(peaks.counts[2:-2] == 3)
+        found, levels, _ = peaks.frame(5)
+        np.testing.assert_allclose(found, frequencies, atol=0.05)
+        np.testing.assert_allclose(levels, amplitudes, rtol=3e-3)
+
+def test_ragged_peaks():
+    amp = np.array([[0, 1, 0, 5, 0, 2, 0, 0],
+                    [0, 0, 0, 0, 0, 0, 0, 0],
+                    [1, 4, 4, 1, 3, 1, 9, 1]], dtype=float) + 1e-3
+    peaks = PeakPicker(prominence=0, interpolation=None).pick(amp)
+
+    np.testing.assert_array_equal(peaks.offsets, [0, 3, 3, 6])
+    np.testing.assert_array_equal(peaks.bins, [1, 3, 5, 1, 4, 6])
+    np.testing.assert_array_equal(peaks.frames, [0, 0, 0, 2, 2, 2])
+
+    prominent = PeakPicker(prominence=10, interpolation=None).pick(amp)
+    np.testing.assert_array_equal(prominent.bins, [1, 3, 5, 1, 6])
+
+    loudest = PeakPicker(prominence=0, interpolation=None, max_peaks=1).pick(amp)
+    np.testing.assert_array_equal(loudest.offsets, [0, 1, 1, 2])
+    np.testing.assert_array_equal(loudest.bins, [3, 6])
@@ -0,0 +1,42 @@
+import numpy as np
+
+from core.pitch_tracker import PitchTracker
+from core.sample import Sample
+
+def test_vibrato_track():
+    t = np.arange(2 * 44100) / 44100
+    phase = 2 * np.pi * np.cumsum(220 * 2 ** (0.5 * np.sin(np.pi * t))) / 44100
+    wave = (np.sin(phase) + 0.5 * np.sin(2 * phase) + 0.3 * np.sin(3 * phase)) * 8000
+    wave[:44100 // 4] = 0
+
+    tracker = PitchTracker(44100)
+    frequencies, periodicity = tracker.track(Sample(wave, 44100, 2))
+    times = tracker.frame_time(np.arange(len(frequencies)))
+    expected = 220 * 2 ** (0.5 * np.sin(np.pi * times))
+
+    assert np.all(np.isnan(frequencies[:6]))
+    voiced = slice(10, -2)
+    assert np.all(np.abs(frequencies[voiced] - expected[voiced]) < 0.01 * expected[voiced])
+    assert np.all(periodicity[voiced] > 0.9)
+
+    blocks = [tracker.process(wave[i:i + 1000]) for i in range(0, len(wave), 1000)] + [tracker.flush()]
+    np.testing.assert_allclose(np.concatenate([b[0] for b in blocks]), frequencies)
+
+def test_noise_is_unvoiced():
+    noise = np.random.RandomState(0).randn(44100, 2) * 1000
+    frequencies, _ = PitchTracker.pitch_track(Sample(noise, 44100, 2))
+    assert frequencies.shape[0] == 2
+    assert np.all(np.isnan(frequencies))
+
+def test_pitch_below_range_is_unvoiced():
+    # The dip of a tone just below `min_frequency` lies past the searched lags, and must not be taken for a pitch at
+    # the edge of the range
+    t = np.arange(44100) / 44100
+    for frequency in [185., 195.]:
+        frequencies, _ = PitchTracker.pitch_track(Sample(np.sin(2 * np.pi * frequency * t) * 8000, 44100, 2),
+                                                  min_frequency=200.)
+        assert np.all(np.isnan(frequencies))
+
+    frequencies, _ = PitchTracker.pitch_track(Sample(np.sin(2 * np.pi * 210. * t) * 8000, 44100, 2),
+                                              min_frequency=200.)
+    assert np.all(np.abs(frequencies[1:-1] - 210.) < 2.)
@@ -0,0 +1,77 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+from core.dsp_toolbox import DSPToolbox as DSP
+from core.sample import Sample
+from plot.audio_plotter import AudioPlotter
+from plot.wave_envelope import WaveEnvelope
+
+def test_envelope_matches_raw_minmax():
+    wave = np.random.RandomState(0).randint(-30000, 30000, 100003)
+    envelope = WaveEnvelope(wave, block_size=16)
+
+    for columns in [7, 100, 1000, 5000]:
+        positions, mins, maxs = envelope.envelope(0, len(wave), columns)
+        span = positions[1] - positions[0]
+        np.testing.assert_array_equal(positions, np.arange(len(mins)) * span)
+
+        expected_mins, expected_maxs = WaveEnvelope.minmax(wave, span)
+        np.testing.assert_array_equal(mins, expected_mins)
+        np.testing.assert_array_equal(maxs, expected_maxs)
+
+        # Columns within a zoomed-in range cover whole blocks of raw samples
+        start = 3 * span
+        positions, mins, maxs = envelope.envelope(start, len(wave) - span // 2, columns)
+        assert positions[0] == start
+        for i in range(len(positions) - 1):
+            block = wave[positions[i]:positions[i + 1]]
+            assert mins[i] == block.min() and maxs[i] == block.max()
+
+    positions, mins, maxs = envelope.envelope(10, 20, 100)
+    np.testing.assert_array_equal(positions, np.arange(10, 20))
+    np.testing.assert_array_equal(mins, wave[10:20])
+
+def _plotted_axes(plot, tmp_path, *args, **kwargs):
+    plt.figure()
+    try:
+        plot(*args, save_image=True, filename=str(tmp_path / 'plot.png'), **kwargs)
+        return plt.gca()
+    finally:
+        plt.close()
+
+def test_plot_wave_clamps_times(tmp_path):
+    wave = np.arange(-1000, 1000) * 10
+    sample = Sample(wave, 1000, 2)
+
+    axes = _plotted_axes(AudioPlotter.plot_wave, tmp_path, sample, start_time=-1, end_time=0.5, columns=10000)
+    x, y = axes.lines[0].get_data()
+    assert axes.get_xlim()[0] == 0
+    np.testing.assert_array_equal(x, np.arange(500) / 1000)
+    np.testing.assert_array_equal(y, wave[:500] / 32768)
+
+    axes = _plotted_axes(AudioPlotter.plot_wave, tmp_path, sample, start_time=1.5, end_time=5, columns=10000)
+    assert len(axes.lines[0].get_xdata()) == 500
+
+def test_decimated_spectrogram(tmp_path):
+    sample = Sample(np.random.RandomState(1).randn(20000) * 5000, 8000, 2)
+    spectrogram = DSP.spectrogram_from_sample(sample, size=64)
+    amp = spectrogram.amp_matrix
+    reference_level = spectrogram.fft_slices[0].reference_level
+
+    axes = _plotted_axes(AudioPlotter.plot_spectrogram, tmp_path, spectrogram, resolution=(5, 10))
+    image = axes.images[0]
+
+    # Groups of whole slices and bins, the last groups padded with their last element
+    time_factor, bin_factor = -(-amp.shape[0] // 5), -(-amp.shape[1] // 10)
+    values = np.asarray(image.get_array()).T
+    assert values.shape == (-(-amp.shape[0] // time_factor), -(-amp.shape[1] // bin_factor))
+    for i in range(values.shape[0]):
+        for j in range(values.shape[1]):
+            group = amp[i * time_factor:(i + 1) * time_factor, j * bin_factor:(j + 1) * bin_factor]
+            assert np.isclose(values[i, j], group.max() / reference_level)
+
+    np.testing.assert_allclose(image.get_extent(), [0, spectrogram.frame_times[-1] + spectrogram.time_step,
+                                                    0, spectrogram.frequency_bins[-1] + spectrogram.bin_spacing])
+
+    axes = _plotted_axes(AudioPlotter.plot_spectrogram, tmp_path, spectrogram, resolution=(1000, 1000))
+    np.testing.assert_allclose(np.asarray(axes.images[0].get_array()).T, amp / reference_level)
@@ -0,0 +1,23 @@
+import numpy as np
+
+from core.resampler import Resampler
+from core.sample import Sample
+
+def test_resample_sine():
+    for source_rate, target_rate in [(44100, 48000), (96000, 44100), (22050, 44100)]:
+        wave = np.sin(2 * np.pi * 1000 * np.arange(source_rate) / source_rate) * 10000
+        resampled = Resampler.resample(Sample(wave, source_rate, 2), target_rate)
+
+        assert resampled.sample_rate == target_rate
+        assert len(resampled.wave) == target_rate
+        expected = np.sin(2 * np.pi * 1000 * np.arange(target_rate) / target_rate) * 10000
+        assert np.abs(resampled.wave - expected)[500:-500].max() < 20
+
+def test_streaming_matches_batch():
+    wave = np.random.RandomState(0).randn(20000, 2)
+    expected = Resampler.resample(Sample(wave, 48000, 2), 44100).wave
+
+    resampler = Resampler(48000, 44100)
+    blocks = [resampler.process(wave[i:i + 999]) for i in range(0, len(wave), 999)]
+    blocks.append(resampler.flush())
+    np.testing.assert_allclose(np.concatenate(blocks), expected)
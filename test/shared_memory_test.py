@@ -0,0 +1,64 @@
+import os
+import pickle
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+import pytest
+
+from core.dsp_toolbox import DSPToolbox
+from core.sample import Sample
+from core.shared_memory import SharedArray, SharedSample, SharedSpectrogram, shared_memory
+
+pytestmark = pytest.mark.skipif(shared_memory is None, reason='shared memory requires Python 3.8 or later')
+# Blocks are only visible as files on Linux
+on_linux = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='shared memory blocks live in /dev/shm')
+
+def _wave_sum(sample):
+    return int(sample.wave.sum())
+
+def _amp_max(spectrogram):
+    return float(spectrogram.amp_matrix.max()), spectrogram.fft_slices[1].reference_level
+
+@on_linux
+def test_shared_sample_handle():
+    wave = np.round(np.sin(np.arange(100000) / 10) * 30000).astype(np.int64)
+
+    with SharedSample.from_sample(Sample(wave, 44100, 2)) as sample:
+        assert len(pickle.dumps(sample)) < 1000
+
+        pool = Pool(2)
+        try:
+            assert pool.map(_wave_sum, [sample, sample]) == [int(wave.sum())] * 2
+        finally:
+            pool.close()
+            pool.join()
+
+        name = sample.shared_wave.name
+
+    assert sample.shared_wave.closed
+    assert not os.path.exists(os.path.join('/dev/shm', name))
+
+def test_shared_spectrogram_handle():
+    wave = np.round(np.sin(np.arange(20000) / 10) * 30000).astype(np.int64)
+    spectrogram = DSPToolbox.spectrogram_from_sample(Sample(wave, 44100, 2), size=256)
+
+    with SharedSpectrogram.from_spectrogram(spectrogram) as shared:
+        assert len(pickle.dumps(shared)) < 2000
+        np.testing.assert_array_equal(shared.amp_matrix, spectrogram.amp_matrix)
+        assert shared.fft_slices[3].reference_level == spectrogram.fft_slices[3].reference_level
+
+        pool = Pool(1)
+        try:
+            result = pool.apply(_amp_max, (shared,))
+        finally:
+            pool.close()
+            pool.join()
+        assert result == (spectrogram.amp_matrix.max(), 1 << 15)
+
+@on_linux
+def test_shared_array_released_on_collection():
+    shared = SharedArray((10, 10))
+    name = shared.name
+    del shared
+    assert not os.path.exists(os.path.join('/dev/shm', name))
@@ -0,0 +1,34 @@
+import numpy as np
+
+from core.dsp_toolbox import DSPToolbox
+from core.sample import Sample
+from core.spectral_features import SpectralFeatures
+
+def test_tone_and_noise_features():
+    t = np.arange(44100)
+    tone = Sample(np.sin(2 * np.pi * 1000 * t / 44100) * 10000, 44100, 2)
+    features = SpectralFeatures.of_sample(tone, size=512)[2:-2]
+
+    assert np.all(np.abs(features['peak_frequency'] - 1000) < 44100 / 1024)
+    assert np.all(np.abs(features['centroid'] - 1000) < 100)
+    assert np.all(features['flatness'] < 1e-3)
+    assert np.all(np.abs(features['rms'] - 10000 / np.sqrt(2)) < 300)
+
+    noise = Sample(np.random.RandomState(0).randn(44100) * 1000, 44100, 2)
+    features = SpectralFeatures.of_sample(noise, size=512)[2:-2]
+    assert 0.4 < features['flatness'].mean() < 0.7
+    assert abs(features['rms'].mean() - 1000) < 50
+
+def test_blocks_match_whole_spectrogram():
+    wave = np.random.RandomState(1).randn(30000) * 1000
+    sample = Sample(wave, 44100, 2)
+    spectrogram = DSPToolbox.spectrogram_from_sample(sample, size=256)
+
+    whole = SpectralFeatures.of_spectrogram(spectrogram, block_frames=1000)
+    for blocks in [SpectralFeatures.of_spectrogram(DSPToolbox.spectrogram_from_sample(sample, size=256, lazy=True),
+                                                   block_frames=7),
+                   SpectralFeatures.of_sample(sample, size=256, block_frames=13)]:
+        assert len(blocks) == len(whole)
+        for name in SpectralFeatures.names:
+            np.testing.assert_allclose(blocks[name], whole[name], rtol=1e-4, atol=1e-3)
+    assert whole['flux'][0] == 0
@@ -0,0 +1,49 @@
+import numpy as np
+
+from core.dsp_toolbox import DSPToolbox
+from core.sample import Sample
+from core.spectrogram_similarity import SpectrogramCatalogue, SpectrogramSimilarity
+
+def _recording(seed, seconds=5, sample_rate=22050):
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(0.3 * sample_rate)) / sample_rate
+    wave = rng.randn(seconds * sample_rate) * 30
+    for _ in range(5 * seconds):
+        start = int(rng.uniform(0, seconds - 0.4) * sample_rate)
+        wave[start:start + len(t)] += np.sin(2 * np.pi * rng.uniform(200, 3000) * t) * np.exp(-5 * t) * \
+            rng.uniform(1000, 5000)
+    return wave
+
+def _spectrogram(wave, lazy=False):
+    return DSPToolbox.spectrogram_from_sample(Sample(wave, 22050, 2), size=256, lazy=lazy)
+
+def test_similarity_metrics():
+    wave = _recording(1)
+    reference = _spectrogram(wave)
+    noisy = _spectrogram(wave + np.random.RandomState(2).randn(len(wave)) * 20)
+
+    assert SpectrogramSimilarity.spectral_distance(reference, reference)[0] == 0
+    distance, frame_distances = SpectrogramSimilarity.spectral_distance(reference, noisy)
+    assert len(frame_distances) == len(reference.fft_slices)
+    assert distance < SpectrogramSimilarity.spectral_distance(reference, _spectrogram(_recording(2)))[0]
+    np.testing.assert_allclose(SpectrogramSimilarity.cosine_similarity(reference, _spectrogram(wave / 2)), 1)
+
+    delayed = _spectrogram(np.concatenate((np.zeros(int(7 * DSPToolbox.hop_size(256))), wave)))
+    lag, seconds, correlation = SpectrogramSimilarity.align(reference, delayed)
+    assert lag == 7
+    assert abs(seconds - 7 * reference.time_step) < 1e-9
+    assert correlation > 0.9
+
+def test_catalogue_search():
+    references = [_spectrogram(_recording(seed, seconds=4 + seed % 3), lazy=True) for seed in range(30)]
+    catalogue = SpectrogramCatalogue(references)
+
+    wave = _recording(12, seconds=4)
+    query = _spectrogram(wave + np.random.RandomState(100).randn(len(wave)) * 20)
+    distances = [SpectrogramSimilarity.spectral_distance(query, r)[0] for r in references]
+    assert np.all(catalogue.bounds(query) <= np.array(distances) + 1e-4)
+
+    results = catalogue.search(query, top=3)
+    assert [index for index, _ in results] == list(np.argsort(distances)[:3])
+    assert catalogue.search(query, top=1) == results[:1]
+    assert catalogue.evaluated < len(references)
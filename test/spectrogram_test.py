@@ -0,0 +1,184 @@
+import os
+
+import numpy as np
+
+from core.sample import Sample
+from core.io.wav_reader import WavReader
+from core.lazy_frames import LazyFrames
+from core.dsp_toolbox import DSPToolbox as DSP
+from core.spectrogram import Spectrogram
+
+def _sine_sample(frequency=1000, duration=2, sample_rate=8000):
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    wave = np.round(np.sin(2 * np.pi * frequency * t) * 10000)
+    return Sample(wave, sample_rate, 2)
+
+def test_axes():
+    sample = _sine_sample()
+    spectro = DSP.spectrogram_from_sample(sample, size=128)
+
+    assert len(spectro.frame_times) == len(spectro.fft_slices)
+    assert np.allclose(np.diff(spectro.frame_times), spectro.hop_size / sample.sample_rate)
+    assert np.allclose(spectro.frequency_bins, spectro.fft_slices[0].frequency_bins)
+
+def test_default_hop():
+    sample = _sine_sample()
+    spectro = DSP.spectrogram_from_sample(sample, size=64)
+    built = Spectrogram(list(spectro.fft_slices), 64, {'sampling_frequency': sample.sample_rate})
+
+    assert built.hop_size == spectro.hop_size == DSP.hop_size(64)
+    np.testing.assert_allclose(built.frame_times, spectro.frame_times)
+    assert built.frame_index(1.) == spectro.frame_index(1.) == int(8000 // 96)
+    assert built.sample_span == 128 + (len(spectro.fft_slices) - 1) * 96
+    assert built.sample_span >= len(sample.wave)
+
+def test_lazy_memory():
+    sample = _sine_sample(duration=20)
+    lazy = DSP.spectrogram_from_sample(sample, size=64, lazy=True, cache_size=16)
+    eager = DSP.spectrogram_from_sample(sample, size=64)
+
+    for start in range(0, len(lazy.fft_slices), 100):
+        amp, phase = lazy.spectra(start, start + 100)
+        np.testing.assert_allclose(amp, eager.amp_matrix[start:start + 100])
+        np.testing.assert_allclose(phase, eager.phase_matrix[start:start + 100])
+    assert sum(lazy.fft_slices.is_computed(i) for i in range(len(lazy.fft_slices))) == 16
+
+    lazy = DSP.spectrogram_from_sample(sample, size=64, lazy=True)
+    assert lazy.fft_slices.cache_size is not None
+
+def test_eager_slices_persist():
+    spectro = DSP.spectrogram_from_sample(_sine_sample(duration=0.5), size=128)
+
+    third = spectro.fft_slices[3]
+    third.metadata['note'] = 'kept'
+    spectro.fft_slices[4]
+    assert spectro.fft_slices[3] is third and spectro.fft_slices[3].metadata['note'] == 'kept'
+    assert all(a is b for a, b in zip(spectro.fft_slices, spectro.fft_slices))
+
+def test_index_lookup():
+    sample = _sine_sample()
+    spectro = DSP.spectrogram_from_sample(sample, size=128)
+
+    for i, t in enumerate(spectro.frame_times):
+        assert spectro.frame_index(t) == i
+    assert spectro.frame_index(-1) == 0
+    assert spectro.frame_index(1000) == len(spectro.fft_slices) - 1
+
+    peak = spectro.bin_index(1000)
+    assert np.argmax(spectro.fft_slices[2].amp_spectrum) == peak
+    assert spectro.bin_index(1e9) == spectro.fft_size - 1
+
+def test_region_is_view():
+    sample = _sine_sample()
+    spectro = DSP.spectrogram_from_sample(sample, size=128)
+
+    region = spectro.region(0.5, 1., 500, 1500)
+    start, stop = spectro.frame_range(0.5, 1.)
+    low, high = spectro.bin_range(500, 1500)
+
+    assert region.shape == (stop - start, high - low)
+    assert np.shares_memory(region, spectro.amp_matrix)
+    assert np.array_equal(region[0], spectro.fft_slices[start].amp_spectrum[low:high])
+
+def test_lazy_region():
+    sample = _sine_sample()
+    eager = DSP.spectrogram_from_sample(sample, size=128)
+    lazy = DSP.spectrogram_from_sample(sample, size=128, lazy=True)
+
+    assert isinstance(lazy.fft_slices, LazyFrames)
+    region = lazy.region(0.5, 0.6)
+    start, stop = lazy.frame_range(0.5, 0.6)
+
+    assert np.allclose(region, eager.region(0.5, 0.6))
+    for i in range(len(lazy.fft_slices)):
+        assert lazy.fft_slices.is_computed(i) == (start <= i < stop)
+
+def test_grey_image():
+    sample = _sine_sample(duration=0.5)
+    sample.wave += np.random.RandomState(0).randn(len(sample.wave)) * 100
+    spectro = DSP.spectrogram_from_sample(sample, size=64)
+    image = DSP.image_from_spectrogram(spectro).i
+
+    assert image.mode == 'L' and image.size == (len(spectro.fft_slices), spectro.fft_size)
+    for i, fft_slice in enumerate(spectro.fft_slices):
+        for j, amp in enumerate(fft_slice.amp_spectrum):
+            assert image.getpixel((i, spectro.fft_size - j - 1)) == int(amp / fft_slice.reference_level * 255)
+
+def test_db_image():
+    sample = _sine_sample()
+    spectro = DSP.spectrogram_from_sample(sample, size=128)
+
+    rgb = DSP.db_image_from_spectrogram(spectro, colormap='gray', mode='RGB').i
+    palette = DSP.db_image_from_spectrogram(spectro, colormap='gray', mode='P').i
+
+    assert rgb.size == palette.size == (len(spectro.fft_slices), spectro.fft_size)
+    assert np.array_equal(np.asarray(rgb.convert('RGB')), np.asarray(palette.convert('RGB')))
+
+    # Brightest pixel of a slice sits on the sine frequency, counted from the bottom row
+    column = np.asarray(rgb)[:, 2, 0]
+    assert spectro.fft_size - 1 - np.argmax(column) == spectro.bin_index(1000)
+
+def test_db_image_round_trip():
+    sample = _sine_sample()
+    sample.wave += np.random.RandomState(0).randn(len(sample.wave)) * 100
+    spectro = DSP.spectrogram_from_sample(sample, size=128)
+    reference_level = spectro.fft_slices[0].reference_level
+    dbs = DSP.to_db(spectro.amp_matrix, reference_level, floor_db=-80.)
+
+    for colormap in ['magma', 'viridis', 'gray']:
+        for mode in ['RGB', 'P']:
+            image = DSP.db_image_from_spectrogram(spectro, colormap, floor_db=-80., ceiling_db=-10., mode=mode)
+            restored = DSP.spectrogram_from_image(image, phase_iterations=0)
+
+            # Within half a quantisation step, levels out of range being clipped. Colours repeated by a colormap are
+            # ambiguous by one more step in RGB images
+            restored_dbs = DSP.to_db(restored.amp_matrix, reference_level)
+            steps = 0.5 if mode == 'P' else 1.5
+            assert np.abs(restored_dbs - np.clip(dbs, -80., -10.)).max() <= steps * 70. / 255 + 1e-3
+
+def test_batched_slices_match_fft():
+    sample = _sine_sample(duration=0.5)
+    spectro = DSP.spectrogram_from_sample(sample, size=128)
+
+    for i in [0, 5, len(spectro.fft_slices) - 1]:
+        start = int(i * spectro.hop_size)
+        wave = np.zeros(256)
+        part = sample.wave[start:start + 256]
+        wave[:len(part)] = part
+        fft = DSP.fft(Sample(wave, sample.sample_rate, sample.sample_width))
+
+        assert np.allclose(spectro.fft_slices[i].amp_spectrum, fft.amp_spectrum)
+        assert np.allclose(spectro.fft_slices[i].frequency_bins, fft.frequency_bins)
+
+def test_multichannel_spectrograms():
+    mono = _sine_sample()
+    stereo = Sample(np.stack([mono.wave, mono.wave / 2], axis=1), mono.sample_rate, mono.sample_width)
+
+    assert stereo.channels == 2
+    assert np.shares_memory(stereo.channel(1).wave, stereo.wave)
+
+    left, right = DSP.spectrograms_from_sample(stereo, size=128)
+    assert np.allclose(left.amp_matrix, DSP.spectrogram_from_sample(mono, size=128).amp_matrix)
+    assert np.allclose(right.amp_matrix, left.amp_matrix / 2)
+
+    mid_side = stereo.mid_side()
+    assert np.allclose(mid_side.channel(0).wave, stereo.downmix().wave)
+    assert np.allclose(mid_side.channel(1).wave, mono.wave / 4)
+
+def test_stereo_asset_analysis():
+    # Multichannel files are read as their first channel unless asked otherwise, for mono analyses to keep working
+    filename = os.path.join(os.path.dirname(__file__), '..', 'assets', 'sine220.wav')
+    sample = WavReader(filename).get_sample()
+    assert sample.channels == 1
+    assert len(DSP.spectrogram_from_sample(sample, size=128).fft_slices) == DSP.frame_count(sample, 128)
+    assert len(DSP.fft(sample).amp_spectrum) == -(-len(sample.wave) // 2)
+
+    stereo = WavReader(filename, all_channels=True).get_sample()
+    assert stereo.channels == 2
+    np.testing.assert_array_equal(stereo.channel(0).wave, sample.wave)
+
+def test_lazy_spectrogram_of_list_wave():
+    sample = _sine_sample()
+    listed = Sample(sample.wave.tolist(), sample.sample_rate, sample.sample_width)
+    lazy = DSP.spectrogram_from_sample(listed, size=128, lazy=True)
+    np.testing.assert_allclose(lazy.amp_matrix, DSP.spectrogram_from_sample(sample, size=128).amp_matrix)
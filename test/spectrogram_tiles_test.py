@@ -0,0 +1,64 @@
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from core.dsp_toolbox import DSPToolbox as DSP
+from core.sample import Sample
+from core.spectrogram_tiles import TiledSpectrogramRenderer
+
+def _decimate(matrix, reduce):
+    # Pairs of slices, the last unpaired one carried over alone, then pairs of bins, the last one doubled if unpaired
+    columns = [reduce(matrix[i], matrix[i + 1]) if i + 1 < len(matrix) else matrix[i]
+               for i in range(0, len(matrix), 2)]
+    columns = np.array(columns)
+    if columns.shape[1] % 2:
+        columns = np.concatenate((columns, columns[:, -1:]), axis=1)
+    return reduce(columns[:, 0::2], columns[:, 1::2])
+
+def _read_level(folder, level, width, height, tile_size):
+    pixels = np.zeros((height, width), np.uint8)
+    for x in range(-(-width // tile_size)):
+        for y in range(-(-height // tile_size)):
+            tile = np.array(Image.open(os.path.join(folder, str(level), '{}_{}.png'.format(x, y))))
+            assert tile.shape[1] == min(tile_size, width - x * tile_size)
+            assert tile.shape[0] == min(tile_size, height - y * tile_size)
+            pixels[y * tile_size:(y + 1) * tile_size, x * tile_size:(x + 1) * tile_size] = tile
+    return pixels
+
+def test_tile_pyramid(tmp_path):
+    reference_level = 1000.
+    amp = np.random.RandomState(0).uniform(0, reference_level, (10, 8))
+
+    for mode, reduce in [('max', np.maximum), ('mean', lambda a, b: (a + b) / 2)]:
+        folder = str(tmp_path / mode)
+        metadata = {'title': 'noise'}
+        renderer = TiledSpectrogramRenderer(folder, 8, reference_level, tile_size=4, levels=3, mode=mode,
+                                            metadata=metadata)
+        renderer.add_frames(amp)
+        description = renderer.close()
+
+        with open(os.path.join(folder, 'tiles.json')) as f:
+            assert json.load(f) == description
+        assert description['title'] == 'noise' and description['mode'] == mode
+        assert description['levels'] == [{'width': 10, 'height': 8}, {'width': 5, 'height': 4},
+                                          {'width': 3, 'height': 2}]
+
+        matrix = amp
+        for level, size in enumerate(description['levels']):
+            if level:
+                matrix = _decimate(matrix, reduce)
+            expected = np.clip(matrix.T[::-1] / reference_level * 255, 0, 255).astype(np.uint8)
+            pixels = _read_level(folder, level, size['width'], size['height'], 4)
+            np.testing.assert_array_equal(pixels, expected)
+
+def test_render_keeps_caller_metadata(tmp_path):
+    spectrogram = DSP.spectrogram_from_sample(Sample(np.random.RandomState(1).randn(4000) * 1000, 8000, 2), size=16)
+    metadata = {'title': 'noise'}
+    description = TiledSpectrogramRenderer(str(tmp_path), 16, tile_size=8, levels=2, metadata=metadata).render(
+        spectrogram)
+
+    assert metadata == {'title': 'noise'}
+    assert description['time_step'] == spectrogram.time_step
+    assert description['levels'][0]['width'] == len(spectrogram.fft_slices)
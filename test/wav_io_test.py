@@ -0,0 +1,139 @@
+import struct
+
+import numpy as np
+import pytest
+
+from core.sample import Sample
+from core.io.wav_reader import WavReader
+from core.io.wav_writer import WavWriter
+
+def _sine_wave(length=1001, amplitude=30000):
+    return np.round(np.sin(np.arange(length) / 10) * amplitude).astype(np.int64)
+
+def test_write_read_round_trip(tmp_path):
+    wave = _sine_wave()
+    filename = str(tmp_path / 'round_trip.wav')
+
+    for bit_depth in [8, 16, 24, 32]:
+        WavWriter(filename, bit_depth=bit_depth).write(Sample(wave, 44100, 2))
+        reader = WavReader(filename)
+        reader.read()
+
+        assert reader.sample_width == bit_depth // 8
+        restored = reader.wave * (2. ** (16 - bit_depth))
+        assert np.abs(restored - wave).max() <= (128 if bit_depth == 8 else 0)
+
+def test_streaming_append(tmp_path):
+    wave = _sine_wave()
+    filename = str(tmp_path / 'streamed.wav')
+
+    with WavWriter(filename) as writer:
+        writer.open(44100, 2)
+        for i in range(0, len(wave), 100):
+            writer.append(wave[i:i + 100])
+
+    reader = WavReader(filename)
+    reader.read()
+    assert np.array_equal(reader.wave, wave)
+
+def test_clipping(tmp_path):
+    filename = str(tmp_path / 'clipped.wav')
+    sample = Sample(np.array([-40000, 0, 40000]), 44100, 2)
+
+    WavWriter(filename).write(sample)
+    reader = WavReader(filename)
+    reader.read()
+    assert reader.wave.tolist() == [-32768, 0, 32767]
+
+    with pytest.raises(ValueError):
+        WavWriter(filename, clipping='error').write(sample)
+
+def test_probe(tmp_path):
+    wave = np.stack([_sine_wave(), -_sine_wave()], axis=1)
+    filenames = [str(tmp_path / '{}.wav'.format(i)) for i in range(4)]
+
+    for i, filename in enumerate(filenames):
+        WavWriter(filename, bit_depth=8 * (i + 1)).write(Sample(wave, 22050, 2))
+
+    infos = WavReader.probe_many(filenames)
+    for i, info in enumerate(infos):
+        assert info.channels == 2
+        assert info.sample_width == i + 1
+        assert info.sample_rate == 22050
+        assert info.frame_count == len(wave)
+        assert info.duration == len(wave) / 22050
+
+def test_float_round_trip(tmp_path):
+    filename = str(tmp_path / 'float.wav')
+    wave = np.stack([_sine_wave(amplitude=32767), np.linspace(-40000, 40000, 1001)], axis=1)
+    WavWriter(filename, float_format=True).write(Sample(wave, 48000, 2))
+
+    info = WavReader(filename).probe()
+    assert info.float_format
+    assert info.sample_width == 4
+    assert info.channels == 2
+    assert info.frame_count == len(wave)
+
+    reader = WavReader(filename, all_channels=True)
+    restored = reader.get_sample()
+    assert restored.sample_width == 4
+    np.testing.assert_allclose(restored.wave / 2 ** 31, np.clip(wave / 32768, -1, 1), rtol=1e-6)
+
+    # Samples at the full scale of their width round trip as is
+    WavWriter(filename, float_format=True).write(Sample(restored.wave, 48000, 4))
+    np.testing.assert_allclose(WavReader(filename, all_channels=True).get_sample().wave, restored.wave, rtol=1e-6)
+
+def test_channels(tmp_path):
+    filename = str(tmp_path / 'stereo.wav')
+    wave = np.stack([_sine_wave(), -_sine_wave() // 2], axis=1)
+    WavWriter(filename).write(Sample(wave, 22050, 2))
+
+    mono = WavReader(filename).get_sample()
+    assert mono.channels == 1
+    np.testing.assert_array_equal(mono.wave, wave[:, 0])
+
+    stereo = WavReader(filename, all_channels=True).get_sample()
+    assert stereo.channels == 2
+    np.testing.assert_array_equal(stereo.wave, wave)
+
+
+def _write_raw(filename, fmt, data, data_size=None, riff_size=None, trailer=b''):
+    chunks = b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    chunks += b'data' + struct.pack('<I', len(data) if data_size is None else data_size) + data + trailer
+    with open(filename, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', 4 + len(chunks) if riff_size is None else riff_size) + b'WAVE' + chunks)
+
+def _extensible_fmt(sub_format, channels, sample_rate, bits):
+    block_align = channels * bits // 8
+    guid = struct.pack('<H', sub_format) + b'\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+    return struct.pack('<HHIIHHHHI', 0xFFFE, channels, sample_rate, sample_rate * block_align, block_align, bits, 22,
+                       bits, 3) + guid
+
+def test_probe_extensible(tmp_path):
+    filename = str(tmp_path / 'extensible.wav')
+
+    _write_raw(filename, _extensible_fmt(3, 2, 48000, 32), np.zeros(20, '<f4').tobytes())
+    info = WavReader(filename).probe()
+    assert info.float_format
+    assert (info.channels, info.sample_width, info.sample_rate, info.frame_count) == (2, 4, 48000, 10)
+
+    _write_raw(filename, _extensible_fmt(1, 2, 48000, 24), np.zeros(60, np.uint8).tobytes())
+    info = WavReader(filename).probe()
+    assert not info.float_format
+    assert (info.sample_width, info.frame_count) == (3, 10)
+
+def test_probe_data_size(tmp_path):
+    filename = str(tmp_path / 'sizes.wav')
+    fmt = struct.pack('<HHIIHH', 1, 1, 8000, 16000, 2, 16)
+    data = np.zeros(50, '<i2').tobytes()
+
+    # Headers which were never finalised
+    for data_size, riff_size in [(0, 0), (0xFFFFFFFF, 0xFFFFFFFF), (0xFFFFFFFF, 36)]:
+        _write_raw(filename, fmt, data, data_size, riff_size)
+        assert WavReader(filename).probe().frame_count == 50
+
+    # An actual empty data chunk, with or without chunks after it
+    _write_raw(filename, fmt, b'')
+    assert WavReader(filename).probe().frame_count == 0
+    _write_raw(filename, fmt, b'', trailer=b'LIST' + struct.pack('<I', 4) + b'INFO')
+    assert WavReader(filename).probe().frame_count == 0
\ No newline at end of file
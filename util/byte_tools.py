@@ -1,10 +1,19 @@
 from copy import deepcopy
 
+import numpy as np
+
 class ByteTools:
     """
     Static class which offers functionality to manipulate byte objects as well as carry out general purpose
     binary-related operations.
     """
+    # NumPy types of the integer widths which can be read from or written to buffers as is
+    _int_types = {
+        1: np.int8,
+        2: np.int16,
+        4: np.int32,
+        8: np.int64
+    }
 
     @staticmethod
     def periodic_strip(array, length, period, offset=0):
@@ -32,17 +41,11 @@ class ByteTools:
         if length == period:
             return bytearray(array)
 
-        res = bytearray()
-
-        i = 0
-        while i < len(array):
-            i += offset
-            if i >= len(array):
-                break
-            upper_bound = i + length
-            upper_bound = min(upper_bound, len(array))
-            res.extend(array[i:upper_bound])
-            i += period - offset
+        # View the whole periods as rows of a matrix and take the same columns from every row at once
+        data = np.frombuffer(array, dtype=np.uint8)
+        n_periods = len(data) // period
+        res = bytearray(data[:n_periods * period].reshape(n_periods, period)[:, offset:offset + length].tobytes())
+        res.extend(data[n_periods * period:][offset:offset + length].tobytes())
 
         if o_type is bytes:
             res = bytes(res)
@@ -68,33 +71,85 @@ class ByteTools:
         if not (o_type is bytes or o_type is bytearray):
             raise TypeError('to_int: Type of `array` must be either `bytes` or `bytearray`.')
 
-        endian = 'big'
-        if little_endian:
-            endian = 'little'
-
-        res = []
-        i = 0
-        while (i + byte_length) <= len(array):
-            byte_string = array[i:i + byte_length]
-            res.append(int.from_bytes(byte_string, byteorder=endian, signed=True))
-            i += byte_length
+        res = ByteTools.to_array(array, byte_length, little_endian).tolist()
 
         if padding_number is not None:
             res = ByteTools.power2_pad(res, padding_number)
 
         return res
 
+    @staticmethod
+    def to_array(array, byte_length, little_endian=False):
+        """
+        Converts the given bytes-like object to an array of signed integers.
+        Standard widths are read in place from the buffer; other widths up to 8 bytes, such as packed 24-bit words,
+        are unpacked and sign-extended in a vectorized manner.
+
+        Args:
+            array (bytes-like): any object supporting the buffer protocol, e.g. bytes, bytearray or memoryview.
+            byte_length (int): the length of a byte word to interpret as a single integer.
+            little_endian (bool): whether to interpret byte words in big or little endian.
+
+        Returns:
+            np.ndarray: the integers. Trailing bytes not making up a full word are ignored.
+        """
+        data = np.frombuffer(memoryview(array).cast('B'), dtype=np.uint8)
+        n_words = len(data) // byte_length
+        data = data[:n_words * byte_length]
+
+        if byte_length in ByteTools._int_types:
+            return data.view(ByteTools._int_dtype(byte_length, little_endian))
+
+        if byte_length > 8:
+            endian = 'little' if little_endian else 'big'
+            words = data.reshape(n_words, byte_length)
+            return np.array([int.from_bytes(w.tobytes(), byteorder=endian, signed=True) for w in words], dtype=object)
+
+        # Put every word in the most significant bytes of a little-endian 64-bit integer, then shift it back down:
+        # the arithmetic shift sign-extends it
+        words = data.reshape(n_words, byte_length)
+        if not little_endian:
+            words = words[:, ::-1]
+        padded = np.zeros((n_words, 8), dtype=np.uint8)
+        padded[:, 8 - byte_length:] = words
+        return padded.view('<i8').reshape(n_words) >> (8 * (8 - byte_length))
+
     @staticmethod
     def to_bytearray(array, byte_width, little_endian=False):
-        endian = 'big'
-        if little_endian:
-            endian = 'little'
+        """
+        Converts the given integers to a bytearray, each integer taking up a fixed number of bytes.
 
-        res = bytearray()
-        for i in array:
-            res += int(i).to_bytes(byte_width, endian, signed=True)
+        Args:
+            array (iterable of int): the integers to convert. Non-integer values are truncated towards zero.
+            byte_width (int): the number of bytes to write for each integer, e.g. 3 for packed 24-bit words.
+            little_endian (bool): whether to write byte words in big or little endian.
 
-        return res
+        Returns:
+            bytearray: the converted integers.
+        """
+        values = np.asarray(array)
+        if byte_width > 8 or values.dtype == object:
+            endian = 'little' if little_endian else 'big'
+            res = bytearray()
+            for i in array:
+                res += int(i).to_bytes(byte_width, endian, signed=True)
+            return res
+
+        if values.dtype.kind not in 'iub':
+            values = np.trunc(values.astype(np.float64))
+
+        bits = 8 * byte_width
+        if len(values) and (values.min() < -(1 << (bits - 1)) or values.max() > (1 << (bits - 1)) - 1):
+            raise OverflowError('to_bytearray: values do not fit in {} bytes.'.format(byte_width))
+
+        if byte_width in ByteTools._int_types:
+            return bytearray(values.astype(ByteTools._int_dtype(byte_width, little_endian)).tobytes())
+
+        # Keep the least significant bytes of every value from its 64-bit little-endian representation
+        words = values.astype('<i8').view(np.uint8).reshape(-1, 8)[:, :byte_width]
+        if not little_endian:
+            words = words[:, ::-1]
+        return bytearray(words.tobytes())
 
     @staticmethod
     def to_bytes(array, byte_width, little_endian=False):
@@ -115,14 +170,11 @@ class ByteTools:
         if not (o_type is bytes or o_type is bytearray):
             raise TypeError('reverse_byte_order: Type of `array` must be either `bytes` or `bytearray`.')
 
-        res = bytearray()
-        for b in byte_string[::-1]:
-            res.append(b)
+        return byte_string[::-1]
 
-        if o_type is bytes:
-            res = bytes(res)
-
-        return res
+    @staticmethod
+    def _int_dtype(byte_length, little_endian):
+        return np.dtype(ByteTools._int_types[byte_length]).newbyteorder('<' if little_endian else '>')
 
     @staticmethod
     def power2_pad(array, pad_number=0):